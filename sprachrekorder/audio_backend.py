@@ -0,0 +1,358 @@
+import os
+import threading
+import time
+import types
+
+import numpy as np
+
+from metrics import REGISTRY
+
+# Backend for new streams, e.g. "sounddevice" or "simulated:source=take.wav,speed=8,xruns=0.01"
+BACKEND_ENV = "SPRACHREKORDER_AUDIO"
+
+_backend = None
+
+# Status flags that mean audio was lost or padded with silence
+XRUN_FLAGS = ("input_overflow", "input_underflow", "output_overflow", "output_underflow")
+
+
+class CallbackStop(Exception):
+    """Raised by a simulated stream's callback to end the stream (like sounddevice.CallbackStop)."""
+
+
+class CallbackAbort(Exception):
+    """Raised by a simulated stream's callback to abort the stream (like sounddevice.CallbackAbort)."""
+
+
+class SoundDeviceBackend:
+    """Real audio devices through sounddevice (PortAudio), imported on first use.
+
+    start_probe() loads PortAudio and looks up the default devices on a background
+    thread; default_samplerate() reads that cached result instead of asking again.
+    """
+
+    name = "sounddevice"
+
+    def __init__(self):
+        self._probe = None
+        self._devices = {}  # "input"/"output" -> default device info, filled by the probe
+
+    @property
+    def sd(self):
+        import sounddevice
+
+        return sounddevice
+
+    @property
+    def CallbackStop(self):
+        return self.sd.CallbackStop
+
+    def start_probe(self):
+        """Look up the default devices in the background, once."""
+        if self._probe is None:
+            self._probe = threading.Thread(target=self._run_probe, daemon=True)
+            self._probe.start()
+
+    def _run_probe(self):
+        try:
+            for kind in ("input", "output"):
+                self._devices[kind] = dict(self.sd.query_devices(kind=kind))
+        except Exception as e:  # No PortAudio or no such device
+            print(f"Audio device probe failed: {e}")
+
+    def device_info(self, kind="input"):
+        """The default ``kind`` device as found by the probe (waiting for it), or None."""
+        self.start_probe()
+        self._probe.join()
+        return self._devices.get(kind)
+
+    def default_samplerate(self, device=None, kind="input"):
+        info = self.device_info(kind) if device is None else self.sd.query_devices(device, kind)
+        return int(info["default_samplerate"]) if info else 44100
+
+    def default_channels(self, kind="input"):
+        info = self.device_info(kind)
+        return max(int(info[f"max_{kind}_channels"]), 1) if info else 1
+
+    def input_stream(self, **kwargs):
+        return self.sd.InputStream(**kwargs)
+
+    def output_stream(self, **kwargs):
+        return self.sd.OutputStream(**kwargs)
+
+    def duplex_stream(self, **kwargs):
+        return self.sd.Stream(**kwargs)
+
+
+class CallbackFlags:
+    """Status passed to simulated callbacks, truthy after an xrun (like sounddevice.CallbackFlags)."""
+
+    def __init__(self, input_overflow=False, output_underflow=False):
+        self.input_overflow = input_overflow
+        self.input_underflow = False
+        self.output_overflow = False
+        self.output_underflow = output_underflow
+
+    def __bool__(self):
+        return self.input_overflow or self.output_underflow
+
+    def __repr__(self):
+        flags = [name for name in XRUN_FLAGS if getattr(self, name)]
+        return f"<CallbackFlags: {', '.join(flags) or 'ok'}>"
+
+
+class CallbackStats:
+    """Timing of every callback of a simulated stream."""
+
+    def __init__(self):
+        self.lateness = []  # Seconds between a block's due time and its callback starting
+        self.durations = []  # Seconds spent in each callback
+        self.xruns = 0
+
+    @property
+    def blocks(self):
+        return len(self.durations)
+
+    def summary(self, blocksize, samplerate):
+        """Percentiles in microseconds, with the share of the block period the callback took at p99."""
+        summary = {"blocks": self.blocks, "xruns": self.xruns}
+        for name, values in (("lateness", self.lateness), ("duration", self.durations)):
+            values = np.asarray(values, dtype=np.float64) * 1e6
+            if len(values):
+                summary[name] = {p: float(np.percentile(values, q)) for p, q in (("p50", 50), ("p90", 90), ("p99", 99))}
+                summary[name]["max"] = float(values.max())
+        if self.durations:
+            summary["load_p99"] = summary["duration"]["p99"] / (blocksize / samplerate * 1e6)
+        return summary
+
+
+class SignalSource:
+    """Input frames for simulated streams, read block by block and looped at the end."""
+
+    def __init__(self, samples, loop=True):
+        self.samples = samples if samples.ndim == 2 else samples[:, None]
+        self.loop = loop
+        self.position = 0
+
+    def read(self, out):
+        """Fill ``out`` (frames, channels); channels beyond the source repeat its first one."""
+        frames = len(out)
+        done = 0
+        while done < frames:
+            if self.position >= len(self.samples):
+                if not self.loop or not len(self.samples):
+                    out[done:] = 0
+                    return
+                self.position = 0
+            count = min(frames - done, len(self.samples) - self.position)
+            chunk = self.samples[self.position:self.position + count]
+            width = min(out.shape[1], chunk.shape[1])
+            out[done:done + count, :width] = chunk[:, :width]
+            out[done:done + count, width:] = chunk[:, :1]
+            self.position += count
+            done += count
+
+    def skip(self, frames):
+        self.position += frames
+        if self.loop and len(self.samples):
+            self.position %= len(self.samples)
+
+
+class SimulatedStream:
+    """Input, output or duplex stream driven by a thread instead of an audio device.
+
+    Blocks are due every ``blocksize / samplerate / speed`` seconds. The callback is
+    started up to ``jitter`` seconds late, and with probability ``xruns`` a block is lost
+    and the next callback gets an overflow/underflow status. Callback timing is kept in
+    ``stats``, and with ``capture_output`` the played blocks are kept in ``output``.
+    """
+
+    def __init__(self, backend, kind, samplerate, callback, channels=1, blocksize=0, dtype="float32",
+                 latency=None, **ignored):
+        self.backend = backend
+        self.kind = kind
+        self.samplerate = samplerate
+        self.callback = callback
+        self.channels = channels
+        self.blocksize = blocksize or backend.blocksize
+        self.dtype = dtype
+        self.latency = backend.latency
+        self.stats = CallbackStats()
+        self.output = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def active(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    @property
+    def stopped(self):
+        return not self.active
+
+    def start(self):
+        if self.active:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    abort = stop
+
+    def close(self):
+        self.stop()
+
+    def _run(self):
+        backend = self.backend
+        frames = self.blocksize
+        period = frames / self.samplerate / backend.speed if backend.speed else 0.0
+        rng = np.random.default_rng(backend.seed)
+        indata = np.zeros((frames, self.channels), dtype=self.dtype)
+        outdata = np.zeros((frames, self.channels), dtype=self.dtype)
+        status = CallbackFlags()
+        start = time.perf_counter()
+        block = 0
+        while not self._stop.is_set():
+            due = start + block * period if period else time.perf_counter()
+            block += 1
+            if period:
+                delay = due + (rng.uniform(0, backend.jitter) if backend.jitter else 0.0) - time.perf_counter()
+                if delay > 0 and self._stop.wait(delay):
+                    break
+            if backend.xruns and rng.random() < backend.xruns:
+                # The block never reached the callback; like PortAudio, report it on the next one
+                self.stats.xruns += 1
+                if self.kind != "output":
+                    backend.source.skip(frames)
+                status = CallbackFlags(input_overflow=self.kind != "output", output_underflow=self.kind != "input")
+                continue
+            begin = time.perf_counter()
+            now = begin - start
+            stream_time = types.SimpleNamespace(currentTime=now, inputBufferAdcTime=now - self.latency,
+                                                outputBufferDacTime=now + self.latency)
+            last = False
+            try:
+                if self.kind == "input":
+                    backend.source.read(indata)
+                    self.callback(indata, frames, stream_time, status)
+                elif self.kind == "output":
+                    self.callback(outdata, frames, stream_time, status)
+                else:
+                    backend.source.read(indata)
+                    self.callback(indata, outdata, frames, stream_time, status)
+            except CallbackStop:
+                last = True  # This block is still played
+            except CallbackAbort:
+                break
+            finally:
+                self.stats.durations.append(time.perf_counter() - begin)
+                self.stats.lateness.append(begin - due)
+            if backend.capture_output and self.kind != "input":
+                self.output.append(outdata.copy())
+            if last:
+                break
+            status = CallbackFlags()
+        self._stop.set()
+
+
+class SimulatedBackend:
+    """A fake audio device for headless load tests: feeds ``source`` (file path or samples) to input streams.
+
+    ``speed`` runs the device faster than real time (0 runs it as fast as callbacks
+    return); ``xruns`` is the chance of losing each block and ``jitter`` the maximum
+    late start of a callback in seconds. Without a source, a quiet tone with noise is fed.
+    """
+
+    name = "simulated"
+    CallbackStop = CallbackStop
+
+    def __init__(self, source=None, samplerate=44100, speed=1.0, blocksize=1024, xruns=0.0, jitter=0.0,
+                 latency=0.01, seed=0, loop=True, capture_output=False):
+        self.samplerate = int(samplerate)
+        self.speed = float(speed)
+        self.blocksize = int(blocksize)
+        self.xruns = float(xruns)
+        self.jitter = float(jitter)
+        self.latency = float(latency)
+        self.seed = int(seed)
+        self.capture_output = capture_output
+        self.streams = []  # Every stream opened, for their stats
+        if source is None:
+            t = np.arange(self.samplerate * 2) / self.samplerate
+            noise = np.random.default_rng(seed).standard_normal(len(t))
+            source = (0.2 * np.sin(2 * np.pi * 220 * t) + 0.02 * noise).astype(np.float32)
+        elif isinstance(source, str):
+            from audio_io import load_audio
+
+            source, frame_rate = load_audio(source)
+            if frame_rate != self.samplerate:
+                print(f"Simulated device: {frame_rate} Hz source fed at {self.samplerate} Hz.")
+        self.source = SignalSource(np.asarray(source, dtype=np.float32), loop=loop)
+
+    def start_probe(self):
+        pass
+
+    def default_samplerate(self, device=None, kind="input"):
+        return self.samplerate
+
+    def default_channels(self, kind="input"):
+        return self.source.samples.shape[1]
+
+    def _open(self, kind, kwargs):
+        stream = SimulatedStream(self, kind, **kwargs)
+        self.streams.append(stream)
+        return stream
+
+    def input_stream(self, **kwargs):
+        return self._open("input", kwargs)
+
+    def output_stream(self, **kwargs):
+        return self._open("output", kwargs)
+
+    def duplex_stream(self, **kwargs):
+        return self._open("duplex", kwargs)
+
+
+def xrun_counters(stream):
+    """(flag, counter) pairs for the xruns reported to a ``stream`` ("input", "output", "duplex") callback."""
+    return [(flag, REGISTRY.counter("audio_xruns_total", "Overflows and underflows reported to audio callbacks",
+                                    stream=stream, flag=flag)) for flag in XRUN_FLAGS]
+
+
+def count_xruns(status, counters):
+    for flag, counter in counters:
+        if getattr(status, flag, False):
+            counter.inc()
+
+
+BACKENDS = {"sounddevice": SoundDeviceBackend, "simulated": SimulatedBackend}
+
+
+def backend_from_spec(spec):
+    """Create a backend from "name" or "name:key=value,...", e.g. "simulated:speed=8,jitter=0.002"."""
+    name, _, options = spec.partition(":")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown audio backend: {name} (choose from {', '.join(BACKENDS)})")
+    kwargs = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        kwargs[key.strip()] = value.strip() if key.strip() == "source" else float(value)
+    return BACKENDS[name](**kwargs)
+
+
+def get_backend():
+    """The backend for new streams: set_backend()'s, else the one named by $SPRACHREKORDER_AUDIO."""
+    global _backend
+    if _backend is None:
+        _backend = backend_from_spec(os.environ.get(BACKEND_ENV, "sounddevice"))
+    return _backend
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
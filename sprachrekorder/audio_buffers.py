@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity ring of the most recent frames.
+
+    One thread writes (the audio callback) and others read copies of the newest frames.
+    Writes never allocate; readers detect a concurrent overwrite and retry instead of locking.
+    The writer announces the end of each write before copying (``_writing``) and
+    publishes it after (``_written``), so a reader can tell if its frames were touched.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.float32):
+        self.capacity = capacity
+        self.channels = channels
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self._written = 0  # Total frames ever written; only the writer updates it
+        self._writing = 0  # Total frames once the write in progress is done; set before the copy
+
+    @property
+    def frames_written(self):
+        return self._written
+
+    def write(self, block):
+        """Append a (frames, channels) block, dropping the oldest frames."""
+        end = self._written + len(block)
+        if len(block) >= self.capacity:
+            block = block[-self.capacity:]
+        frames = len(block)
+        self._writing = end
+        start = (end - frames) % self.capacity
+        first = min(frames, self.capacity - start)
+        self._data[start:start + first] = block[:first]
+        if first < frames:
+            self._data[:frames - first] = block[first:]
+        self._written = end
+
+    def latest(self, out):
+        """Copy the newest ``len(out)`` frames into ``out`` (oldest first, zero-filled if not yet written)."""
+        count = len(out)
+        while True:
+            end = self._written
+            available = min(count, end, self.capacity)
+            out[:count - available] = 0
+            self._copy(end - available, out[count - available:])
+            # Retry if the writer lapped the region while it was being copied, or is overwriting it now
+            if self._writing - (end - available) <= self.capacity:
+                return available
+
+    def read(self, position, out):
+        """Copy frames from absolute ``position`` onward into ``out``, for a reader consuming every frame.
+
+        Returns (start, count): ``start`` is past ``position`` if the writer already
+        overwrote those frames, and ``count`` may be 0 when nothing new was written.
+        """
+        while True:
+            end = self._written
+            start = max(position, end - self.capacity)
+            count = min(len(out), end - start)
+            self._copy(start, out[:count])
+            if self._writing - start <= self.capacity:
+                return start, count
+
+    def _copy(self, position, out):
+        frames = len(out)
+        start = position % self.capacity
+        first = min(frames, self.capacity - start)
+        out[:first] = self._data[start:start + first]
+        if first < frames:
+            out[first:] = self._data[:frames - first]
+
@@ -1,89 +1,589 @@
-import math
 import os
-from pydub import AudioSegment, effects
+import time
+
 import numpy as np
+from audio_io import DEFAULT_BLOCK_FRAMES, load_audio
+from convolution import StreamingConvolver, get_spectra
+from metrics import RENDER_BUCKETS, REGISTRY
+from time_pitch import PolyphaseResampler, TimeStretcher
 
-def apply_filter(input_file, output_file, filter_name, param1=0, param2=0, param3=0):
-    """Applies the selected filter to the audio."""
-    print("Loading audio from:", input_file)
-    if not os.path.exists(input_file):
-        print("File does not exist. Check the path or permissions.")
-        return
+FILTER_NAMES = ["Robot", "Echo", "High Pitch", "Reverb", "Bass Boost", "Custom"]
 
-    try:
-        audio = AudioSegment.from_file(input_file)
-        print("File loaded successfully.")
-    except Exception as e:
-        print(f"Failed to load file: {e}")
-        return
-
-    if filter_name == "Robot":
-        octaves = -0.5
-        mod_frequency = 50
-        
-        # Step 1: Lower the pitch
-        new_sample_rate = int(audio.frame_rate * (2 ** octaves))
-        pitched_audio = audio._spawn(audio.raw_data, overrides={"frame_rate": new_sample_rate}).set_frame_rate(audio.frame_rate)
-        
-        # Step 2: Apply smooth amplitude modulation
-        samples = np.array(pitched_audio.get_array_of_samples(), dtype=np.float32)
-        sine_wave = np.sin(2 * np.pi * mod_frequency / pitched_audio.frame_rate * np.arange(len(samples)))
-        modulated_samples = samples * (0.5 + 0.5 * sine_wave)  # Mild modulation to avoid distortion
-
-        # Prevent clipping
-        max_amplitude = np.max(np.abs(modulated_samples))
-        if max_amplitude > 0:
-            modulated_samples = (modulated_samples / max_amplitude) * (2**15 - 1)
-
-        modulated_samples = modulated_samples.astype(np.int16)
-        audio = pitched_audio._spawn(modulated_samples.tobytes())
-        audio = effects.compress_dynamic_range(audio, threshold=-20.0, ratio=4.0)
-
-    elif filter_name == "Echo":
-        delay_ms = 300
-        decay_factor = -10
-        echo = audio - abs(decay_factor)
-        audio = audio.overlay(echo, delay_ms)
-        audio = audio.fade_in(50).fade_out(150)
-
-    elif filter_name == "High Pitch":
-        octaves = 0.5
-        new_sample_rate = int(audio.frame_rate * (2 ** octaves))
-        audio = audio._spawn(audio.raw_data, overrides={"frame_rate": new_sample_rate}).set_frame_rate(audio.frame_rate)
 
-    elif filter_name == "Reverb":
-        initial_delay_ms = 20
-        decay_factor = -5
-        reflections_count = 10
-        max_reflection_delay = 150
-        reflections = audio
-        delay_ms = initial_delay_ms
-        for i in range(reflections_count):
-            reflection = audio - abs(decay_factor * (i + 1))
-            reflections = reflections.overlay(reflection, delay_ms)
-            delay_ms = min(delay_ms + 20, max_reflection_delay)
-        audio = reflections.fade_in(20).fade_out(50)
-
-    elif filter_name == "Bass Boost":
-        speed_factor = 1.2
-        bass_boost_factor = 1.5
-        new_frame_rate = int(audio.frame_rate / speed_factor)
-        slowed_audio = audio._spawn(audio.raw_data, overrides={"frame_rate": new_frame_rate})
-        slowed_audio = slowed_audio.low_pass_filter(150)
-        audio = slowed_audio + bass_boost_factor
+def to_pcm16(samples):
+    """Convert a float32 (frames, channels) buffer to clipped int16 samples."""
+    pcm = np.clip(samples, -1.0, 1.0)
+    pcm *= 2 ** 15 - 1
+    return pcm.astype(np.int16)
+
+
+def save_audio(output_file, samples, frame_rate):
+    """Write a float32 (frames, channels) buffer as a 16-bit PCM WAV file."""
+    from scipy.io.wavfile import write as wavfile_write
+
+    pcm = to_pcm16(samples)
+    if pcm.shape[1] == 1:
+        pcm = pcm[:, 0]
+    wavfile_write(output_file, int(frame_rate), pcm)
+
+
+def db_to_gain(db):
+    return 10.0 ** (db / 20.0)
+
+
+# Filter stages. Each one is fed consecutive blocks of a (frames, channels) float32 signal
+# through process(block, final) and keeps whatever state it needs across block boundaries,
+# so a whole buffer passed as a single final block gives the same result as any blocking.
+
+class TimeStretchStage:
+    """Change the speed by ``rate`` (faster above 1) without changing the pitch (phase vocoder)."""
+
+    def __init__(self, rate, channels, total_frames):
+        self.rate = rate
+        self._stretcher = TimeStretcher(rate, channels, total_frames) if rate != 1 else None
+        self.total_out = self._stretcher.total_out if self._stretcher else total_frames
+
+    def process(self, block, final=False):
+        return self._stretcher.process(block, final) if self._stretcher else block
+
+
+class PitchShiftStage:
+    """Shift the pitch by ``ratio`` without changing the duration.
+
+    The signal is time-stretched to ``ratio`` times its length, then polyphase-resampled
+    back to the original number of frames.
+    """
+
+    def __init__(self, ratio, channels, total_frames):
+        self.total_frames = total_frames
+        self._stretcher = TimeStretcher(1 / ratio, channels, total_frames)
+        self._resampler = PolyphaseResampler.for_ratio(1 / ratio, channels, self._stretcher.total_out)
+        self._emitted = 0
+
+    def process(self, block, final=False):
+        out = self._resampler.process(self._stretcher.process(block, final), final)
+        # The rational resampling ratio can miss the input length by a few frames
+        out = out[:max(self.total_frames - self._emitted, 0)]
+        if final and self._emitted + len(out) < self.total_frames:
+            out = np.concatenate((out, np.zeros((self.total_frames - self._emitted - len(out), out.shape[1]),
+                                                dtype=np.float32)))
+        self._emitted += len(out)
+        return out
+
+
+class ModulateStage:
+    """Amplitude modulation by a sine oscillator whose phase runs on across blocks."""
+
+    def __init__(self, frequency, frame_rate, depth=0.5):
+        self.step = 2 * np.pi * frequency / frame_rate
+        self.depth = depth
+        self._phase = 0.0
+
+    def envelope(self, frames):
+        """Gain of the next ``frames`` frames (advances the oscillator)."""
+        phase = self._phase + np.arange(frames, dtype=np.float64) * self.step
+        envelope = np.sin(phase).astype(np.float32)
+        envelope *= self.depth
+        envelope += 1.0 - self.depth
+        self._phase = (self._phase + frames * self.step) % (2 * np.pi)
+        return envelope
+
+    def process(self, block, final=False):
+        return block * self.envelope(len(block))[:, None]
+
+
+class GainStage:
+    def __init__(self, gain):
+        self.gain = np.float32(gain)
+
+    def process(self, block, final=False):
+        return block * self.gain
+
+
+class MultiplyStage:
+    """Consecutive GainStage and ModulateStage stages fused into one multiply per block."""
+
+    def __init__(self, stages):
+        self.gain = np.float32(np.prod([stage.gain for stage in stages if isinstance(stage, GainStage)]))
+        self.modulators = [stage for stage in stages if isinstance(stage, ModulateStage)]
+
+    def process(self, block, final=False):
+        if not self.modulators:
+            return block * self.gain
+        envelope = self.modulators[0].envelope(len(block))
+        for modulator in self.modulators[1:]:
+            envelope *= modulator.envelope(len(block))
+        envelope *= self.gain
+        return block * envelope[:, None]
+
+
+class NormalizeStage:
+    """Scale so the loudest sample sits just below full scale.
+
+    The peak must be known up front when streaming; a single final block measures its own.
+    """
+
+    def __init__(self, peak=None):
+        self.peak = peak
+
+    def process(self, block, final=False):
+        peak = self.peak
+        if peak is None:
+            peak = np.max(np.abs(block)) if len(block) else 0
+        if peak > 0:
+            return block * np.float32((2 ** 15 - 1) / (2 ** 15) / peak)
+        return block
+
+
+class CompressorStage:
+    """Vectorized RMS compressor with an attack window and exponential release."""
+
+    def __init__(self, frame_rate, threshold=-20.0, ratio=4.0, attack=5.0, release=50.0):
+        self.threshold = db_to_gain(threshold)
+        self.amount = 1 - 1.0 / ratio
+        self.look = max(int(frame_rate * attack / 1000), 1)
+        self.decay = 1.0 / max(frame_rate * release / 1000, 1.0)
+        self._history = np.zeros(0)  # Power of the last `look` frames
+        self._log_env = np.log(1e-9)
+
+    def process(self, block, final=False):
+        if len(block) == 0:
+            return block
+        power = np.concatenate((self._history, np.mean(np.square(block, dtype=np.float64), axis=1)))
+        csum = np.concatenate(([0.0], np.cumsum(power)))
+        end = np.arange(len(self._history), len(power))
+        start = np.maximum(end - self.look, 0)
+        rms = np.sqrt((csum[end] - csum[start]) / np.maximum(end - start, 1))
+        self._history = power[-self.look:]
+
+        # Attenuation (dB) the current level asks for
+        over_db = 20 * np.log10(np.maximum(rms, 1e-12) / self.threshold)
+        target = self.amount * np.maximum(over_db, 0.0)
+
+        # Peak-hold with exponential release: env[n] = max(target[n], env[n-1] * c),
+        # solved in the log domain as a running maximum
+        ramp = np.arange(1, len(block) + 1) * self.decay
+        held = np.maximum.accumulate(np.concatenate(([self._log_env], np.log(target + 1e-9) + ramp)))[1:]
+        self._log_env = held[-1] - ramp[-1]
+        gain = db_to_gain(-np.exp(held - ramp)).astype(np.float32)
+        return block * gain[:, None]
+
+
+class ConvolveStage:
+    """Convolution with an impulse response (see convolution.get_spectra)."""
+
+    def __init__(self, spectra, channels, total_frames, tail=False):
+        self._convolver = StreamingConvolver(spectra, channels, total_frames, tail)
+        self.total_out = self._convolver.total_out
+
+    def process(self, block, final=False):
+        return self._convolver.process(block, final)
+
+
+class FadeStage:
+    """Linear fade-in over the first and fade-out over the last frames of a ``total_frames`` signal."""
+
+    def __init__(self, frame_rate, fade_in_ms, fade_out_ms, total_frames):
+        self.fade_in = min(int(frame_rate * fade_in_ms / 1000), total_frames)
+        self.fade_out = min(int(frame_rate * fade_out_ms / 1000), total_frames)
+        self.total_frames = total_frames
+        self._pos = 0
+
+    def process(self, block, final=False):
+        start, stop = self._pos, self._pos + len(block)
+        self._pos = stop
+        first = self.total_frames - self.fade_out
+        if start < self.fade_in or stop > first:
+            block = block.copy()  # A chain can start with a fade, so the block may be the caller's input
+        lo, hi = start, min(stop, self.fade_in)
+        if hi > lo:
+            block[lo - start:hi - start] *= (np.arange(lo, hi, dtype=np.float32) / self.fade_in)[:, None]
+        lo, hi = max(start, first), min(stop, self.total_frames)
+        if hi > lo:
+            ramp = 1.0 - np.arange(lo - first, hi - first, dtype=np.float32) / self.fade_out
+            block[lo - start:hi - start] *= ramp[:, None]
+        return block
+
+
+class LowPassStage:
+    """One-pole RC low-pass filter (same response as pydub's low_pass_filter)."""
+
+    def __init__(self, frame_rate, cutoff):
+        rc = 1.0 / (cutoff * 2 * np.pi)
+        dt = 1.0 / frame_rate
+        self.alpha = dt / (rc + dt)
+        self._zi = None
+
+    def process(self, block, final=False):
+        from scipy.signal import lfilter
+
+        if len(block) == 0:
+            return block
+        if self._zi is None:
+            self._zi = (1.0 - self.alpha) * block[:1].astype(np.float64)
+        out, self._zi = lfilter([self.alpha], [1.0, self.alpha - 1.0], block, axis=0, zi=self._zi)
+        return out.astype(np.float32, copy=False)
+
+
+class LowPassCascadeStage:
+    """Consecutive LowPassStage stages run as one cascade of first-order sections (one sosfilt pass)."""
+
+    def __init__(self, stages):
+        alphas = np.array([stage.alpha for stage in stages])
+        self.sos = np.zeros((len(alphas), 6))
+        self.sos[:, 0] = alphas
+        self.sos[:, 3] = 1.0
+        self.sos[:, 4] = alphas - 1.0
+        self._zi = None
+
+    def process(self, block, final=False):
+        from scipy.signal import sosfilt
+
+        if len(block) == 0:
+            return block
+        if self._zi is None:
+            # Each section starts settled on the first frame, as LowPassStage does
+            self._zi = np.zeros((len(self.sos), 2, block.shape[1]))
+            self._zi[:, 0] = (1.0 - self.sos[:, 0])[:, None] * block[:1].astype(np.float64)
+        out, self._zi = sosfilt(self.sos, block, axis=0, zi=self._zi)
+        return out.astype(np.float32, copy=False)
+
+
+class ReverseStage:
+    """Reverse the signal in the middle of a chain; holds the input until the final block.
+
+    A reverse at the end of a chain is the pipeline's ``reverse`` flag instead, which
+    needs no buffering.
+    """
+
+    def __init__(self):
+        self._blocks = []
 
+    def process(self, block, final=False):
+        self._blocks.append(block)
+        if not final:
+            return block[:0]
+        out = np.ascontiguousarray(np.concatenate(self._blocks)[::-1])
+        self._blocks = []
+        return out
+
+
+class FilterPipeline:
+    """Ordered filter stages plus the output frame rate and whether the result is reversed.
+
+    The time spent in each stage is summed over the blocks of a render and recorded
+    in the filter_stage_seconds histogram when the final block has been processed.
+    """
+
+    def __init__(self, stages, frame_rate, reverse=False):
+        self.stages = stages
+        self.frame_rate = frame_rate
+        self.reverse = reverse
+        self.name = None  # Filter name for the metrics, set by build_pipeline
+        self.stage_seconds = [0.0] * len(stages)
+
+    def process(self, block, final=False):
+        for i, stage in enumerate(self.stages):
+            start = time.perf_counter()
+            block = stage.process(block, final)
+            self.stage_seconds[i] += time.perf_counter() - start
+        if final:
+            for stage, seconds in zip(self.stages, self.stage_seconds):
+                REGISTRY.histogram("filter_stage_seconds", "Render time per filter stage", RENDER_BUCKETS,
+                                   filter=self.name, stage=type(stage).__name__).observe(seconds)
+        return block
+
+    @property
+    def time_scale(self):
+        """Output to input duration ratio (ignoring a reverb tail)."""
+        return float(np.prod([1 / stage.rate for stage in self.stages if isinstance(stage, TimeStretchStage)]))
+
+    def render(self, samples):
+        """Run the whole buffer through in one vectorized pass."""
+        out = self.process(samples, final=True)
+        return out[::-1] if self.reverse else out
+
+
+def robot(frame_rate, channels, total_frames):
+    octaves = -0.5
+    mod_frequency = 50
+    # Lower the pitch (keeping the duration), then a mild modulation,
+    # normalization to prevent clipping and compression
+    return FilterPipeline([
+        PitchShiftStage(2 ** octaves, channels, total_frames),
+        ModulateStage(mod_frequency, frame_rate),
+        NormalizeStage(),
+        CompressorStage(frame_rate, threshold=-20.0, ratio=4.0),
+    ], frame_rate)
+
+
+def echo(frame_rate, channels, total_frames):
+    return FilterPipeline([
+        ConvolveStage(get_spectra("Echo", frame_rate), channels, total_frames),
+        FadeStage(frame_rate, 50, 150, total_frames),
+    ], frame_rate)
+
+
+def high_pitch(frame_rate, channels, total_frames):
+    octaves = 0.5
+    return FilterPipeline([PitchShiftStage(2 ** octaves, channels, total_frames)], frame_rate)
+
+
+def reverb(frame_rate, channels, total_frames, impulse_response=None):
+    if impulse_response:
+        # A loaded room response keeps its decay after the input ends
+        convolve = ConvolveStage(get_spectra(impulse_response, frame_rate), channels, total_frames, tail=True)
+        return FilterPipeline([convolve, FadeStage(frame_rate, 0, 50, convolve.total_out)], frame_rate)
+    return FilterPipeline([
+        ConvolveStage(get_spectra("Reverb", frame_rate), channels, total_frames),
+        FadeStage(frame_rate, 20, 50, total_frames),
+    ], frame_rate)
+
+
+def bass_boost(frame_rate, channels, total_frames):
+    speed_factor = 1.2
+    bass_boost_factor = 1.5
+    # Same samples played back at a lower rate, so the output is slower and deeper
+    new_frame_rate = int(frame_rate / speed_factor)
+    return FilterPipeline([
+        LowPassStage(new_frame_rate, 150),
+        GainStage(db_to_gain(bass_boost_factor)),
+    ], new_frame_rate)
+
+
+def custom(frame_rate, channels, total_frames, param1=0, param2=0, param3=0, param4=0):
+    stretch = TimeStretchStage(1 + param1 / 100.0, channels, total_frames)  # Adjust speed based on param1
+    stages = [stretch]
+    if param4:
+        stages.append(PitchShiftStage(2 ** (param4 / 12.0), channels, stretch.total_out))  # param4 semitones
+    stages.append(GainStage(db_to_gain(param2 - 50)))  # Adjust volume based on param2
+    return FilterPipeline(stages, frame_rate, reverse=param3 > 50)  # Reverse if param3 > 50
+
+
+FILTERS = {
+    "Robot": robot,
+    "Echo": echo,
+    "High Pitch": high_pitch,
+    "Reverb": reverb,
+    "Bass Boost": bass_boost,
+}
+
+
+def build_pipeline(filter_name, frame_rate, channels, total_frames, param1=0, param2=0, param3=0, param4=0,
+                   impulse_response=None, chain=None):
+    """Create the stages for ``filter_name`` on a signal of known length and layout.
+
+    "Chain" runs the stage list ``chain`` instead (see chains.build_chain).
+    """
+    if filter_name == "Chain":
+        from chains import build_chain
+
+        pipeline = build_chain(chain or [], frame_rate, channels, total_frames, impulse_response)
     elif filter_name == "Custom":
-        # Apply custom modifications based on param1, param2, param3
-        print(f"Custom Filter Params: Speed({param1}), Volume({param2}), Reverse({param3})")
-        audio = audio.speedup(playback_speed=1 + param1 / 100.0)  # Adjust speed based on param1
-        audio = audio + (param2 - 50)  # Adjust volume based on param2
-        if param3 > 50:
-            audio = audio.reverse()  # Reverse if param3 > 50
+        pipeline = custom(frame_rate, channels, total_frames, param1, param2, param3, param4)
+    elif filter_name == "Reverb":
+        pipeline = reverb(frame_rate, channels, total_frames, impulse_response)
+    elif filter_name in FILTERS:
+        pipeline = FILTERS[filter_name](frame_rate, channels, total_frames)
+    else:
+        raise KeyError(filter_name)
+    pipeline.name = filter_name
+    return pipeline
+
+
+def render_filter(samples, frame_rate, filter_name, param1=0, param2=0, param3=0, param4=0,
+                  impulse_response=None, voiced_only=False, keep_timing=True, chain=None, progress=None,
+                  block_frames=None):
+    """Run a filter over a float32 (frames, channels) buffer and return (samples, frame_rate).
 
+    ``impulse_response`` is an optional IR WAV path that replaces the built-in "Reverb" response.
+    With ``voiced_only`` only the spans the voice activity detector finds are rendered;
+    they are put back at their original times with silence in between, or with
+    ``keep_timing`` off simply joined. ``chain`` is the stage list of the "Chain" filter.
+    With ``progress`` the buffer is run in blocks of ``block_frames`` (see render_blocks),
+    so the callback can follow and cancel the render; the result is the same.
+    """
+    if filter_name == "Custom":
+        print(f"Custom Filter Params: Speed({param1}), Volume({param2}), Reverse({param3}), Pitch({param4})")
+    source = samples
+    if voiced_only:
+        from vad import VoiceActivityDetector, gather, stitch
+
+        segments = VoiceActivityDetector(frame_rate).segments(samples)
+        source = gather(samples, segments)
+        count_skipped_frames(filter_name, len(source), len(samples))
+
+    def make_pipeline():
+        return build_pipeline(filter_name, frame_rate, samples.shape[1], len(source),
+                              param1, param2, param3, param4, impulse_response, chain)
+
+    if progress is None:
+        pipeline = make_pipeline()
+        out = pipeline.process(source, final=True)
     else:
+        pipeline, out = render_blocks(make_pipeline, source, block_frames, progress)
+    if voiced_only and keep_timing:
+        out = stitch(out, segments, len(samples), pipeline.time_scale)
+    return (out[::-1] if pipeline.reverse else out), pipeline.frame_rate
+
+
+def array_blocks(samples, block_frames=DEFAULT_BLOCK_FRAMES):
+    """Yield (block, is_last) pairs of copies of a buffer's blocks, like audio_io.WavFile.blocks()."""
+    start = 0
+    while True:
+        stop = min(start + block_frames, len(samples))
+        yield samples[start:stop].copy(), stop == len(samples)
+        if stop == len(samples):
+            break
+        start = stop
+
+
+def measure_peak(blocks, make_pipeline, index, measured, progress=None):
+    """Peak the NormalizeStage at ``index`` will see, from a read-only pass over the input ``blocks()``.
+
+    The stages ahead of it run in a new pipeline from ``make_pipeline()``, with the peaks
+    of earlier normalizations copied from the ``measured`` pipeline. ``progress`` is
+    called with the number of input frames read so far.
+    """
+    pipeline = make_pipeline()
+    for stage, known in zip(pipeline.stages[:index], measured.stages):
+        if isinstance(stage, NormalizeStage):
+            stage.peak = known.peak
+    peak = 0.0
+    done = 0
+    for block, last in blocks():
+        done += len(block)
+        for stage in pipeline.stages[:index]:
+            block = stage.process(block, last)
+        if len(block):
+            peak = max(peak, float(np.max(np.abs(block))))
+        if progress:
+            progress(done)
+    return peak
+
+
+def normalization_passes(pipeline):
+    """Read-only passes over the input measure_normalization() will make: one per unmeasured NormalizeStage."""
+    return sum(isinstance(stage, NormalizeStage) and stage.peak is None for stage in pipeline.stages)
+
+
+def measure_normalization(pipeline, blocks, make_pipeline, progress=None):
+    """Set the peak of every NormalizeStage of ``pipeline`` so it can run block by block.
+
+    Normalization needs the global peak of its input, so each one gets its own pass,
+    in order, through the stages (and normalizations) before it. ``progress`` is
+    called with (pass index, input frames read in that pass).
+    """
+    passes = 0
+    for index, stage in enumerate(pipeline.stages):
+        if isinstance(stage, NormalizeStage) and stage.peak is None:
+            report = (lambda done, current=passes: progress(current, done)) if progress else None
+            stage.peak = measure_peak(blocks, make_pipeline, index, pipeline, report)
+            passes += 1
+
+
+def render_blocks(make_pipeline, samples, block_frames=None, progress=None):
+    """Run a buffer through a new pipeline from ``make_pipeline()`` block by block.
+
+    Normalization peaks are measured in read-only passes first, as when streaming.
+    ``progress`` is called with the completed fraction after every block and may raise
+    to abort. Returns (pipeline, output); a reverse flagged on the pipeline is not applied.
+    """
+    block_frames = block_frames or DEFAULT_BLOCK_FRAMES
+    frames = max(len(samples), 1)
+
+    def blocks():
+        return array_blocks(samples, block_frames)
+
+    pipeline = make_pipeline()
+    passes = 1 + normalization_passes(pipeline)
+    report = progress or (lambda fraction: None)
+    measure_normalization(pipeline, blocks, make_pipeline,
+                          lambda index, done: report((index * frames + done) / (frames * passes)))
+    out = []
+    done = 0
+    for block, last in blocks():
+        out.append(pipeline.process(block, last))
+        done += len(block)
+        report(min(((passes - 1) * frames + done) / (frames * passes), 1.0))
+    return pipeline, np.concatenate(out)
+
+
+def count_skipped_frames(filter_name, voiced_frames, frames):
+    REGISTRY.counter("filter_skipped_frames_total", "Silent input frames left out of voiced-only renders",
+                     filter=filter_name).inc(frames - voiced_frames)
+
+
+def render_file(input_file, output_file, filter_name, param1=0, param2=0, param3=0, param4=0,
+                impulse_response=None, streaming=False, block_frames=None, progress=None,
+                voiced_only=False, keep_timing=True, chain=None):
+    """Filter ``input_file`` into a 16-bit WAV and return the input duration in seconds; raises on failure.
+
+    With ``streaming`` a PCM WAV input is read, filtered and written in blocks of
+    ``block_frames`` so memory use does not depend on the file length. ``progress``
+    is called with the completed fraction (per block, also while rendering in memory)
+    and may raise to abort the render. ``voiced_only``, ``keep_timing`` and
+    ``chain`` are as for render_filter.
+    """
+    start = time.perf_counter()
+    if streaming:
+        from streaming import stream_filter, is_streamable
+
+        if is_streamable(input_file):
+            duration = stream_filter(input_file, output_file, filter_name, param1, param2, param3, param4,
+                                     impulse_response=impulse_response, block_frames=block_frames,
+                                     progress=progress, voiced_only=voiced_only, keep_timing=keep_timing,
+                                     chain=chain)
+            _observe_render(filter_name, start)
+            return duration
+        print("Input is not a PCM WAV file, rendering it in memory instead.")
+
+    report = progress or (lambda fraction: None)
+    report(0.0)
+    samples, frame_rate = load_audio(input_file)
+    duration = len(samples) / frame_rate
+    report(0.25)
+    samples, frame_rate = render_filter(samples, frame_rate, filter_name, param1, param2, param3, param4,
+                                        impulse_response=impulse_response, voiced_only=voiced_only,
+                                        keep_timing=keep_timing, chain=chain, block_frames=block_frames,
+                                        progress=lambda fraction: report(0.25 + 0.5 * fraction))
+    report(0.75)
+    save_audio(output_file, samples, frame_rate)
+    report(1.0)
+    _observe_render(filter_name, start)
+    return duration
+
+
+def _observe_render(filter_name, start):
+    REGISTRY.histogram("filter_render_seconds", "Time to render a file, decoding and writing included",
+                       RENDER_BUCKETS, filter=filter_name).observe(time.perf_counter() - start)
+
+
+def apply_filter(input_file, output_file, filter_name, param1=0, param2=0, param3=0, param4=0,
+                 impulse_response=None, streaming=False, block_frames=None, voiced_only=False, keep_timing=True,
+                 chain=None):
+    """Applies the selected filter to the audio (see render_file for the options).
+
+    Returns True if the output was written.
+    """
+    print("Loading audio from:", input_file)
+    if not os.path.exists(input_file):
+        print("File does not exist. Check the path or permissions.")
+        return False
+
+    if filter_name not in FILTERS and filter_name not in ("Custom", "Chain"):
         print(f"Unknown filter: {filter_name}")
-        return
+        return False
+
+    try:
+        render_file(input_file, output_file, filter_name, param1, param2, param3, param4,
+                    impulse_response=impulse_response, streaming=streaming, block_frames=block_frames,
+                    voiced_only=voiced_only, keep_timing=keep_timing, chain=chain)
+    except Exception as e:
+        REGISTRY.counter("filter_failures_total", "Renders that raised an error", filter=filter_name).inc()
+        print(f"Failed to apply filter: {e}")
+        return False
 
-    # Export the modified audio
-    audio.export(output_file, format="wav")
+    # The modified audio has been exported
     print(f"Filter '{filter_name}' applied and saved as {output_file}.")
+    return True
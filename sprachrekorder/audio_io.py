@@ -0,0 +1,179 @@
+import os
+import struct
+
+import numpy as np
+
+# Format tags of the WAV fmt chunk
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Stored sample types by (format, bits); 24-bit PCM has no numpy type and is unpacked per range
+_WAV_TYPES = {(WAVE_FORMAT_PCM, 8): np.uint8, (WAVE_FORMAT_PCM, 16): np.dtype("<i2"),
+              (WAVE_FORMAT_PCM, 24): None, (WAVE_FORMAT_PCM, 32): np.dtype("<i4"),
+              (WAVE_FORMAT_IEEE_FLOAT, 32): np.dtype("<f4"), (WAVE_FORMAT_IEEE_FLOAT, 64): np.dtype("<f8")}
+
+# Integer sample types by byte width as decoded by pydub (8-bit is already signed there)
+_SAMPLE_TYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+# Frames per block; a multiple of the convolution partition size keeps echo/reverb output in step
+DEFAULT_BLOCK_FRAMES = 65536
+
+
+class WavFile:
+    """A PCM or float WAV file mapped into memory instead of read.
+
+    Opening only parses the header. ``samples`` is a (frames, channels) view of the
+    data chunk in its stored type, so slicing a channel or a range copies nothing and
+    the pages come from the OS page cache, shared with every other reader of the file.
+    read() converts just the requested range to float32.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        format_tag, channels, frame_rate, block_align, bits, offset, size = _parse_header(path)
+        if (format_tag, bits) not in _WAV_TYPES or channels < 1 or block_align != channels * bits // 8:
+            raise ValueError(f"Unsupported WAV format (tag {format_tag}, {bits} bits): {path}")
+        self.channels = channels
+        self.frame_rate = frame_rate
+        self.sample_width = bits // 8
+        self.frames = size // block_align
+        self.dtype = _WAV_TYPES[format_tag, bits]
+        stored = self.dtype if self.dtype is not None else np.uint8
+        shape = (self.frames, channels) if self.dtype is not None else (self.frames, channels, 3)
+        if self.frames:
+            self._data = np.asarray(np.memmap(path, dtype=stored, mode="r", offset=offset, shape=shape))
+        else:
+            self._data = np.zeros(shape, dtype=stored)  # mmap cannot map zero bytes
+
+    @property
+    def duration(self):
+        return self.frames / self.frame_rate
+
+    @property
+    def samples(self):
+        """(frames, channels) view of the stored samples; 24-bit files are unpacked to int32 (a copy)."""
+        if self.dtype is None:
+            return _unpack24(self._data)
+        return self._data
+
+    def channel(self, index=0):
+        """Samples of one channel (a view)."""
+        return self.samples[:, index]
+
+    def read(self, start=0, stop=None, channels=None):
+        """float32 (frames, channels) in [-1, 1] of frames [start, stop), optionally only some ``channels``."""
+        data = self._data[start:stop]
+        if channels is not None:
+            data = data[:, channels]
+        if self.dtype is None:
+            data = _unpack24(data)
+        samples = to_float32(data)
+        return samples.copy() if np.may_share_memory(samples, self._data) else samples
+
+    def blocks(self, block_frames=DEFAULT_BLOCK_FRAMES, channels=None):
+        """Yield (block, is_last) pairs of float32 audio; a file without frames yields one empty block."""
+        start = 0
+        while True:
+            stop = min(start + block_frames, self.frames)
+            yield self.read(start, stop, channels), stop == self.frames
+            if stop == self.frames:
+                break
+            start = stop
+
+
+def _parse_header(path):
+    """(format_tag, channels, frame_rate, block_align, bits, data_offset, data_size) of a RIFF WAVE file."""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            raise ValueError(f"Not a WAV file: {path}")
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"WAV file without {'fmt' if fmt is None else 'data'} chunk: {path}")
+            name, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+            if name == b"fmt ":
+                body = f.read(size + size % 2)
+                if len(body) < 16:
+                    raise ValueError(f"Truncated WAV fmt chunk: {path}")
+                format_tag, channels, frame_rate, _, block_align, bits = struct.unpack("<HHIIHH", body[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    format_tag = struct.unpack("<H", body[24:26])[0]  # First bytes of the sub-format GUID
+                fmt = (format_tag, channels, frame_rate, block_align, bits)
+            elif name == b"data":
+                if fmt is None:
+                    raise ValueError(f"WAV data before its fmt chunk: {path}")
+                offset = f.tell()
+                # Writers that were cut off leave a size of 0 or past the end of the file
+                if size == 0 or offset + size > file_size:
+                    size = file_size - offset
+                return fmt + (offset, size)
+            else:
+                f.seek(size + size % 2, os.SEEK_CUR)
+
+
+def _unpack24(data):
+    """int32 samples (scaled up by 256, so full scale matches 32-bit PCM) from (..., 3) little-endian bytes."""
+    out = np.zeros(data.shape[:-1] + (4,), dtype=np.uint8)
+    out[..., 1:] = data
+    return out.view("<i4")[..., 0]
+
+
+def open_wav(path):
+    """Map a WAV file; raises ValueError for other formats and OSError if it cannot be read."""
+    return WavFile(path)
+
+
+def is_wav(path):
+    """True for WAV files open_wav() can map."""
+    try:
+        open_wav(path)
+        return True
+    except (ValueError, OSError):
+        return False
+
+
+def to_float32(samples):
+    """(frames, channels) float32 copy or view of float or integer PCM samples."""
+    samples = samples if samples.ndim == 2 else samples[:, None]
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float32) - 128) / np.float32(128)
+    if np.issubdtype(samples.dtype, np.integer):
+        return samples.astype(np.float32) * np.float32(1.0 / (2 ** (8 * samples.dtype.itemsize - 1)))
+    return samples.astype(np.float32, copy=False)
+
+
+def open_audio(path):
+    """(samples, frame_rate) for viewing and playback: WAVs are mapped without copying, other formats decoded."""
+    try:
+        wav = open_wav(path)
+    except ValueError:
+        return load_audio(path)
+    return wav.samples, wav.frame_rate
+
+
+def load_audio(path):
+    """A float32 (frames, channels) buffer in [-1, 1] and its frame rate, for filtering.
+
+    WAVs are converted straight from the mapped file; other formats are decoded with
+    pydub (ffmpeg).
+    """
+    try:
+        wav = open_wav(path)
+    except ValueError:
+        pass
+    else:
+        return wav.read(), wav.frame_rate
+
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(path)
+    if audio.sample_width not in _SAMPLE_TYPES:
+        audio = audio.set_sample_width(2)
+    samples = np.frombuffer(audio.raw_data, dtype=_SAMPLE_TYPES[audio.sample_width])
+    samples = samples.astype(np.float32).reshape(-1, audio.channels)
+    samples *= 1.0 / (2 ** (8 * audio.sample_width - 1))
+    return samples, audio.frame_rate
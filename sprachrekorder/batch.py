@@ -0,0 +1,163 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from audio_filters import FILTER_NAMES, render_file
+from chains import normalize_chain
+from presets import CUSTOM_FILTERS_FILE, load_presets, preset_spec
+
+
+def resolve_filter(name, presets, custom=None, chain=None):
+    """Map a built-in filter or saved preset name to (filter_name, param1, param2, param3, param4, chain)."""
+    if name == "Custom":
+        if custom is None:
+            raise ValueError("'Custom' needs --custom SPEED VOLUME REVERSE")
+        return preset_spec(custom)
+    if name == "Chain":
+        if chain is None:
+            raise ValueError("'Chain' needs --chain STAGES")
+        return preset_spec({"chain": chain})
+    if name in FILTER_NAMES:
+        return name, 0, 0, 0, 0, None
+    if name in presets:
+        return preset_spec(presets[name])
+    raise ValueError(f"Unknown filter or preset: {name}")
+
+
+def expand_inputs(patterns):
+    """Input files matching the given globs (``**`` recurses), deduplicated, in sorted order."""
+    files = set()
+    for pattern in patterns:
+        files.update(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    return sorted(files)
+
+
+def output_path(input_file, output_dir, filter_name):
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    slug = "".join(c if c.isalnum() else "_" for c in filter_name).strip("_").lower()
+    return os.path.join(output_dir, f"{stem}-{slug}.wav")
+
+
+def is_up_to_date(input_file, output_file):
+    return os.path.exists(output_file) and os.path.getmtime(output_file) >= os.path.getmtime(input_file)
+
+
+def _render_one(input_file, output_file, spec, impulse_response, streaming, voiced_only=False, keep_timing=True):
+    """Worker: render one file and return (audio seconds, render seconds)."""
+    filter_name, param1, param2, param3, param4, chain = spec
+    # Write next to the target and rename, so an interrupted run never leaves a complete-looking file
+    partial = output_file + ".partial"
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        duration = render_file(input_file, partial, filter_name, param1, param2, param3, param4,
+                               impulse_response=impulse_response, streaming=streaming,
+                               voiced_only=voiced_only, keep_timing=keep_timing, chain=chain)
+    os.replace(partial, output_file)
+    return duration, time.perf_counter() - start
+
+
+def run(inputs, output_dir, spec, jobs=None, skip_existing=False, impulse_response=None, streaming=True,
+        label=None, voiced_only=False, keep_timing=True):
+    """Render every input on a process pool, printing progress and a throughput summary.
+
+    Returns the number of failed files.
+    """
+    label = label or spec[0]
+    os.makedirs(output_dir, exist_ok=True)
+    targets = {}
+    for input_file in inputs:
+        target = output_path(input_file, output_dir, label)
+        if target in targets.values():
+            print(f"Skipping {input_file}: output name collides with another input ({target})")
+            continue
+        targets[input_file] = target
+
+    todo = [(i, o) for i, o in targets.items() if not (skip_existing and is_up_to_date(i, o))]
+    skipped = len(targets) - len(todo)
+    if skipped:
+        print(f"Skipping {skipped} file(s) with up-to-date output.")
+
+    workers = min(jobs or os.cpu_count() or 1, max(len(todo), 1))
+    failed = 0
+    audio_seconds = 0.0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_render_one, i, o, spec, impulse_response, streaming, voiced_only, keep_timing): (i, o) for i, o in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            input_file, target = futures[future]
+            try:
+                duration, elapsed = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(todo)}] FAILED {input_file}: {e}")
+                with contextlib.suppress(OSError):
+                    os.remove(target + ".partial")
+                continue
+            audio_seconds += duration
+            speed = duration / elapsed if elapsed > 0 else float("inf")
+            print(f"[{done}/{len(todo)}] {input_file} -> {target} ({elapsed:.2f}s, {speed:.1f}x real time)")
+    wall = time.perf_counter() - started
+
+    rendered = len(todo) - failed
+    print(f"Rendered {rendered} file(s), skipped {skipped}, failed {failed} in {wall:.2f}s "
+          f"with {workers} worker(s).")
+    if wall > 0 and rendered:
+        print(f"Throughput: {rendered / wall:.2f} files/s, {audio_seconds / wall:.1f}x real time "
+              f"({audio_seconds:.1f}s of audio).")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a voice filter to many recordings without a display.")
+    parser.add_argument("inputs", nargs="+", help="input files or glob patterns (quote them; ** recurses)")
+    parser.add_argument("-f", "--filter", required=True,
+                        help=f"built-in filter ({', '.join(FILTER_NAMES)}), 'Chain' or a saved preset name")
+    parser.add_argument("-o", "--output-dir", required=True, help="directory for the rendered WAV files")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="resume: skip inputs whose output exists and is newer than the input")
+    parser.add_argument("--presets", default=CUSTOM_FILTERS_FILE, help="custom filter presets JSON")
+    parser.add_argument("--custom", nargs=3, metavar=("SPEED", "VOLUME", "REVERSE"),
+                        help="parameters for the 'Custom' filter, e.g. 30 50 No")
+    parser.add_argument("--pitch", type=float, default=0.0,
+                        help="pitch shift in semitones for the 'Custom' filter (default 0)")
+    parser.add_argument("--chain", type=json.loads,
+                        help="stages of the 'Chain' filter as JSON, e.g. "
+                             "'[{\"type\": \"pitch\", \"semitones\": 3}, {\"type\": \"echo\"}]'")
+    parser.add_argument("--impulse-response", help="IR WAV file for the 'Reverb' filter")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="decode whole files instead of streaming WAV inputs in blocks")
+    parser.add_argument("--voiced-only", action="store_true",
+                        help="filter only the spans with voice; the silence between them is kept as silence")
+    parser.add_argument("--drop-silence", action="store_true",
+                        help="like --voiced-only, but join the voiced spans without the silence")
+    args = parser.parse_args(argv)
+
+    custom = None
+    if args.custom:
+        custom = [float(args.custom[0]), float(args.custom[1]), args.custom[2], args.pitch]
+    try:
+        spec = resolve_filter(args.filter, load_presets(args.presets), custom, args.chain)
+        if spec[0] == "Chain":
+            normalize_chain(spec[5])
+    except ValueError as e:
+        parser.error(str(e))
+
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        print("No input files matched.")
+        return 1
+    failed = run(inputs, args.output_dir, spec, jobs=args.jobs, skip_existing=args.skip_existing,
+                 impulse_response=args.impulse_response, streaming=not args.in_memory, label=args.filter,
+                 voiced_only=args.voiced_only or args.drop_silence, keep_timing=not args.drop_silence)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from audio_filters import save_audio
+
+SIGNALS = ["tone", "noise", "speech"]
+LENGTHS = [1, 10, 60]  # Seconds
+RATES = [16000, 44100, 48000]
+QUICK_LENGTHS = [1, 10]
+QUICK_RATES = [44100]
+# Every branch of apply_filter: (label, filter_name, param1, param2, param3, param4)
+FILTER_CASES = [
+    ("Robot", "Robot", 0, 0, 0, 0),
+    ("Echo", "Echo", 0, 0, 0, 0),
+    ("High Pitch", "High Pitch", 0, 0, 0, 0),
+    ("Reverb", "Reverb", 0, 0, 0, 0),
+    ("Bass Boost", "Bass Boost", 0, 0, 0, 0),
+    ("Custom volume", "Custom", 0, 70, 0, 0),
+    ("Custom speed", "Custom", 30, 50, 0, 0),
+    ("Custom pitch", "Custom", 0, 50, 0, 5),
+    ("Custom reverse", "Custom", 0, 50, 100, 0),
+]
+LIVE_FILTERS = ["Robot", "Echo", "High Pitch", "Reverb", "Bass Boost"]
+BLOCK_SIZES = [64, 256, 1024]
+SEED = 1234
+
+
+def make_signal(kind, seconds, frame_rate, seed=SEED, channels=1):
+    """Deterministic float32 (frames, channels) test input: a tone, white noise or speech-like bursts.
+
+    Further channels get their own seed, like separate microphones.
+    """
+    if channels > 1:
+        return np.hstack([make_signal(kind, seconds, frame_rate, seed + i) for i in range(channels)])
+    rng = np.random.default_rng(seed)
+    frames = int(seconds * frame_rate)
+    t = np.arange(frames) / frame_rate
+    if kind == "tone":
+        signal = 0.5 * np.sin(2 * np.pi * 440 * t)
+    elif kind == "noise":
+        signal = 0.25 * rng.standard_normal(frames)
+    elif kind == "speech":
+        # Voiced syllables (harmonics of a gliding pitch under a hann envelope) separated by pauses
+        signal = np.zeros(frames)
+        start = 0
+        while start < frames:
+            length = int(rng.uniform(0.08, 0.25) * frame_rate)
+            stop = min(start + length, frames)
+            n = np.arange(stop - start) / frame_rate
+            f0 = rng.uniform(100, 220) * (1 + 0.05 * np.sin(2 * np.pi * 5 * n))
+            phase = 2 * np.pi * np.cumsum(f0) / frame_rate
+            harmonics = int(min(20, frame_rate / 2 / f0.max()))
+            voiced = sum(np.sin(k * phase) / k for k in range(1, harmonics + 1))
+            signal[start:stop] = 0.3 * voiced * np.hanning(stop - start)
+            start = stop + int(rng.uniform(0.03, 0.3) * frame_rate)
+    else:
+        raise ValueError(f"Unknown signal: {kind}")
+    return signal.astype(np.float32)[:, None]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB, or None where ``resource`` is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KiB elsewhere
+
+
+def percentiles(values):
+    values = np.asarray(values, dtype=np.float64)
+    return {"p50": float(np.percentile(values, 50)), "p90": float(np.percentile(values, 90)),
+            "p99": float(np.percentile(values, 99)), "max": float(values.max())}
+
+
+def _bench_filter(signal, seconds, frame_rate, case, repeat, streaming, channels=1):
+    """Worker (fresh process per case, so peak RSS is its own): time apply_filter on one input."""
+    from audio_filters import apply_filter
+
+    label, filter_name, param1, param2, param3, param4 = case
+    with tempfile.TemporaryDirectory() as directory:
+        input_file = os.path.join(directory, "input.wav")
+        output_file = os.path.join(directory, "output.wav")
+        save_audio(input_file, make_signal(signal, seconds, frame_rate, channels=channels), frame_rate)
+        baseline = peak_rss_mb()
+        timings = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeat + 1):  # The first run also fills caches (e.g. IR spectra)
+                start = time.perf_counter()
+                ok = apply_filter(input_file, output_file, filter_name, param1, param2, param3, param4,
+                                  streaming=streaming)
+                timings.append(time.perf_counter() - start)
+                if not ok:
+                    raise RuntimeError(f"apply_filter failed for {label}")
+    cold, warm = timings[0], timings[1:]
+    peak = peak_rss_mb()
+    return {
+        "signal": signal, "seconds": seconds, "frame_rate": frame_rate, "filter": label, "channels": channels,
+        "streaming": streaming, "cold_seconds": cold,
+        "latency_seconds": percentiles(warm),
+        "realtime_factor": seconds / float(np.median(warm)),
+        "peak_rss_mb": peak,
+        "rss_growth_mb": peak - baseline if peak is not None else None,
+    }
+
+
+def bench_filters(signals, lengths, rates, cases=FILTER_CASES, repeat=3, streaming=False, channels=(1,)):
+    """Run every filter case on every synthetic input, one at a time in a fresh process each."""
+    results = []
+    grid = [(s, n, r, c, ch) for s in signals for n in lengths for r in rates for ch in channels for c in cases]
+    context = multiprocessing.get_context("spawn")
+    for done, (signal, seconds, frame_rate, case, count) in enumerate(grid, 1):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                result = pool.submit(_bench_filter, signal, seconds, frame_rate, case, repeat, streaming,
+                                     count).result()
+            except Exception as e:
+                print(f"[{done}/{len(grid)}] FAILED {case[0]} on {signal} {seconds}s @ {frame_rate} Hz x{count}: {e}")
+                continue
+        results.append(result)
+        rss = f"{result['peak_rss_mb']:.0f} MiB" if result["peak_rss_mb"] is not None else "n/a"
+        print(f"[{done}/{len(grid)}] {case[0]:<15} {signal:<6} {seconds:>3}s @ {frame_rate:>5} Hz x{count}: "
+              f"{result['realtime_factor']:8.1f}x real time, p90 {result['latency_seconds']['p90'] * 1000:8.1f} ms, "
+              f"peak RSS {rss}")
+    return results
+
+
+def _time_calls(func, blocks):
+    """Per-call wall time in microseconds; prints from ``func`` are discarded but still paid for."""
+    timings = np.empty(len(blocks))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i, block in enumerate(blocks):
+            start = time.perf_counter_ns()
+            func(block)
+            timings[i] = time.perf_counter_ns() - start
+    return timings / 1000.0
+
+
+def _callback_result(kind, block_size, frame_rate, timings, **fields):
+    budget = block_size / frame_rate * 1e6
+    stats = percentiles(timings)
+    result = {"kind": kind, "block": block_size, **fields, "microseconds": stats, "budget_microseconds": budget,
+              "load_p99": stats["p99"] / budget}
+    label = " ".join(f"{name}={value}" for name, value in fields.items())
+    print(f"{kind:<15} {block_size:>5} frames {label:<20} p50 {stats['p50']:8.1f} us, p99 {stats['p99']:8.1f} us, "
+          f"max {stats['max']:8.1f} us ({result['load_p99'] * 100:.1f}% of the block at p99)")
+    return result
+
+
+def bench_live(block_sizes=BLOCK_SIZES, blocks=2000, frames=300, frame_rate=44100):
+    """Cost of AudioPlotter.audio_callback / duplex_callback per block and update_plot per frame.
+
+    Needs a display and the audio libraries (no device is opened); returns [] without them.
+    """
+    try:
+        import tkinter as tk
+        from playback_visualization import AudioPlotter
+        from live_filters import build_live_chain
+
+        root = tk.Tk()
+    except Exception as e:  # No PortAudio, no display (TclError), ...
+        print(f"Skipping the live benchmarks: {e}")
+        return []
+    root.withdraw()
+    results = []
+    rng = np.random.default_rng(SEED)
+    # Timestamps as a duplex stream passes them; the latency itself is irrelevant here
+    stream_time = types.SimpleNamespace(inputBufferAdcTime=0.0, outputBufferDacTime=0.01, currentTime=0.0)
+    try:
+        plotter = AudioPlotter(parent_frame=root, root=root, samplerate=frame_rate)
+        for block_size in block_sizes:
+            data = [(0.1 * rng.standard_normal((block_size, 1))).astype(np.float32) for _ in range(blocks)]
+            for recording in (False, True):
+                plotter.is_recording = recording
+                timings = _time_calls(lambda block: plotter.audio_callback(block, len(block), None, None), data)
+                results.append(_callback_result("audio_callback", block_size, frame_rate, timings,
+                                                recording=recording))
+            plotter.is_recording = False
+            out = np.empty((block_size, 1), dtype=np.float32)
+            for name in LIVE_FILTERS:
+                plotter.monitor = build_live_chain(name, frame_rate, block_size)
+                timings = _time_calls(
+                    lambda block: plotter.duplex_callback(block, out, len(block), stream_time, None), data)
+                results.append(_callback_result("duplex_callback", block_size, frame_rate, timings, filter=name))
+            plotter.monitor = None
+
+        # update_plot per animation frame, after a full draw has cached the background,
+        # without and with the scrolling spectrogram
+        data = [(0.1 * rng.standard_normal((plotter.chunk_size, 1))).astype(np.float32) for _ in range(frames)]
+
+        def frame(block):
+            plotter.ring.write(block)
+            plotter.update_plot()
+
+        for kind, spectrogram in (("update_plot", False), ("update_plot+spec", True)):
+            plotter.set_spectrogram(spectrogram)
+            plotter.canvas.draw()
+            root.update()
+            timings = _time_calls(frame, data)
+            stats = percentiles(timings)
+            budget = 30_000.0  # update_plot reschedules itself every 30 ms
+            results.append({"kind": kind, "block": plotter.chunk_size, "microseconds": stats,
+                            "budget_microseconds": budget, "load_p99": stats["p99"] / budget})
+            print(f"{kind:<15} per frame p50 {stats['p50'] / 1000:.2f} ms, p99 {stats['p99'] / 1000:.2f} ms, "
+                  f"max {stats['max'] / 1000:.2f} ms")
+    finally:
+        root.destroy()
+    return results
+
+
+def bench_capture(seconds=10.0, speed=8.0, xruns=0.0, jitter=0.0, source=None, frame_rate=44100):
+    """Record ``seconds`` of simulated input through AudioPlotter: capture, live plot and save to disk.
+
+    Runs the device ``speed`` times faster than real time (see audio_backend.SimulatedBackend)
+    and reports callback timing, update_plot cost and frames lost. Needs a display
+    (e.g. xvfb-run) but no sound hardware; returns [] without one.
+    """
+    from audio_backend import SimulatedBackend
+
+    try:
+        import tkinter as tk
+        from playback_visualization import AudioPlotter
+
+        root = tk.Tk()
+    except Exception as e:
+        print(f"Skipping the capture benchmark: {e}")
+        return []
+    root.withdraw()
+    backend = SimulatedBackend(source, frame_rate, speed=speed, xruns=xruns, jitter=jitter)
+    try:
+        with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as devnull:
+            plotter = AudioPlotter(parent_frame=root, root=root, samplerate=frame_rate, backend=backend)
+            plotter.recordings_dir = directory
+            plot_timings = []
+            update_plot = plotter.update_plot
+
+            def timed_update_plot():
+                start = time.perf_counter_ns()
+                update_plot()
+                plot_timings.append((time.perf_counter_ns() - start) / 1000.0)
+
+            plotter.update_plot = timed_update_plot  # Rescheduled through root.after like the original
+            with contextlib.redirect_stdout(devnull):
+                plotter.start_recording()
+                stream = plotter.stream
+                blocks = int(np.ceil(seconds * frame_rate / stream.blocksize))
+                while stream.stats.blocks + stream.stats.xruns < blocks and stream.active:
+                    root.update()
+                    time.sleep(0.005)
+                stopped = time.perf_counter()
+                recorder = plotter.recorder
+                plotter.stop_recording()
+                while not recorder.finished:
+                    root.update()
+                    time.sleep(0.005)
+                save_seconds = time.perf_counter() - stopped
+                root.update()
+            stats = stream.stats
+            callbacks = stats.summary(stream.blocksize, frame_rate)
+            expected = stats.blocks * stream.blocksize
+    finally:
+        root.destroy()
+    result = {
+        "kind": "capture", "seconds": seconds, "speed": speed, "xruns_injected": xruns, "jitter": jitter,
+        "callbacks": callbacks,
+        "update_plot_microseconds": percentiles(plot_timings) if plot_timings else None,
+        "expected_frames": expected, "recorded_frames": recorder.frames, "dropped_frames": recorder.dropped,
+        "save_seconds": save_seconds, "error": str(recorder.error) if recorder.error else None,
+    }
+    duration = callbacks.get("duration", {})
+    print(f"capture {seconds:g}s at {speed:g}x: {callbacks['blocks']} callbacks (p99 {duration.get('p99', 0):.1f} us), "
+          f"{stats.xruns} xruns, {recorder.frames}/{expected} frames saved, {recorder.dropped} dropped, "
+          f"saved {save_seconds * 1000:.0f} ms after stop")
+    return [result]
+
+
+def _case_key(result):
+    if result.get("kind") == "capture":
+        return ("capture", result["seconds"], result["speed"], result["xruns_injected"], result["jitter"])
+    if "filter" in result and "signal" in result:
+        return ("filter", result["signal"], result["seconds"], result["frame_rate"], result["filter"],
+                result["streaming"], result.get("channels", 1))
+    return (result["kind"], result["block"], result.get("recording"), result.get("filter"))
+
+
+def compare(previous, current):
+    """Print how each case changed against an earlier results file."""
+    before = {_case_key(r): r for key in ("filters", "live", "capture") for r in previous.get(key, [])}
+    for result in current["filters"]:
+        old = before.get(_case_key(result))
+        if old:
+            change = result["realtime_factor"] / old["realtime_factor"]
+            print(f"{result['filter']:<15} {result['signal']:<6} {result['seconds']:>3}s @ {result['frame_rate']:>5} Hz "
+                  f"x{result['channels']}: "
+                  f"{old['realtime_factor']:.1f}x -> {result['realtime_factor']:.1f}x real time ({change:.2f}x)")
+    for result in current["live"]:
+        old = before.get(_case_key(result))
+        if old:
+            change = old["microseconds"]["p99"] / result["microseconds"]["p99"]
+            print(f"{result['kind']:<15} {result['block']:>5} frames: p99 {old['microseconds']['p99']:.1f} us -> "
+                  f"{result['microseconds']['p99']:.1f} us ({change:.2f}x faster)")
+    for result in current.get("capture", []):
+        old = before.get(_case_key(result))
+        if old and "duration" in old["callbacks"] and "duration" in result["callbacks"]:
+            before_p99, after_p99 = old["callbacks"]["duration"]["p99"], result["callbacks"]["duration"]["p99"]
+            print(f"capture callback: p99 {before_p99:.1f} us -> {after_p99:.1f} us "
+                  f"({before_p99 / after_p99:.2f}x faster), dropped {old['dropped_frames']} -> {result['dropped_frames']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the voice filters and the live audio path.")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="JSON results file (default benchmark.json)")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results file to compare against")
+    parser.add_argument("--quick", action="store_true",
+                        help=f"only {QUICK_LENGTHS} s inputs at {QUICK_RATES} Hz")
+    parser.add_argument("--signals", nargs="+", choices=SIGNALS, default=SIGNALS)
+    parser.add_argument("--lengths", nargs="+", type=float, help=f"input lengths in seconds (default {LENGTHS})")
+    parser.add_argument("--rates", nargs="+", type=int, help=f"sample rates (default {RATES})")
+    parser.add_argument("--filters", nargs="+", help="filter cases to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case after a warm-up run")
+    parser.add_argument("--streaming", action="store_true", help="time the block-streaming path of apply_filter")
+    parser.add_argument("--channels", nargs="+", type=int, default=[1],
+                        help="channel counts of the filter inputs, e.g. 1 2 to compare stereo with mono")
+    parser.add_argument("--skip-filters", action="store_true", help="only run the live benchmarks")
+    parser.add_argument("--skip-live", action="store_true", help="only run the filter benchmarks")
+    parser.add_argument("--capture-seconds", type=float, default=10.0,
+                        help="length of the simulated recording in the capture benchmark (0 skips it)")
+    parser.add_argument("--capture-speed", type=float, default=8.0,
+                        help="simulated device speed relative to real time (0: as fast as possible)")
+    parser.add_argument("--xruns", type=float, default=0.0, help="chance of a simulated xrun per block")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum simulated callback delay in seconds")
+    parser.add_argument("--source", help="audio file fed by the simulated device (default: a generated tone)")
+    args = parser.parse_args(argv)
+
+    lengths = args.lengths or (QUICK_LENGTHS if args.quick else LENGTHS)
+    rates = args.rates or (QUICK_RATES if args.quick else RATES)
+    cases = FILTER_CASES
+    if args.filters:
+        cases = [case for case in FILTER_CASES if case[0] in args.filters]
+        if not cases:
+            parser.error(f"no filter cases match; choose from {', '.join(case[0] for case in FILTER_CASES)}")
+
+    results = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "filters": [],
+        "live": [],
+        "capture": [],
+    }
+    if not args.skip_filters:
+        results["filters"] = bench_filters(args.signals, lengths, rates, cases, args.repeat, args.streaming,
+                                           args.channels)
+    if not args.skip_live:
+        results["live"] = bench_live()
+        if args.capture_seconds:
+            results["capture"] = bench_capture(args.capture_seconds, args.capture_speed, args.xruns, args.jitter,
+                                               args.source)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {args.output}.")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
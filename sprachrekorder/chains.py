@@ -0,0 +1,140 @@
+from itertools import groupby
+
+from audio_filters import (CompressorStage, ConvolveStage, FadeStage, FilterPipeline, GainStage, LowPassCascadeStage,
+                           LowPassStage, ModulateStage, MultiplyStage, NormalizeStage, PitchShiftStage, ReverseStage,
+                           TimeStretchStage, db_to_gain)
+from convolution import get_spectra
+
+# Stage types a chain can use, with their parameters and defaults. A chain is a list of
+# {"type": ..., parameter: value, ...} dicts, run in order.
+STAGE_TYPES = {
+    "speed": {"percent": 0},
+    "pitch": {"semitones": 0},
+    "echo": {},
+    "reverb": {"impulse_response": None},
+    "lowpass": {"cutoff": 1000},
+    "gain": {"db": 0},
+    "modulation": {"frequency": 50, "depth": 0.5},
+    "compressor": {"threshold": -20, "ratio": 4},
+    "normalize": {},
+    "fade": {"in_ms": 0, "out_ms": 0},
+    "reverse": {},
+}
+
+# Stages that act on each frame alone and the same way at any time, so a reverse can move past them
+_POINTWISE = {"gain", "normalize"}
+
+
+def _check(step, name, valid, requirement):
+    value = step[name]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not valid(value):
+        raise ValueError(f"{step['type'].capitalize()} {name} must be {requirement}, not {value!r}")
+
+
+def normalize_chain(chain, frame_rate=None):
+    """Copy of ``chain`` with every parameter filled in; raises ValueError for unknown types or parameters.
+
+    Parameters the stages cannot run with are rejected too; low-pass cutoffs are only
+    checked against the Nyquist frequency when ``frame_rate`` is given.
+    """
+    steps = []
+    for step in chain:
+        if not isinstance(step, dict) or step.get("type") not in STAGE_TYPES:
+            raise ValueError(f"Unknown chain stage: {step!r}")
+        defaults = STAGE_TYPES[step["type"]]
+        unknown = set(step) - set(defaults) - {"type"}
+        if unknown:
+            raise ValueError(f"Unknown parameters for '{step['type']}': {', '.join(sorted(unknown))}")
+        step = {"type": step["type"], **defaults, **step}
+        if step["type"] == "speed":
+            # -100 % would stop the signal (a stretch rate of 0) and less would run it backwards
+            _check(step, "percent", lambda value: value > -100, "a number above -100")
+        elif step["type"] == "lowpass" and frame_rate:
+            _check(step, "cutoff", lambda value: 0 < value < frame_rate / 2,
+                   f"a frequency between 0 and {frame_rate / 2:g} Hz")
+        elif step["type"] == "lowpass":
+            _check(step, "cutoff", lambda value: value > 0, "a frequency above 0 Hz")
+        elif step["type"] == "compressor":
+            _check(step, "ratio", lambda value: value >= 1, "a number of at least 1")
+        steps.append(step)
+    return steps
+
+
+def _move_reverses(steps):
+    """Move each reverse past the pointwise stages after it; two reverses that meet cancel out."""
+    planned = []
+    for step in steps:
+        if step["type"] == "reverse" and planned and planned[-1]["type"] == "reverse":
+            planned.pop()
+        elif step["type"] in _POINTWISE and planned and planned[-1]["type"] == "reverse":
+            planned.insert(len(planned) - 1, step)
+        else:
+            planned.append(step)
+    return planned
+
+
+def _make_stage(step, frame_rate, channels, total_frames, impulse_response):
+    kind = step["type"]
+    if kind == "speed":
+        return TimeStretchStage(1 + step["percent"] / 100.0, channels, total_frames)
+    if kind == "pitch":
+        return PitchShiftStage(2 ** (step["semitones"] / 12.0), channels, total_frames)
+    if kind == "echo":
+        return ConvolveStage(get_spectra("Echo", frame_rate), channels, total_frames)
+    if kind == "reverb":
+        path = step["impulse_response"] or impulse_response
+        # A loaded room response keeps its decay after the input ends, as in the "Reverb" filter
+        return ConvolveStage(get_spectra(path or "Reverb", frame_rate), channels, total_frames, tail=bool(path))
+    if kind == "lowpass":
+        return LowPassStage(frame_rate, step["cutoff"])
+    if kind == "gain":
+        return GainStage(db_to_gain(step["db"]))
+    if kind == "modulation":
+        return ModulateStage(step["frequency"], frame_rate, step["depth"])
+    if kind == "compressor":
+        return CompressorStage(frame_rate, step["threshold"], step["ratio"])
+    if kind == "normalize":
+        return NormalizeStage()
+    return FadeStage(frame_rate, step["in_ms"], step["out_ms"], total_frames)
+
+
+def _fuse_group(stage):
+    if isinstance(stage, (GainStage, ModulateStage)):
+        return MultiplyStage
+    if isinstance(stage, LowPassStage):
+        return LowPassCascadeStage
+    return None
+
+
+def fuse_stages(stages):
+    """Replace runs of gains and modulations by one MultiplyStage and runs of low-passes by one cascade."""
+    fused = []
+    for group, run in groupby(stages, key=_fuse_group):
+        run = list(run)
+        fused.extend(run if group is None or len(run) == 1 else [group(run)])
+    return fused
+
+
+def build_chain(chain, frame_rate, channels, total_frames, impulse_response=None, fuse=True):
+    """FilterPipeline running ``chain`` over a signal of known length in one pass.
+
+    ``impulse_response`` is used by "reverb" stages that do not name their own. With
+    ``fuse`` compatible neighbouring stages are merged (see fuse_stages) and reverses
+    are moved towards the end, where the last one becomes the pipeline's reverse flag;
+    the result is the same up to float rounding.
+    """
+    steps = normalize_chain(chain, frame_rate)
+    if fuse:
+        steps = _move_reverses(steps)
+    reverse = bool(steps) and steps[-1]["type"] == "reverse"
+    if reverse:
+        steps = steps[:-1]
+    stages = []
+    for step in steps:
+        if step["type"] == "reverse":
+            stages.append(ReverseStage())
+            continue
+        stage = _make_stage(step, frame_rate, channels, total_frames, impulse_response)
+        total_frames = getattr(stage, "total_out", total_frames)
+        stages.append(stage)
+    return FilterPipeline(fuse_stages(stages) if fuse else stages, frame_rate, reverse)
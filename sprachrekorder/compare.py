@@ -0,0 +1,116 @@
+import contextlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from audio_filters import FILTER_NAMES, render_filter, save_audio
+from audio_io import DEFAULT_BLOCK_FRAMES, to_float32
+from presets import preset_spec
+from render_worker import RenderCancelled
+
+_source = None  # Worker: (shared memory, read-only samples view, frame_rate)
+_cancelled = None  # Worker: event set by render_all to stop the running renders
+
+
+def comparison_specs(presets):
+    """(label, (filter_name, param1, param2, param3, param4, chain)) for every built-in filter and saved preset."""
+    specs = [(name, (name, 0, 0, 0, 0, None)) for name in FILTER_NAMES if name != "Custom"]
+    specs += [(name, preset_spec(params)) for name, params in presets.items()]
+    return specs
+
+
+@contextlib.contextmanager
+def shared_source(samples, block_frames=DEFAULT_BLOCK_FRAMES):
+    """Copy a (frames, channels) buffer as float32 into a new shared memory block; yields the block.
+
+    Integer PCM (e.g. a memory-mapped WAV) is converted block by block on the way in,
+    so no full-size float32 copy is made in this process.
+    """
+    shape = (len(samples), samples.shape[1])
+    block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 4, 1))
+    try:
+        shared = np.ndarray(shape, dtype=np.float32, buffer=block.buf)
+        for start in range(0, len(samples), block_frames):
+            shared[start:start + block_frames] = to_float32(samples[start:start + block_frames])
+        yield block
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _attach(name, shape, frame_rate, cancelled):
+    """Worker initializer: map the shared source once per process."""
+    global _source, _cancelled
+    block = shared_memory.SharedMemory(name=name)
+    samples = np.ndarray(shape, dtype=np.float32, buffer=block.buf)
+    samples.flags.writeable = False
+    _source = (block, samples, frame_rate)
+    _cancelled = cancelled
+
+
+def _check_cancelled(fraction):
+    if _cancelled.is_set():
+        raise RenderCancelled()
+
+
+def _render_shared(spec, impulse_response, output_file):
+    """Worker: render the shared source with one filter spec into ``output_file``."""
+    _, samples, frame_rate = _source
+    filter_name, param1, param2, param3, param4, chain = spec
+    with contextlib.redirect_stdout(io.StringIO()):
+        rendered, rate = render_filter(samples, frame_rate, filter_name, param1, param2, param3, param4,
+                                       impulse_response=impulse_response, chain=chain,
+                                       progress=_check_cancelled)
+    save_audio(output_file, rendered, rate)
+    return output_file
+
+
+def render_all(samples, frame_rate, jobs, impulse_response=None, workers=None, progress=None, poll_seconds=0.1):
+    """Render one decoded source with many filters at once, one process per filter.
+
+    ``samples`` is a (frames, channels) float or integer PCM buffer; it is copied into
+    shared memory as float32 once and every worker reads it from there instead of
+    decoding or pickling it. ``jobs`` maps a label to (spec, output_file). Returns {label: output_file} for the renders that
+    succeeded, printing the failures. ``progress`` is called with the completed fraction
+    and may raise to cancel: queued renders are dropped, running ones stop at their
+    next block, and the partial outputs are removed once the workers are idle.
+    """
+    report = progress or (lambda fraction: None)
+    report(0.0)
+    results = {}
+    if not jobs:
+        return results
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    with shared_source(samples) as block:
+        shape = (len(samples), samples.shape[1])
+        # Spawned, not forked: this runs on a worker thread of a process with live Tk and audio streams
+        context = multiprocessing.get_context("spawn")
+        cancelled = context.Event()
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_attach,
+                                   initargs=(block.name, shape, frame_rate, cancelled))
+        try:
+            futures = {pool.submit(_render_shared, spec, impulse_response, output_file): label
+                       for label, (spec, output_file) in jobs.items()}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=poll_seconds, return_when=FIRST_COMPLETED)
+                for future in done:
+                    label = futures[future]
+                    try:
+                        results[label] = future.result()
+                    except Exception as e:
+                        print(f"Failed to apply '{label}': {e}")
+                report((len(futures) - len(pending)) / len(futures))
+        except BaseException:
+            cancelled.set()
+            pool.shutdown(cancel_futures=True)  # Only waits for the running renders to reach their next block
+            for _, output_file in jobs.values():
+                with contextlib.suppress(OSError):
+                    os.remove(output_file)
+            raise
+        pool.shutdown()
+    return results
@@ -0,0 +1,157 @@
+import os
+from functools import lru_cache
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft
+
+DEFAULT_BLOCK_SIZE = 4096
+# Blocks transformed per batch by PartitionedConvolver; bounds the size of the spectra in memory
+BATCH_BLOCKS = 64
+
+
+def echo_impulse_response(frame_rate, delay_ms=300, decay_db=-10):
+    """Dry signal plus a single attenuated tap."""
+    delay = int(frame_rate * delay_ms / 1000)
+    ir = np.zeros((delay + 1, 1), dtype=np.float32)
+    ir[0] = 1.0
+    ir[delay] += 10.0 ** (-abs(decay_db) / 20.0)
+    return ir
+
+
+def reverb_impulse_response(frame_rate, initial_delay_ms=20, decay_db=-5, reflections_count=10,
+                            max_reflection_delay=150, step_ms=20):
+    """Dry signal plus a train of reflections, each quieter than the one before."""
+    delays = []
+    delay_ms = initial_delay_ms
+    for i in range(reflections_count):
+        delays.append((int(frame_rate * delay_ms / 1000), 10.0 ** (-abs(decay_db * (i + 1)) / 20.0)))
+        delay_ms = min(delay_ms + step_ms, max_reflection_delay)
+    ir = np.zeros((max(d for d, _ in delays) + 1, 1), dtype=np.float32)
+    ir[0] = 1.0
+    for delay, gain in delays:
+        ir[delay] += gain
+    return ir
+
+
+def read_impulse_response(path, frame_rate):
+    """Load an IR audio file as float32 (frames, channels), resampled to ``frame_rate`` and peak-normalized."""
+    from audio_io import load_audio
+    from scipy.signal import resample_poly
+
+    data, ir_rate = load_audio(path)
+    if ir_rate != frame_rate:
+        g = np.gcd(int(ir_rate), int(frame_rate))
+        data = resample_poly(data, frame_rate // g, ir_rate // g, axis=0).astype(np.float32)
+    peak = np.max(np.abs(data)) if len(data) else 0
+    if peak > 0:
+        data /= peak
+    return data
+
+
+def impulse_response_key(impulse_response):
+    """Cache key for an IR: a built-in name, or a file path with its size and mtime."""
+    if impulse_response in ("Echo", "Reverb"):
+        return ("builtin", impulse_response)
+    path = os.path.abspath(impulse_response)
+    stat = os.stat(path)
+    return ("file", path, stat.st_size, stat.st_mtime)
+
+
+@lru_cache(maxsize=16)
+def _spectra(key, frame_rate, block_size):
+    if key == ("builtin", "Echo"):
+        ir = echo_impulse_response(frame_rate)
+    elif key == ("builtin", "Reverb"):
+        ir = reverb_impulse_response(frame_rate)
+    else:
+        ir = read_impulse_response(key[1], frame_rate)
+    return impulse_response_spectra(ir, block_size)
+
+
+def get_spectra(impulse_response, frame_rate, block_size=DEFAULT_BLOCK_SIZE):
+    """Partition spectra for a built-in IR name or an IR file, cached per IR and frame rate."""
+    return _spectra(impulse_response_key(impulse_response), int(frame_rate), block_size)
+
+
+def impulse_response_spectra(ir, block_size=DEFAULT_BLOCK_SIZE):
+    """Split an IR into block_size partitions and return their spectra as (partitions, channels, bins)."""
+    partitions = max(-(-len(ir) // block_size), 1)
+    padded = np.zeros((partitions * block_size, ir.shape[1]), dtype=np.float32)
+    padded[:len(ir)] = ir
+    parts = padded.reshape(partitions, block_size, -1).transpose(0, 2, 1)
+    spectra = fft.rfft(parts, n=2 * block_size, axis=-1).astype(np.complex64)
+    spectra.setflags(write=False)
+    return spectra
+
+
+class PartitionedConvolver:
+    """Uniform-partitioned overlap-save convolution that carries its state between calls."""
+
+    def __init__(self, spectra, channels):
+        self.spectra = spectra
+        self.block_size = spectra.shape[-1] - 1
+        partitions = spectra.shape[0]
+        self.channels = max(channels, spectra.shape[1])
+        # Previous input block (time domain) and past input spectra (frequency-domain delay line)
+        self._last_block = np.zeros((self.block_size, channels), dtype=np.float32)
+        self._history = np.zeros((partitions - 1, channels, self.block_size + 1), dtype=np.complex64)
+
+    def process(self, samples):
+        """Convolve the next frames; ``len(samples)`` must be a multiple of the block size."""
+        size = self.block_size
+        blocks = len(samples) // size
+        out = np.empty((blocks * size, self.channels), dtype=np.float32)
+        for start in range(0, blocks, BATCH_BLOCKS):
+            count = min(BATCH_BLOCKS, blocks - start)
+            out[start * size:(start + count) * size] = self._process_blocks(samples[start * size:(start + count) * size])
+        return out
+
+    def _process_blocks(self, samples):
+        size = self.block_size
+        blocks = len(samples) // size
+        window = np.concatenate((self._last_block, samples))
+        frames = sliding_window_view(window, 2 * size, axis=0)[::size]
+        spectra = np.concatenate((self._history, fft.rfft(frames, axis=-1)))
+
+        partitions = self.spectra.shape[0]
+        acc = np.zeros((blocks, self.channels, size + 1), dtype=np.complex64)
+        for p in range(partitions):
+            start = partitions - 1 - p
+            acc += self.spectra[p] * spectra[start:start + blocks]
+        out = fft.irfft(acc, n=2 * size, axis=-1)[..., size:]
+
+        self._history = spectra[blocks:].copy()
+        self._last_block = window[-size:].copy()
+        return out.transpose(0, 2, 1).reshape(blocks * size, self.channels)
+
+
+class StreamingConvolver:
+    """Accepts blocks of any length, emits output as full partitions complete and flushes on the last one."""
+
+    def __init__(self, spectra, channels, total_frames, tail=False):
+        self._convolver = PartitionedConvolver(spectra, channels)
+        self.channels = self._convolver.channels
+        self.total_out = total_frames + (spectra.shape[0] * self._convolver.block_size if tail else 0)
+        self._pending = np.zeros((0, channels), dtype=np.float32)
+        self._emitted = 0
+
+    def process(self, block, final=False):
+        size = self._convolver.block_size
+        pending = np.concatenate((self._pending, block)) if len(self._pending) else block
+        if final:
+            needed = -(-(self.total_out - self._emitted) // size) * size
+            if len(pending) < needed:
+                padded = np.zeros((needed, pending.shape[1]), dtype=np.float32)
+                padded[:len(pending)] = pending
+                pending = padded
+        usable = len(pending) // size * size
+        out = self._convolver.process(pending[:usable])
+        self._pending = pending[usable:].copy()
+        out = out[:self.total_out - self._emitted]
+        self._emitted += len(out)
+        return out
+
+
+def convolve(samples, spectra, tail=False):
+    """Convolve a whole (frames, channels) buffer, keeping its length or appending the IR tail."""
+    return StreamingConvolver(spectra, samples.shape[1], len(samples), tail).process(samples, final=True)
@@ -0,0 +1,300 @@
+import numpy as np
+
+from audio_filters import db_to_gain
+from convolution import get_spectra
+
+DEFAULT_LIVE_BLOCK = 256
+
+
+class LiveGain:
+    delay = 0
+
+    def __init__(self, gain):
+        self.gain = np.float32(gain)
+
+    def process(self, buf):
+        buf *= self.gain
+
+
+class LiveRingModulator:
+    """ModulateStage for live blocks: sine amplitude modulation into preallocated scratch."""
+
+    delay = 0
+
+    def __init__(self, frequency, frame_rate, max_block, depth=0.5):
+        self.step = 2 * np.pi * frequency / frame_rate
+        self.depth = depth
+        self._phase = 0.0
+        self._n = np.arange(max_block, dtype=np.float64)
+        self._envelope = np.empty(max_block, dtype=np.float64)
+
+    def process(self, buf):
+        frames = len(buf)
+        envelope = self._envelope[:frames]
+        np.multiply(self._n[:frames], self.step, out=envelope)
+        envelope += self._phase
+        np.sin(envelope, out=envelope)
+        envelope *= self.depth
+        envelope += 1.0 - self.depth
+        np.multiply(buf, envelope[:, None], out=buf, casting="same_kind")
+        self._phase = (self._phase + frames * self.step) % (2 * np.pi)
+
+
+class LiveLowPass:
+    """LowPassStage for live blocks, into preallocated scratch.
+
+    Over ``chunk`` frames the one-pole recursion is a product with a fixed
+    lower-triangular matrix of decay powers, plus the decayed last output carried in.
+    """
+
+    delay = 0
+
+    def __init__(self, frame_rate, cutoff, channels=1, chunk=64):
+        rc = 1.0 / (cutoff * 2 * np.pi)
+        dt = 1.0 / frame_rate
+        self.alpha = dt / (rc + dt)
+        n = np.arange(chunk)
+        lag = n[:, None] - n
+        decay = (1.0 - self.alpha) ** np.maximum(lag, 0)
+        self._response = np.where(lag >= 0, self.alpha * decay, 0.0).astype(np.float32)
+        self._carry = ((1.0 - self.alpha) ** (n + 1)).astype(np.float32)[:, None]
+        self._last = np.zeros((1, channels), dtype=np.float32)
+        self._out = np.empty((chunk, channels), dtype=np.float32)
+        self._tail = np.empty((chunk, channels), dtype=np.float32)
+
+    def process(self, buf):
+        chunk = len(self._out)
+        for start in range(0, len(buf), chunk):
+            block = buf[start:start + chunk]
+            frames = len(block)
+            out, tail = self._out[:frames], self._tail[:frames]
+            np.matmul(self._response[:frames, :frames], block, out=out)
+            np.multiply(self._carry[:frames], self._last, out=tail)
+            out += tail
+            block[:] = out
+            self._last[:] = out[-1:]
+
+
+class LivePitchShift:
+    """Delay-line pitch shifter for live input.
+
+    Two read taps sweep a short delay window at a speed set by the pitch ratio and
+    crossfade with complementary sin² windows, so one tap is silent while it wraps.
+    Adds about half a window (``delay`` frames) of latency.
+    """
+
+    def __init__(self, ratio, frame_rate, max_block, channels=1, window_ms=20):
+        self.window = max(int(frame_rate * window_ms / 1000), 2)
+        self.delay = 1 + self.window // 2
+        self._slope = (1.0 - ratio) / self.window  # Delay phase change per frame
+        size = 1 << int(np.ceil(np.log2(self.window + max_block + 2)))
+        self._mask = size - 1
+        self._history = np.zeros((size, channels), dtype=np.float32)
+        self._written = 0
+        self._phase = 0.0
+        self._n = np.arange(max_block, dtype=np.float64)
+        # Scratch, so processing a block does not allocate per tap
+        self._sweep = np.empty(max_block)
+        self._tap = np.empty(max_block)
+        self._pos = np.empty(max_block)
+        self._frac = np.empty(max_block)
+        self._index = np.empty(max_block, dtype=np.int64)
+        self._a = np.empty((max_block, channels), dtype=np.float32)
+        self._b = np.empty((max_block, channels), dtype=np.float32)
+        self._acc = np.empty((max_block, channels), dtype=np.float32)
+
+    def process(self, buf):
+        frames = len(buf)
+        size = self._mask + 1
+        start = self._written & self._mask
+        first = min(frames, size - start)
+        self._history[start:start + first] = buf[:first]
+        self._history[:frames - first] = buf[first:]
+
+        sweep = self._sweep[:frames]
+        np.multiply(self._n[:frames], self._slope, out=sweep)
+        sweep += self._phase
+        np.mod(sweep, 1.0, out=sweep)
+        acc = self._acc[:frames]
+        acc.fill(0)
+        tap, pos, frac, index = self._tap[:frames], self._pos[:frames], self._frac[:frames], self._index[:frames]
+        a, b = self._a[:frames], self._b[:frames]
+        for offset in (0.0, 0.5):
+            np.add(sweep, offset, out=tap)
+            np.mod(tap, 1.0, out=tap)
+            # Read position: this frame's write position minus a delay of 1 .. window + 1 frames
+            np.multiply(tap, -self.window, out=pos)
+            pos += self._n[:frames]
+            pos += self._written - 1
+            np.floor(pos, out=frac)
+            np.subtract(pos, frac, out=frac)
+            np.subtract(pos, frac, out=pos)
+            index[:] = pos
+            np.bitwise_and(index, self._mask, out=index)
+            np.take(self._history, index, axis=0, out=a)
+            index += 1
+            np.bitwise_and(index, self._mask, out=index)
+            np.take(self._history, index, axis=0, out=b)
+            b -= a
+            np.multiply(b, frac[:, None], out=b, casting="same_kind")
+            a += b
+            # sin²(πp) for one tap and cos²(πp) for the other sum to one
+            np.multiply(tap, np.pi, out=tap)
+            np.sin(tap, out=tap)
+            np.square(tap, out=tap)
+            np.multiply(a, tap[:, None], out=a, casting="same_kind")
+            acc += a
+        buf[:] = acc
+        self._written += frames
+        self._phase = (self._phase + frames * self._slope) % 1.0
+
+
+class LiveConvolver:
+    """Uniform-partitioned convolution with one partition per live block.
+
+    Like PartitionedConvolver, but the frequency-domain delay line is circular and the
+    block's output is a single sum over partitions, so a callback does one FFT pair.
+    ``len(buf)`` must be a multiple of the block size, which is why the duplex stream
+    is opened with a fixed block size.
+    """
+
+    delay = 0
+
+    def __init__(self, spectra, channels=1):
+        partitions, _, bins = spectra.shape
+        self.block_size = bins - 1
+        self.channels = channels
+        # Double precision throughout: numpy's float32 FFTs allocate a work buffer per call
+        self._spectra = (spectra[:, :1] if spectra.shape[1] != channels else spectra).astype(np.complex128)
+        self._fdl = np.zeros((partitions, channels, bins), dtype=np.complex128)
+        self._head = 0
+        # Scratch, channels first so the FFTs run along contiguous rows into it
+        self._frame = np.zeros((channels, 2 * self.block_size))
+        self._acc = np.empty((channels, bins), dtype=np.complex128)
+        self._older = np.empty((channels, bins), dtype=np.complex128)
+        self._out = np.empty((channels, 2 * self.block_size))
+
+    def process(self, buf):
+        size = self.block_size
+        frame, acc, older = self._frame, self._acc, self._older
+        for start in range(0, len(buf) - size + 1, size):
+            block = buf[start:start + size]
+            for row in frame:
+                row[:size] = row[size:]  # Row by row: a 2-D shift would look overlapping and be copied first
+            frame[:, size:] = block.T
+            partitions = len(self._fdl)
+            head = self._head = (self._head + 1) % partitions
+            np.fft.rfft(frame, axis=-1, out=self._fdl[head])
+            # Partition p meets the block from p callbacks ago
+            np.einsum("pcb,pcb->cb", self._spectra[:head + 1], self._fdl[head::-1], out=acc)
+            if head + 1 < partitions:
+                np.einsum("pcb,pcb->cb", self._spectra[head + 1:], self._fdl[:head:-1], out=older)
+                acc += older
+            np.fft.irfft(acc, n=2 * size, axis=-1, out=self._out)
+            block[:] = self._out[:, size:].T
+
+
+class LiveChain:
+    """Stages applied in place to each (frames, channels) block of a duplex stream callback."""
+
+    def __init__(self, stages, frame_rate, max_block):
+        self.stages = stages
+        self.frame_rate = frame_rate
+        self.max_block = max_block
+
+    @property
+    def delay(self):
+        """Latency the stages add on top of the audio device, in seconds."""
+        return sum(stage.delay for stage in self.stages) / self.frame_rate
+
+    def process(self, indata, outdata):
+        outdata[:] = indata[:, :outdata.shape[1]]
+        for start in range(0, len(outdata), self.max_block):
+            buf = outdata[start:start + self.max_block]
+            for stage in self.stages:
+                stage.process(buf)
+
+
+def build_live_chain(filter_name, frame_rate, block_size=DEFAULT_LIVE_BLOCK, channels=1, param1=0, param2=0,
+                     param3=0, param4=0, impulse_response=None, chain=None):
+    """Live counterpart of build_pipeline for monitoring.
+
+    Pitch filters use a delay-line shifter instead of resampling, "Robot" skips the
+    normalization and compression (they need the whole take) and "Custom" applies
+    only its pitch and volume, since speed and reverse cannot run in real time. "Chain"
+    likewise keeps only the stages that can run live. Unknown names pass the input through.
+    """
+    if filter_name == "Robot":
+        stages = [LivePitchShift(2 ** -0.5, frame_rate, block_size, channels),
+                  LiveRingModulator(50, frame_rate, block_size)]
+    elif filter_name == "High Pitch":
+        stages = [LivePitchShift(2 ** 0.5, frame_rate, block_size, channels)]
+    elif filter_name == "Echo":
+        stages = [LiveConvolver(get_spectra("Echo", frame_rate, block_size), channels)]
+    elif filter_name == "Reverb":
+        stages = [LiveConvolver(get_spectra(impulse_response or "Reverb", frame_rate, block_size), channels)]
+    elif filter_name == "Bass Boost":
+        speed_factor = 1.2
+        # Low-pass at the input rate, then pitch down by the offline filter's playback slow-down
+        stages = [LiveLowPass(frame_rate, 150 * speed_factor, channels),
+                  LivePitchShift(1 / speed_factor, frame_rate, block_size, channels),
+                  LiveGain(db_to_gain(1.5))]
+    elif filter_name == "Custom":
+        stages = [LiveGain(db_to_gain(param2 - 50))]
+        if param4:
+            stages.insert(0, LivePitchShift(2 ** (param4 / 12.0), frame_rate, block_size, channels))
+    elif filter_name == "Chain":
+        stages = live_chain_stages(chain or [], frame_rate, block_size, channels, impulse_response)
+    else:
+        stages = []
+    return LiveChain(stages, frame_rate, block_size)
+
+
+def live_chain_stages(chain, frame_rate, block_size, channels=1, impulse_response=None):
+    """Live stages for the pitch, echo, reverb, low-pass, gain and modulation stages of a chain."""
+    from chains import normalize_chain
+
+    stages = []
+    for step in normalize_chain(chain, frame_rate):
+        kind = step["type"]
+        if kind == "pitch" and step["semitones"]:
+            stages.append(LivePitchShift(2 ** (step["semitones"] / 12.0), frame_rate, block_size, channels))
+        elif kind == "echo":
+            stages.append(LiveConvolver(get_spectra("Echo", frame_rate, block_size), channels))
+        elif kind == "reverb":
+            response = step["impulse_response"] or impulse_response or "Reverb"
+            stages.append(LiveConvolver(get_spectra(response, frame_rate, block_size), channels))
+        elif kind == "lowpass":
+            stages.append(LiveLowPass(frame_rate, step["cutoff"], channels))
+        elif kind == "gain":
+            stages.append(LiveGain(db_to_gain(step["db"])))
+        elif kind == "modulation":
+            stages.append(LiveRingModulator(step["frequency"], frame_rate, block_size, step["depth"]))
+    return stages
+
+
+class LatencyMeter:
+    """Round-trip latency of a duplex stream: output DAC time minus input ADC time per callback."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.last = 0.0
+        self.low = float("inf")
+        self.high = 0.0
+        self._total = 0.0
+
+    def add(self, seconds):
+        if seconds <= 0:
+            return  # Host API without timestamps
+        self.count += 1
+        self.last = seconds
+        self.low = min(self.low, seconds)
+        self.high = max(self.high, seconds)
+        self._total += seconds
+
+    @property
+    def mean(self):
+        return self._total / self.count if self.count else 0.0
@@ -1,34 +1,41 @@
+import contextlib
 import os
 import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog, simpledialog, messagebox
-import json
-import numpy as np
-import sounddevice as sd
-from scipy.io.wavfile import write
-from audio_filters import apply_filter
-from pydub.playback import play
-from pydub import AudioSegment
-from playsound import playsound #switching from pydub to playsound due to access issues
-from playback_visualization import AudioPlotter, get_short_path_name, toggle_recording, visualize_audio_live, save_audio_to_file
-from ttkthemes import ThemedTk
+from audio_backend import get_backend
+from audio_io import load_audio, open_audio, to_float32
+from player import Player
+from presets import CUSTOM_FILTERS_FILE, is_chain, load_presets, reverse_param, save_presets
+from render_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, RenderCache
+from render_worker import RenderWorker
+from waveform import PeakPyramid, file_pyramid
 
 
 
 class VoiceModifierApp:
-    CUSTOM_FILTERS_FILE = "custom_filters.json"
+    CUSTOM_FILTERS_FILE = CUSTOM_FILTERS_FILE
+    RENDER_CACHE_DIR = DEFAULT_CACHE_DIR
+    RENDER_CACHE_MAX_BYTES = DEFAULT_MAX_BYTES
+    # Longer inputs are rendered block by block to the disk cache instead of in memory
+    IN_MEMORY_RENDER_SECONDS = 600
+    # Recording silence options: longest pause kept in ms (None keeps every pause whole, 0 drops them)
+    SILENCE_GAPS = {"Keep": None, "Compress": 500, "Skip": 0}
     def __init__(self, root):
         self.root = root
         self.root.title("Voice Recorder and Modifier")
         self.root.geometry("800x600")
 
-        # Set modern theme for ttk widgets
-        root = ThemedTk(theme="radiance")
-
-
         # Initialize variables
         self.audio_file = None
-        self.modified_audio_file = os.path.join(os.getcwd(), "modified_audio.wav")
+        self.source = None  # (samples, frame_rate) of audio_file once loaded
+        self.rendered = None  # (samples, frame_rate, pyramid) of the last render
+        self.comparisons = {}  # label -> (samples, frame_rate, pyramid, path) from "Render All Filters"
+        self.modified_audio_file = None  # Render cache file of the last render, once written
+        self.player = Player()
+        self.impulse_response = None  # Optional IR WAV used by the "Reverb" filter
+        self.render_cache = RenderCache(self.RENDER_CACHE_DIR, self.RENDER_CACHE_MAX_BYTES)
+        self.worker = RenderWorker(self.root)  # Renders and file loading run off the Tk thread
         self.custom_filters = self.load_custom_filters()
 
         # Add the close confirmation
@@ -42,12 +49,35 @@ class VoiceModifierApp:
         self.left_frame.pack(side="left", fill="y", padx=10, pady=10)
         self.right_frame.pack(side="right", fill="both", expand=True, padx=10, pady=10)
 
-        # Initialize AudioPlotter and embed it in the right frame
-        self.audio_plotter = AudioPlotter(parent_frame=self.right_frame, root=root)
+        # The plot (matplotlib) is embedded in the right frame once the window is up, see audio_plotter
+        self._audio_plotter = None
+        self.metrics_panel = None
+        self.apply_after_recording = False
 
         # Add buttons to the left frame
         self.create_widgets()
+        self.root.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """Load the slower subsystems after the window has been shown."""
+        from metrics import start_exporters
+        from recorder import RECORDINGS_DIR, recover_recordings
+
+        get_backend().start_probe()  # Find the audio devices in the background
+        start_exporters()
+        recover_recordings(RECORDINGS_DIR)  # Not the plotter's, which would build it (and matplotlib) now
 
+    @property
+    def audio_plotter(self):
+        """The waveform plot and input streams, created on first use."""
+        if self._audio_plotter is None:
+            from playback_visualization import AudioPlotter
+
+            self._audio_plotter = AudioPlotter(parent_frame=self.right_frame, root=self.root)
+            self._audio_plotter.on_recording_saved = self.on_recording_saved
+            self._audio_plotter.on_seek = self.seek_audio
+            self.blocksize_var.set(str(self._audio_plotter.monitor_blocksize))
+        return self._audio_plotter
 
     def create_widgets(self):
         # File Selection Section
@@ -55,8 +85,32 @@ class VoiceModifierApp:
         self.select_file_button.pack(side="top", pady=10)
 
         # Recording Section
-        record_button = ttk.Button(self.left_frame, text="Start Recording", command=lambda: toggle_recording(self.audio_plotter, record_button))
-        record_button.pack(side="top", pady=10)
+        self.record_button = ttk.Button(self.left_frame, text="Start Recording", command=self.toggle_recording)
+        self.record_button.pack(side="top", pady=10)
+
+        # Input channels (Auto: what the device offers, up to stereo) and how their lanes are drawn
+        self.channels_frame = ttk.Frame(self.left_frame)
+        self.channels_frame.pack(side="top")
+        ttk.Label(self.channels_frame, text="Channels:").pack(side="left")
+        self.channels_var = tk.StringVar(value="Auto")
+        self.channels_menu = ttk.Combobox(self.channels_frame, textvariable=self.channels_var, width=5,
+                                          values=["Auto", "1", "2", "4", "8"], state="readonly")
+        self.channels_menu.bind("<<ComboboxSelected>>", lambda event: self.update_channels())
+        self.channels_menu.pack(side="left", padx=5)
+        self.stacked_var = tk.BooleanVar(value=True)
+        self.stacked_check = ttk.Checkbutton(self.channels_frame, text="Lanes", variable=self.stacked_var,
+                                             command=lambda: self.audio_plotter.set_stacked(self.stacked_var.get()))
+        self.stacked_check.pack(side="left")
+
+        # What happens to the pauses in a recording (see vad)
+        self.silence_frame = ttk.Frame(self.left_frame)
+        self.silence_frame.pack(side="top", pady=(5, 0))
+        ttk.Label(self.silence_frame, text="Silence:").pack(side="left")
+        self.silence_var = tk.StringVar(value="Keep")
+        self.silence_menu = ttk.Combobox(self.silence_frame, textvariable=self.silence_var, width=9,
+                                         values=list(self.SILENCE_GAPS), state="readonly")
+        self.silence_menu.bind("<<ComboboxSelected>>", lambda event: self.update_silence())
+        self.silence_menu.pack(side="left", padx=5)
 
         # Filter Selection
         self.filter_var = tk.StringVar(self.root)
@@ -92,6 +146,13 @@ class VoiceModifierApp:
         self.slider2 = ttk.Scale(self.custom_frame, from_=0, to=100, orient='horizontal')
         self.slider2.pack()
 
+        # Pitch Slider (semitones, independent of speed)
+        self.pitch_label = ttk.Label(self.custom_frame, text="Pitch (semitones):")
+        self.pitch_label.pack(side="top")
+        self.pitch_slider = ttk.Scale(self.custom_frame, from_=-12, to=12, orient='horizontal')
+        self.pitch_slider.set(0)
+        self.pitch_slider.pack()
+
         # Reverse Option using OptionMenu
         self.reverse_label = ttk.Label(self.custom_frame, text="Reverse:")
         self.reverse_label.pack(side="top")
@@ -101,6 +162,9 @@ class VoiceModifierApp:
         )
         self.reverse_menu.pack(side="top")
 
+        # Impulse response for "Reverb" (Initially Hidden)
+        self.load_ir_button = ttk.Button(self.left_frame, text="Load Impulse Response", command=self.select_impulse_response)
+
         # Save Custom Filter Button (Initially Hidden)
         self.save_custom_button = ttk.Button(self.left_frame, text="Save Current Custom Filter", command=self.save_current_custom_filter)
         self.delete_custom_button = ttk.Button(self.left_frame, text="Delete Selected Custom Filter", command=self.delete_selected_custom_filter)
@@ -108,18 +172,97 @@ class VoiceModifierApp:
         # Apply Filter Button
         self.apply_filter_button = ttk.Button(self.left_frame, text="Apply Filter", command=self.apply_filter)
         self.apply_filter_button.pack(side="top", pady=10)
+        # Filter only the voiced spans of the file; the pauses stay silent
+        self.voiced_only_var = tk.BooleanVar(value=False)
+        self.voiced_only_check = ttk.Checkbutton(self.left_frame, text="Filter voice only",
+                                                 variable=self.voiced_only_var)
+        self.voiced_only_check.pack(side="top")
+        self.render_all_button = ttk.Button(self.left_frame, text="Render All Filters", command=self.render_all)
+        self.render_all_button.pack(side="top", pady=(0, 10))
+
+        # Switch between the renders of "Render All Filters" (Initially Hidden)
+        self.compare_frame = ttk.Frame(self.left_frame)
+        self.compare_label = ttk.Label(self.compare_frame, text="Compare:")
+        self.compare_label.pack(side="left")
+        self.compare_var = tk.StringVar(value="")
+        self.compare_menu = ttk.Combobox(self.compare_frame, textvariable=self.compare_var, width=14,
+                                         state="readonly")
+        self.compare_menu.bind("<<ComboboxSelected>>", lambda event: self.show_comparison(self.compare_var.get()))
+        self.compare_menu.pack(side="left", padx=5)
+
+        # Render status, progress and cancel (progress bar and button only while rendering)
+        self.progress_frame = ttk.Frame(self.left_frame)
+        self.progress_frame.pack(side="top", fill="x")
+        self.status_var = tk.StringVar(value="")
+        self.status_label = ttk.Label(self.progress_frame, textvariable=self.status_var)
+        self.status_label.pack(side="top")
+        self.progress_var = tk.DoubleVar(value=0)
+        self.progress_bar = ttk.Progressbar(self.progress_frame, variable=self.progress_var, maximum=100)
+        self.cancel_button = ttk.Button(self.progress_frame, text="Cancel", command=self.cancel_render)
 
         # Play Audio Button
         self.play_button = ttk.Button(self.left_frame, text="Play Modified Audio", command=self.play_audio)
         self.play_button.pack(side="top", pady=10)
+        self.stop_button = ttk.Button(self.left_frame, text="Stop Playback", command=self.stop_audio)
+        self.stop_button.pack(side="top", pady=10)
 
         # Save Button
         self.save_button = ttk.Button(self.left_frame, text="Save Audio", command=self.save_audio)
         self.save_button.pack(side="top", pady=10)
 
+        # Live monitoring: hear the selected filter on the input while (or without) recording
+        self.monitor_frame = ttk.Frame(self.left_frame)
+        self.monitor_frame.pack(side="top", pady=10)
+        self.monitor_var = tk.BooleanVar(value=False)
+        self.monitor_check = ttk.Checkbutton(self.monitor_frame, text="Monitor", variable=self.monitor_var,
+                                             command=self.toggle_monitoring)
+        self.monitor_check.pack(side="left")
+        self.blocksize_var = tk.StringVar(value="")  # Set with the plotter's block size
+        self.blocksize_menu = ttk.Combobox(self.monitor_frame, textvariable=self.blocksize_var, width=5,
+                                           values=["64", "128", "256", "512", "1024"], state="readonly")
+        self.blocksize_menu.bind("<<ComboboxSelected>>", lambda event: self.update_monitoring())
+        self.blocksize_menu.pack(side="left", padx=5)
+        self.latency_var = tk.StringVar(value="")
+        self.latency_label = ttk.Label(self.left_frame, textvariable=self.latency_var)
+        self.latency_label.pack(side="top")
+
+        # Scrolling spectrogram below the waveform, live and for opened files
+        self.spectrogram_var = tk.BooleanVar(value=False)
+        self.spectrogram_check = ttk.Checkbutton(self.left_frame, text="Spectrogram", variable=self.spectrogram_var,
+                                                 command=self.toggle_spectrogram)
+        self.spectrogram_check.pack(side="top", pady=10)
+
+        # Debug panel with callback, plot and render timings
+        self.metrics_button = ttk.Button(self.left_frame, text="Metrics", command=self.show_metrics)
+        self.metrics_button.pack(side="bottom", pady=10)
+
+    def update_channels(self):
+        value = self.channels_var.get()
+        if not self.audio_plotter.set_channels(None if value == "Auto" else int(value)):
+            self.channels_var.set(str(self.audio_plotter.ring.channels))
+
+    def update_silence(self):
+        self.audio_plotter.silence_gap_ms = self.SILENCE_GAPS[self.silence_var.get()]
+
+    def toggle_spectrogram(self):
+        self.audio_plotter.set_spectrogram(self.spectrogram_var.get())
+
+    def show_metrics(self):
+        from metrics_panel import MetricsPanel
+
+        if self.metrics_panel is not None and self.metrics_panel.is_open:
+            self.metrics_panel.window.lift()
+        else:
+            self.metrics_panel = MetricsPanel(self.root)
+
     def on_filter_change(self, selected_filter):
         """Show or hide custom filter settings based on the selected filter."""
-        if selected_filter == "Custom" or selected_filter in self.custom_filters:
+        if is_chain(self.custom_filters.get(selected_filter)):
+            # Chains are edited in the presets file; there are no sliders for them
+            self.custom_frame.pack_forget()
+            self.save_custom_button.pack_forget()
+            self.delete_custom_button.pack(pady=10)
+        elif selected_filter == "Custom" or selected_filter in self.custom_filters:
             self.custom_frame.pack(pady=10)
             self.save_custom_button.pack(pady=10)
             self.delete_custom_button.pack(pady=10)  # Show delete button
@@ -129,12 +272,74 @@ class VoiceModifierApp:
                 self.slider1.set(params[0])
                 self.slider2.set(params[1])
                 self.reverse_var.set(params[2])
+                self.pitch_slider.set(params[3] if len(params) > 3 else 0)
         else:
             # Hide custom filter controls if not applicable
             self.custom_frame.pack_forget()
             self.save_custom_button.pack_forget()
             self.delete_custom_button.pack_forget()
 
+        if selected_filter == "Reverb":
+            self.load_ir_button.pack(pady=10)
+        else:
+            self.load_ir_button.pack_forget()
+        self.update_monitoring()
+
+    def live_chain(self):
+        """Real-time version of the selected filter for monitoring."""
+        from live_filters import build_live_chain
+
+        selected_filter = self.filter_var.get()
+        blocksize = int(self.blocksize_var.get())
+        rate = self.audio_plotter.samplerate
+        channels = self.audio_plotter.resolve_channels()
+        if is_chain(self.custom_filters.get(selected_filter)):
+            return build_live_chain("Chain", rate, blocksize, channels, impulse_response=self.impulse_response,
+                                    chain=self.custom_filters[selected_filter]["chain"])
+        if selected_filter == "Custom" or selected_filter in self.custom_filters:
+            return build_live_chain("Custom", rate, blocksize, channels, param1=self.slider1.get(),
+                                    param2=self.slider2.get(), param4=self.pitch_slider.get())
+        return build_live_chain(selected_filter, rate, blocksize, channels, impulse_response=self.impulse_response)
+
+    def toggle_monitoring(self):
+        if self.monitor_var.get():
+            self.update_monitoring()
+            self.update_latency()
+        else:
+            self.audio_plotter.stop_monitoring()
+            self.latency_var.set("")
+
+    def update_monitoring(self):
+        """Apply the selected filter and block size to a running monitor."""
+        if not self.monitor_var.get():
+            return
+        try:
+            self.audio_plotter.start_monitoring(self.live_chain(), int(self.blocksize_var.get()))
+        except Exception as e:
+            print(f"Could not start monitoring: {e}")
+            self.monitor_var.set(False)
+
+    def update_latency(self):
+        """Show the measured round-trip latency while monitoring."""
+        if not self.monitor_var.get():
+            return
+        latency = self.audio_plotter.latency
+        monitor = self.audio_plotter.monitor
+        if latency.count:
+            extra = monitor.delay * 1000 if monitor is not None else 0.0
+            self.latency_var.set(f"Latency: {latency.mean * 1000:.1f} ms (max {latency.high * 1000:.1f})"
+                                 f" + {extra:.1f} ms filter")
+        self.root.after(500, self.update_latency)
+
+    def select_impulse_response(self):
+        """Pick an impulse response WAV for the "Reverb" filter (cancel to use the built-in one)."""
+        file_path = filedialog.askopenfilename(
+            title="Select Impulse Response",
+            filetypes=[("WAV Files", "*.wav")]
+        )
+        self.impulse_response = os.path.normpath(file_path) if file_path else None
+        print(f"Impulse response: {self.impulse_response or 'built-in'}")
+
 
     def select_audio_file(self):
         """Handle selecting an audio file and visualizing it."""
@@ -143,52 +348,63 @@ class VoiceModifierApp:
             filetypes=[("Audio Files", "*.wav *.mp3 *.ogg")]
         )
         if file_path:
-            self.audio_file = os.path.normpath(file_path)
+            self.open_audio_file(os.path.normpath(file_path))
             print(f"Selected file: {self.audio_file}")
-            playsound(self.audio_file)
-            
-            # Load the audio file
-        
-            from scipy.io.wavfile import read as wavfile_read
-            try:
-                samplerate, data = wavfile_read(self.audio_file)
-                if data.ndim > 1:  # If stereo, use only one channel
-                    data = data[:, 0]
-                
-                # Check the maximum amplitude before normalization
-                max_amplitude_before = np.max(np.abs(data))
-                print(f"Max amplitude before normalization: {max_amplitude_before}")
-
-                # Normalize the audio data to [-1, 1]
-                data = data / np.max(np.abs(data))
-
-                # Generate time values for the x-axis
-                time_values = np.linspace(0, len(data) / samplerate, num=len(data))
-
-                # Update the plot directly
-                self.audio_plotter.ax.clear()  # Clear the previous plot
-                self.audio_plotter.ax.plot(time_values, data, color='g')  # Plot the waveform
-                
-                # Adjust the scale of the axes
-                self.audio_plotter.ax.set_xlim(0, len(data) / samplerate)  # Set x-axis to match duration
-                self.audio_plotter.ax.set_ylim(-1.5, 1.5)  # Set y-axis to show full amplitude
-                
-                # Update the canvas
-                self.audio_plotter.canvas.draw_idle()
-
-            except Exception as e:
-                print(f"Error loading audio file: {e}")
-
-    def start_recording(self):
-        visualize_audio_live(self.audio_plotter)
 
-    def apply_filter(self):
-        if not self.audio_file:
-            print("Recording new audio file...")
-            self.audio_plotter.stop_recording()
+    def open_audio_file(self, path, preview=True):
+        """Make ``path`` the current audio file, loading and plotting it on the worker."""
+        self.audio_file = path
+        self.source = None
+        self.comparisons = {}
+        self.compare_frame.pack_forget()
+
+        def job(progress):
+            # Build the min/max overview here; only the level of detail for the visible range is drawn
+            return open_audio(path), file_pyramid(path)
+
+        self.status_var.set(f"Loading {os.path.basename(path)}...")
+        self.worker.submit("load", job, on_done=lambda result: self.show_loaded_file(path, result, preview),
+                           on_error=self.on_load_error)
+
+    def show_loaded_file(self, path, result, preview=True):
+        if path != self.audio_file:
+            return  # Another file was selected in the meantime
+        self.status_var.set("")
+        (samples, frame_rate), pyramid = result
+        self.source = (samples, frame_rate)
+        try:
+            self.show_audio(samples, frame_rate, pyramid)
+        except Exception as e:
+            print(f"Error loading audio file: {e}")
+            return
+        if preview:
+            self.play_loaded()
 
-            print(f"Audio file saved at: {self.audio_file}")
+    def on_load_error(self, error):
+        self.status_var.set("")
+        print(f"Error loading audio file: {error}")
 
+    def toggle_recording(self):
+        from playback_visualization import toggle_recording
+
+        toggle_recording(self.audio_plotter, self.record_button)
+
+    def on_recording_saved(self, path):
+        """Make a finished recording the current audio file."""
+        self.open_audio_file(os.path.normpath(path), preview=False)
+        print(f"Audio file saved at: {self.audio_file}")
+        if self.apply_after_recording:
+            self.apply_after_recording = False
+            self.apply_filter()
+
+    def apply_filter(self):
+        if self.audio_plotter.is_recording:
+            # Filter the take once the recorder has finished writing it
+            print("Stopping the recording before applying the filter...")
+            self.apply_after_recording = True
+            self.audio_plotter.stop_recording()
+            self.record_button.config(text="Start Recording")
+            return
 
         if not self.audio_file:
             print("Recording failed or was cancelled.")
@@ -196,18 +412,192 @@ class VoiceModifierApp:
 
         selected_filter = self.filter_var.get()
 
-        if selected_filter == "Custom" or selected_filter in self.custom_filters:
+        if is_chain(self.custom_filters.get(selected_filter)):
+            print(f"Applying chain '{selected_filter}'...")
+            self.render_filter("Chain", impulse_response=self.impulse_response,
+                               chain=self.custom_filters[selected_filter]["chain"])
+        elif selected_filter == "Custom" or selected_filter in self.custom_filters:
             param1 = self.slider1.get()
             param2 = self.slider2.get()
-            reverse = 1 if self.reverse_var.get() == "Yes" else 0  # Use the dropdown value
-            print(f"Applying custom filter with parameters: {param1}, {param2}, {reverse}")
-            apply_filter(self.audio_file, self.modified_audio_file, "Custom", param1, param2, reverse)
+            reverse = reverse_param(self.reverse_var.get())  # Use the dropdown value
+            pitch = self.pitch_slider.get()
+            print(f"Applying custom filter with parameters: {param1}, {param2}, {reverse}, {pitch}")
+            self.render_filter("Custom", param1, param2, reverse, pitch)
         elif selected_filter != "None":
             print(f"Applying '{selected_filter}' filter...")
-            apply_filter(self.audio_file, self.modified_audio_file, selected_filter)
+            self.render_filter(selected_filter, impulse_response=self.impulse_response)
         else:
             print("No filter selected.")
 
+    def render_filter(self, filter_name, param1=0, param2=0, param3=0, param4=0, impulse_response=None, chain=None):
+        """Render the current audio file on the worker through the render cache.
+
+        A render submitted while another is queued or running replaces it.
+        """
+        from audio_filters import render_file, render_filter
+
+        audio_file, source, cache = self.audio_file, self.source, self.render_cache
+        voiced_only = self.voiced_only_var.get()
+        in_memory = source is not None and len(source[0]) <= self.IN_MEMORY_RENDER_SECONDS * source[1]
+
+        def open_cached(path):
+            samples, frame_rate = open_audio(path)
+            return samples, frame_rate, file_pyramid(path, use_sidecar=False), path, None
+
+        def job(progress):
+            key = cache.key(audio_file, filter_name, param1, param2, param3, param4, impulse_response,
+                            voiced_only=voiced_only, chain=chain)
+            cached = cache.lookup(key)
+            if cached:
+                print(f"Filter '{filter_name}' loaded from the render cache.")
+                return open_cached(cached)
+            if in_memory:
+                # Render from the decoded source and audition straight from memory;
+                # the cache file is written afterwards (see on_render_done)
+                progress(0.0)
+                # Rendered block by block so the progress callback can cancel between blocks
+                samples, frame_rate = render_filter(to_float32(source[0]), source[1], filter_name,
+                                                    param1, param2, param3, param4,
+                                                    impulse_response=impulse_response, voiced_only=voiced_only,
+                                                    chain=chain, progress=progress)
+                print(f"Filter '{filter_name}' applied.")
+                pyramid = PeakPyramid.from_blocks([samples], len(samples), frame_rate)
+                return samples, frame_rate, pyramid, None, key
+            partial = cache.temp_path(key)
+            try:
+                render_file(audio_file, partial, filter_name, param1, param2, param3, param4,
+                            impulse_response=impulse_response, streaming=True, progress=progress,
+                            voiced_only=voiced_only, chain=chain)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.remove(partial)
+                raise
+            print(f"Filter '{filter_name}' applied.")
+            return open_cached(cache.store(key, partial))
+
+        self.show_progress(f"Applying '{filter_name}'...")
+        self.worker.submit("render", job, on_done=self.on_render_done, on_error=self.on_render_error,
+                           on_progress=self.update_progress)
+
+    def render_all(self):
+        """Render the current audio file with every built-in filter and saved preset, in parallel.
+
+        The source is decoded once and shared with the render processes; renders already
+        in the cache are not repeated.
+        """
+        if not self.audio_file:
+            print("No audio file to render.")
+            return
+        from compare import comparison_specs, render_all
+
+        audio_file, source, cache = self.audio_file, self.source, self.render_cache
+        specs = comparison_specs(self.custom_filters)
+        impulse_response = self.impulse_response
+
+        def job(progress):
+            keys = {}
+            for label, spec in specs:
+                filter_name, param1, param2, param3, param4, chain = spec
+                ir = impulse_response if filter_name in ("Reverb", "Chain") else None
+                keys[label] = cache.key(audio_file, filter_name, param1, param2, param3, param4, ir, chain=chain)
+            # One render per distinct key; presets with equal settings share it
+            todo = {}
+            for label, spec in specs:
+                if cache.lookup(keys[label]) is None and keys[label] not in todo.values():
+                    todo[label] = keys[label]
+            if todo:
+                samples, frame_rate = source if source is not None else load_audio(audio_file)
+                jobs = {label: (spec, cache.temp_path(keys[label])) for label, spec in specs if label in todo}
+                rendered = render_all(samples, frame_rate, jobs, impulse_response=impulse_response,
+                                      progress=lambda fraction: progress(0.9 * fraction))
+                for label, partial in rendered.items():
+                    cache.store(todo[label], partial)
+            results = {}
+            for label, _ in specs:
+                path = cache.lookup(keys[label])
+                if path:
+                    samples, frame_rate = open_audio(path)
+                    results[label] = samples, frame_rate, file_pyramid(path, use_sidecar=False), path
+            progress(1.0)
+            return audio_file, results
+
+        self.show_progress(f"Rendering {len(specs)} filters...")
+        self.worker.submit("render", job, on_done=self.on_render_all_done, on_error=self.on_render_error,
+                           on_progress=self.update_progress)
+
+    def on_render_all_done(self, result):
+        audio_file, results = result
+        if audio_file != self.audio_file or not results:
+            self.hide_progress("")
+            return
+        self.comparisons = results
+        self.hide_progress(f"Rendered {len(results)} filters.")
+        self.compare_menu["values"] = list(results)
+        self.compare_frame.pack(side="top", pady=(0, 10), after=self.render_all_button)
+        selected = self.filter_var.get()
+        label = selected if selected in results else next(iter(results))
+        self.compare_var.set(label)
+        self.show_comparison(label)
+
+    def show_comparison(self, label):
+        """Switch to another render, continuing playback at the same position."""
+        if label not in self.comparisons:
+            return
+        samples, frame_rate, pyramid, path = self.comparisons[label]
+        position, playing = self.player.position, self.player.playing
+        self.rendered = (samples, frame_rate, pyramid)
+        self.modified_audio_file = path
+        self.show_audio(samples, frame_rate, pyramid)
+        if playing:
+            self.player.play(start=position)
+            self.update_playhead()
+        else:
+            self.seek_audio(position)
+
+    def show_progress(self, text):
+        self.status_var.set(text)
+        self.progress_var.set(0)
+        self.progress_bar.pack(side="top", fill="x", pady=(5, 0))
+        self.cancel_button.pack(side="top", pady=5)
+
+    def update_progress(self, fraction):
+        self.progress_var.set(fraction * 100)
+
+    def hide_progress(self, text=""):
+        self.status_var.set(text)
+        self.progress_bar.pack_forget()
+        self.cancel_button.pack_forget()
+
+    def on_render_done(self, result):
+        samples, frame_rate, pyramid, path, key = result
+        self.rendered = (samples, frame_rate, pyramid)
+        self.modified_audio_file = path
+        self.hide_progress("Filter applied.")
+        self.show_audio(samples, frame_rate, pyramid)
+        if key is not None:
+            self.worker.submit("cache", lambda progress: self.store_render(key, samples, frame_rate),
+                               on_done=lambda path: self.on_render_stored(samples, path))
+
+    def store_render(self, key, samples, frame_rate):
+        """Worker: write an in-memory render to the render cache."""
+        from audio_filters import save_audio as write_wav
+
+        partial = self.render_cache.temp_path(key)
+        write_wav(partial, samples, frame_rate)
+        return self.render_cache.store(key, partial)
+
+    def on_render_stored(self, samples, path):
+        if self.rendered is not None and self.rendered[0] is samples:
+            self.modified_audio_file = path
+
+    def on_render_error(self, error):
+        print(f"Failed to apply filter: {error}")
+        self.hide_progress("Filter failed.")
+
+    def cancel_render(self):
+        self.worker.cancel("render")
+        self.hide_progress("Cancelled.")
+
     def save_current_custom_filter(self):
         """Save the current custom filter with a user-defined name."""
         filter_name = simpledialog.askstring("Save Custom Filter", "Enter a name for your custom filter:")
@@ -219,7 +609,7 @@ class VoiceModifierApp:
             messagebox.showerror("Error", "A custom filter with this name already exists.")
             return
 
-        params = [self.slider1.get(), self.slider2.get(), self.reverse_var.get()]
+        params = [self.slider1.get(), self.slider2.get(), self.reverse_var.get(), self.pitch_slider.get()]
         self.custom_filters[filter_name] = params
         self.save_custom_filters()
         self.update_filter_menu()
@@ -237,31 +627,51 @@ class VoiceModifierApp:
 
     def load_custom_filters(self):
         """Load saved custom filters from a JSON file."""
-        if os.path.exists(self.CUSTOM_FILTERS_FILE):
-            with open(self.CUSTOM_FILTERS_FILE, "r") as file:
-                return json.load(file)
-        return {}
+        return load_presets(self.CUSTOM_FILTERS_FILE)
 
     def save_custom_filters(self):
         """Save custom filters to a JSON file."""
-        with open(self.CUSTOM_FILTERS_FILE, "w") as file:
-            json.dump(self.custom_filters, file)
+        save_presets(self.custom_filters, self.CUSTOM_FILTERS_FILE)
+
+    def show_audio(self, samples, frame_rate, pyramid):
+        """Plot a buffer and make it the one the player plays, so the playhead matches the plot."""
+        self.player.load(samples, frame_rate)
+        self.audio_plotter.show_audio(pyramid, samples)
 
     def play_audio(self):
-        if not self.modified_audio_file:
+        if self.rendered is None:
             print("No modified audio to play.")
             return
 
+        samples, frame_rate, pyramid = self.rendered
+        if self.player.loaded is not samples:
+            self.show_audio(samples, frame_rate, pyramid)
+        self.play_loaded()
+        print("Playing modified audio...")
+
+    def play_loaded(self):
         try:
-            short_path = get_short_path_name(self.modified_audio_file.replace("\\", "/"))
-            playsound(short_path)
-            print("Playing modified audio...")
+            self.player.play()
         except Exception as e:
             print(f"An error occurred while trying to play the audio: {e}")
+            return
+        self.update_playhead()
+
+    def stop_audio(self):
+        self.player.stop()
+
+    def seek_audio(self, seconds):
+        self.player.seek(seconds)
+        self.audio_plotter.set_playhead(self.player.position)
+
+    def update_playhead(self):
+        self.audio_plotter.set_playhead(self.player.position)
+        if self.player.playing:
+            self.root.after(30, self.update_playhead)
 
 
     def save_audio(self):
-        if not self.modified_audio_file:
+        if self.rendered is None:
             print("No modified audio to save.")
             return
 
@@ -269,8 +679,13 @@ class VoiceModifierApp:
                                                  filetypes=[("WAV files", "*.wav")],
                                                  title="Save Modified Audio As")
         if save_path:
-            from shutil import copyfile
-            copyfile(self.modified_audio_file, save_path)
+            if self.modified_audio_file and os.path.exists(self.modified_audio_file):
+                from shutil import copyfile
+                copyfile(self.modified_audio_file, save_path)
+            else:
+                from audio_filters import save_audio as write_wav
+
+                write_wav(save_path, to_float32(self.rendered[0]), self.rendered[1])
             print(f"Modified audio saved at {save_path}.")
             
     def delete_selected_custom_filter(self):
@@ -301,6 +716,10 @@ class VoiceModifierApp:
             "Are you sure you want to close the application?"
         )
         if confirm:
+            self.worker.cancel()
+            self.player.stop()
+            if self._audio_plotter is not None:
+                self._audio_plotter.stop_monitoring()
             self.root.destroy()  # Close the application
         else:
             print("Close action cancelled.")
@@ -0,0 +1,209 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# Export settings read by start_exporters(): a local Prometheus-style endpoint and a JSON lines file
+PORT_ENV = "SPRACHREKORDER_METRICS_PORT"
+FILE_ENV = "SPRACHREKORDER_METRICS_FILE"
+JSONL_INTERVAL = 5.0  # Seconds between JSON lines
+
+
+def exponential_buckets(start, factor, count):
+    return [start * factor ** i for i in range(count)]
+
+
+# Upper bounds in seconds: 1 us .. about 2 s for callbacks and frames, 0.1 ms .. about 14 min for renders
+TIME_BUCKETS = exponential_buckets(1e-6, 2, 22)
+RENDER_BUCKETS = exponential_buckets(1e-4, 2, 24)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels):
+        self.name, self.help, self.labels = name, help, labels
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def snapshot(self):
+        return {"value": self.value}
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """Counts of observations per bucket, cheap enough to update from an audio callback.
+
+    Only one thread should observe a given histogram; readers may see it mid-update.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels, buckets=TIME_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimate from the buckets (linear within the bucket holding the q-th observation)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = self.bounds[i - 1] if i else 0.0
+                high = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(low + (high - low) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def snapshot(self):
+        return {"count": self.count, "sum": self.sum, "max": self.max,
+                "p50": self.quantile(0.5), "p90": self.quantile(0.9), "p99": self.quantile(0.99)}
+
+
+class Registry:
+    """Named metrics, one per name and label set, exported as a dict, JSON lines or Prometheus text."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, *args):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(key, cls(name, help, dict(key[1]), *args))
+        return metric
+
+    def counter(self, name, help="", **labels):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help="", **labels):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help="", buckets=TIME_BUCKETS, **labels):
+        return self._get(Histogram, name, help, labels, buckets)
+
+    def metrics(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return sorted(metrics, key=lambda m: (m.name, sorted(m.labels.items())))
+
+    def snapshot(self):
+        """[{name, kind, labels, ...values}] for every metric."""
+        return [{"name": m.name, "kind": m.kind, "labels": m.labels, **m.snapshot()} for m in self.metrics()]
+
+    def to_json_line(self):
+        return json.dumps({"time": time.time(), "metrics": self.snapshot()})
+
+    def to_prometheus(self):
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+        described = set()
+        for m in self.metrics():
+            if m.name not in described:
+                described.add(m.name)
+                lines.append(f"# HELP {m.name} {m.help}")
+                lines.append(f"# TYPE {m.name} {m.kind}")
+            if m.kind != "histogram":
+                lines.append(f"{m.name}{_labels(m.labels)} {m.value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(m.bounds + ["+Inf"], m.counts):
+                cumulative += count
+                lines.append(f"{m.name}_bucket{_labels(m.labels, le=bound)} {cumulative}")
+            lines.append(f"{m.name}_sum{_labels(m.labels)} {m.sum}")
+            lines.append(f"{m.name}_count{_labels(m.labels)} {m.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value):
+    """Label value escaped for the exposition format (filter names come from user presets)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+
+
+def serve(port, registry=REGISTRY, host="127.0.0.1"):
+    """Serve ``registry.to_prometheus()`` at http://host:port/metrics from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # No line per scrape
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def write_json_lines(path, registry=REGISTRY, interval=JSONL_INTERVAL):
+    """Append a snapshot line to ``path`` every ``interval`` seconds from a daemon thread."""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with open(path, "a") as file:
+                    file.write(registry.to_json_line() + "\n")
+            except OSError as e:
+                print(f"Could not write metrics to {path}: {e}")
+                return
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def start_exporters(registry=REGISTRY):
+    """Start the exporters requested by $SPRACHREKORDER_METRICS_PORT and $SPRACHREKORDER_METRICS_FILE."""
+    port = os.environ.get(PORT_ENV)
+    if port:
+        try:
+            serve(int(port), registry)
+        except (OSError, ValueError) as e:
+            print(f"Could not serve metrics on port {port}: {e}")
+    path = os.environ.get(FILE_ENV)
+    if path:
+        write_json_lines(path, registry)
@@ -0,0 +1,60 @@
+import tkinter as tk
+from tkinter import filedialog, ttk
+
+from metrics import REGISTRY
+
+
+class MetricsPanel:
+    """Debug window listing every metric in a registry, refreshed while it is open."""
+
+    COLUMNS = ("labels", "count", "p50", "p99", "max", "value")
+
+    def __init__(self, root, registry=REGISTRY, refresh_ms=500):
+        self.registry = registry
+        self.refresh_ms = refresh_ms
+        self.window = tk.Toplevel(root)
+        self.window.title("Metrics")
+        self.window.geometry("720x360")
+        self.tree = ttk.Treeview(self.window, columns=self.COLUMNS, show="tree headings")
+        self.tree.heading("#0", text="metric")
+        self.tree.column("#0", width=200)
+        for column in self.COLUMNS:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=200 if column == "labels" else 80, anchor="w" if column == "labels" else "e")
+        self.tree.pack(fill="both", expand=True)
+        self.save_button = ttk.Button(self.window, text="Save Snapshot...", command=self.save_snapshot)
+        self.save_button.pack(side="right", padx=5, pady=5)
+        self.refresh()
+
+    @property
+    def is_open(self):
+        return bool(self.window.winfo_exists())
+
+    def refresh(self):
+        if not self.is_open:
+            return
+        for metric in self.registry.snapshot():
+            labels = ", ".join(f"{key}={value}" for key, value in metric["labels"].items())
+            if metric["kind"] == "histogram":
+                values = (labels, metric["count"], _ms(metric["p50"]), _ms(metric["p99"]), _ms(metric["max"]), "")
+            else:
+                values = (labels, "", "", "", "", metric["value"])
+            iid = metric["name"] + "|" + labels
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=values)
+            else:
+                self.tree.insert("", "end", iid=iid, text=metric["name"], values=values)
+        self.window.after(self.refresh_ms, self.refresh)
+
+    def save_snapshot(self):
+        """Append the current metrics as one JSON line to a file."""
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".jsonl",
+                                            filetypes=[("JSON lines", "*.jsonl")], title="Save Metrics Snapshot")
+        if path:
+            with open(path, "a") as file:
+                file.write(self.registry.to_json_line() + "\n")
+            print(f"Metrics saved to {path}.")
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.3f} ms"
@@ -1,84 +1,31 @@
-import os
-from tkinter import filedialog
-from matplotlib.animation import FuncAnimation
 import numpy as np
 import matplotlib.pyplot as plt
-import tkinter as tk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from threading import Thread, Event
-import time
-import queue as q
-from scipy.io.wavfile import read as wavfile_read, write
-from pydub import AudioSegment
-from pydub.playback import play
-import sounddevice as sd
-from playsound import playsound
-import ctypes
+from time import perf_counter
+from audio_backend import count_xruns, get_backend, xrun_counters
+from audio_buffers import RingBuffer
+from live_filters import DEFAULT_LIVE_BLOCK, LatencyMeter
+from metrics import REGISTRY
+from recorder import RECORDINGS_DIR, DiskRecorder, new_recording_path
+from spectrogram import FLOOR_DB, STFT, LiveSpectrogram
+from matplotlib.patches import Polygon
+from waveform import EnvelopeOutline, column_starts, minmax_decimate
+
+# At most this many input channels unless asked for more; virtual default devices often report 32 or more
+DEFAULT_MAX_CHANNELS = 2
+LANE_COLORS = ["g", "c", "y", "m", "tab:orange", "tab:blue", "w", "r"]
+
+
+def lane_layout(channels, stacked, height):
+    """Centre of each channel's lane and the y limits showing them, lanes ``height`` tall (first lane on top)."""
+    if not stacked:
+        return [0.0] * channels, (-height / 2, height / 2)
+    return [height * (channels - 1 - i) for i in range(channels)], (-height / 2, height * (channels - 0.5))
+
 
 is_recording = False
-recording_data = []  # Store recorded audio
-samplerate = 44100
-audio_queue = q.Queue()
-
-# Visualization settings
-device = 0  # Default input device
-window = 1000  # Size of the visualization window in milliseconds
-downsample = 1  # Downsample factor
-channels = [1]  # List of audio channels
-interval = 30  # Update interval in milliseconds
-device_info = sd.query_devices(device, 'input')
-samplerate = int(device_info['default_samplerate'])
-length = int(window * samplerate / (1000 * downsample))
-
-
-def get_short_path_name(long_path):
-    """Convert a long path to its short path equivalent on Windows bc playsound is wack."""
-    buffer = ctypes.create_unicode_buffer(260)  # MAX_PATH in Windows
-    ctypes.windll.kernel32.GetShortPathNameW(long_path, buffer, 260)
-    return buffer.value
-
-def load_audio_file(self):
-        file_path = filedialog.askopenfilename(
-            title="Select Audio File",
-            filetypes=[("Audio Files", "*.wav *.mp3 *.ogg")]
-        )
-        if file_path:
-            self.audio_file = os.path.normpath(file_path) 
-            print(f"Selected file: {self.audio_file}")
-            self.audio_plotter.play_audio_with_plot(file_path)
-            samplerate, data = wavfile_read(file_path)
-            if data.ndim > 1:  # If stereo, use only one channel
-                data = data[:, 0]
-                return data, samplerate
-            
-def save_audio_to_file():
-        """Save the recorded audio data to a file and return the path."""
-        global recording_data, samplerate  # Ensure these are properly defined
-        
-        if not recording_data:
-            print("No audio data to save!")
-            return None
-
-        audio_array = np.concatenate(recording_data, axis=0)
-
-        root = tk.Tk()
-        root.withdraw()  # Hide the Tkinter GUI window
-        output_path = filedialog.asksaveasfilename(defaultextension=".wav",
-                                                    filetypes=[("WAV Files", "*.wav")])
-        root.destroy()  # Close the Tkinter window
-
-        if not output_path:
-            print("Save operation cancelled by user.")
-            return None
-
-        try:
-            write(output_path, samplerate, audio_array)  # Save the file
-            print(f"Recording saved to {output_path}")
-            return output_path
-        except Exception as e:
-            print(f"Failed to save recording: {e}")
-            return None
-    
+
+
 def toggle_recording(audio_plotter, button):
     """Toggle recording state and update the button text."""
     if audio_plotter.is_recording:
@@ -99,91 +46,495 @@ def visualize_audio_live():
     audio_buffer = np.zeros(chunk_size * 10)
 
 class AudioPlotter:
-    def __init__(self, parent_frame, root, samplerate=44100, chunk_size=1024):
+    def __init__(self, parent_frame, root, samplerate=44100, chunk_size=1024, backend=None, channels=None):
         self.parent_frame = parent_frame
         self.root = root
+        self.backend = backend or get_backend()  # Opens the input/duplex streams (see audio_backend)
         self.samplerate = samplerate
         self.chunk_size = chunk_size
+        # Input channels; None follows the device when the first stream opens (see resolve_channels)
+        self.channels = channels
+        self.stacked = True  # One lane per channel, or all channels overlaid
         self.is_recording = False
-        self.audio_buffer = np.zeros(self.chunk_size * 10)
+        self._allocate(channels or 1)
+        self.recorder = None
+        self.recordings_dir = RECORDINGS_DIR
+        # Silence in recordings: None keeps it, 0 drops it, otherwise pauses are cut to this many ms (see vad)
+        self.silence_gap_ms = None
+        self.on_recording_saved = None  # Called on the Tk thread with the path of each finished recording
+        # Live monitoring: a LiveChain run in the duplex stream callback and played back
+        self.monitor = None
+        self.monitor_blocksize = DEFAULT_LIVE_BLOCK
+        self.latency = LatencyMeter()
         self.stream = None
+        self._duplex = False
+        self._plotting = False
+        # Metrics (see metrics.py); each histogram is only observed from one thread
+        self._callback_seconds = {
+            stream: REGISTRY.histogram("audio_callback_seconds", "Time spent in the audio callback", stream=stream)
+            for stream in ("input", "duplex")}
+        self._xruns = {stream: xrun_counters(stream) for stream in ("input", "duplex")}
+        self._plot_seconds = REGISTRY.histogram("plot_frame_seconds",
+                                                "Time to draw one live waveform (and spectrogram) frame")
 
         # Create the Matplotlib figure and embed it in the parent frame
         self.fig, self.ax = plt.subplots(figsize=(8, 4))
-        self.ax.set_facecolor((0, 0, 0))  # Black background
-        self.line, = self.ax.plot([], [], color='g')
-        self.ax.set_ylim(-1, 1)
-        self.ax.set_xlim(0, len(self.audio_buffer) / self.samplerate)
-
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.parent_frame)
         self.canvas_widget = self.canvas.get_tk_widget()
         self.canvas_widget.pack(fill="both", expand=True)
 
+        # Blitting state: the axes background is cached after each full draw and only the
+        # (animated) waveform is redrawn per frame, decimated to one min/max pair per pixel column
+        self._background = None
+        self._starts = None
+        self._outlines = None
+        # File overview state (see show_audio)
+        self._file = None
+        self._xlim_cid = None
+        self._pan_from = None
+        self._playhead = None
+        # Spectrogram below the waveform (see set_spectrogram): scrolled incrementally when live,
+        # computed for the visible range only over a file
+        self.spec_ax = None
+        self._spec_image = None
+        self._spec_background = None
+        self._file_stft = None
+        self.on_seek = None  # Called with a time in seconds when the file view is clicked
+        self.setup_live_axes()
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.mpl_connect("scroll_event", self._on_scroll)
+        self.canvas.mpl_connect("button_press_event", self._on_press)
+        self.canvas.mpl_connect("motion_notify_event", self._on_motion)
+        self.canvas.mpl_connect("button_release_event", self._on_release)
+
+    def _allocate(self, channels):
+        """(Re)create the capture buffers for ``channels`` input channels."""
+        self.audio_buffer = np.zeros((self.chunk_size * 10, channels), dtype=np.float32)
+        # Live view ring (twice the visible window so readers rarely race the writer)
+        self.ring = RingBuffer(len(self.audio_buffer) * 2, channels)
+        # Recording ring drained to disk by a DiskRecorder; ten seconds of slack for the writer thread
+        self.record_ring = RingBuffer(self.samplerate * 10, channels)
+        self.spectrogram = None
+
+    def resolve_channels(self):
+        """Input channel count for the next stream, asking the device if none was set."""
+        if self.channels is None:
+            self.channels = min(self.backend.default_channels("input"), DEFAULT_MAX_CHANNELS)
+        if self.channels != self.ring.channels and self.stream is None:
+            self._allocate(self.channels)
+            if self._file is None:
+                self.setup_live_axes()
+        return self.ring.channels
+
+    def set_channels(self, channels):
+        """Capture ``channels`` channels (None: the device default) from the next stream on."""
+        if self.stream is not None:
+            print("Stop recording and monitoring to change the number of channels.")
+            return False
+        self.channels = channels
+        self.resolve_channels()
+        return True
+
+    def set_stacked(self, stacked):
+        """Draw channels in separate lanes or on top of each other."""
+        self.stacked = stacked
+        if self._file is None:
+            self.setup_live_axes()
+            return
+        xlim = self.ax.get_xlim()
+        pyramid, raw = self._file[:2]
+        self.show_audio(pyramid, raw)
+        self.ax.set_xlim(xlim)
+
+    def setup_live_axes(self):
+        """(Re)create the live waveform axes, e.g. after a file plot cleared them."""
+        self._leave_file_view()
+        self.ax.clear()
+        self.ax.set_facecolor((0, 0, 0))  # Black background
+        channels = self.ring.channels
+        self.waveforms = [Polygon(np.zeros((2, 2)), closed=True, facecolor=LANE_COLORS[i % len(LANE_COLORS)],
+                                  linewidth=0, animated=True, alpha=1.0 if self.stacked else 0.6)
+                          for i in range(channels)]
+        for waveform in self.waveforms:
+            self.ax.add_patch(waveform)
+        self._centers, ylim = lane_layout(channels, self.stacked, 2.0)
+        self.ax.set_ylim(*ylim)
+        self.ax.set_xlim(0, len(self.audio_buffer) / self.samplerate)
+        self._background = None
+        self._outlines = None
+        self._setup_spectrogram_axes()
+        self.canvas.draw_idle()
+
+    def set_spectrogram(self, enabled):
+        """Show or hide the spectrogram below the waveform."""
+        if enabled == (self.spec_ax is not None):
+            return
+        grid = self.fig.add_gridspec(2 if enabled else 1, 1)
+        self.ax.set_subplotspec(grid[0])
+        if enabled:
+            self.spec_ax = self.fig.add_subplot(grid[1])
+            self._setup_spectrogram_axes()
+            if self._file is not None:
+                self._refresh_file_spectrogram()
+        else:
+            self.fig.delaxes(self.spec_ax)
+            self.spec_ax = None
+            self._spec_image = None
+            self._spec_background = None
+        self._background = None
+        self.canvas.draw_idle()
+
+    def _setup_spectrogram_axes(self):
+        """(Re)create the spectrogram image for the current (live or file) view."""
+        if self.spec_ax is None:
+            return
+        self.spec_ax.clear()
+        self.spec_ax.set_facecolor((0, 0, 0))
+        style = dict(origin="lower", aspect="auto", cmap="magma", vmin=FLOOR_DB, vmax=0, interpolation="nearest")
+        self._spec_background = None
+        if self._file is None:
+            if self.spectrogram is None:
+                self.spectrogram = LiveSpectrogram(self.samplerate, self.ring.capacity, channels=self.ring.channels)
+            spectrogram = self.spectrogram
+            spectrogram.reset(self.ring.frames_written)
+            self._spec_image = self.spec_ax.imshow(spectrogram.image, animated=True,
+                                                   extent=(-spectrogram.seconds, 0, 0, spectrogram.max_frequency),
+                                                   **style)
+        else:
+            pyramid = self._file[0]
+            self._file_stft = STFT(pyramid.frame_rate)
+            self._spec_image = self.spec_ax.imshow(np.full((self._file_stft.bins, 1), FLOOR_DB, dtype=np.float32),
+                                                   extent=(0, 1, 0, self._file_stft.max_frequency), **style)
+
+    def _on_draw(self, event):
+        """Cache the freshly drawn background; also runs after resizes and file plots."""
+        if self._file is not None:
+            # File view: the background is everything but the (animated) playhead
+            self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+            self.ax.draw_artist(self._playhead)
+            return
+        if self.waveforms[0] not in self.ax.patches:
+            self._background = None
+            self._spec_background = None
+            return
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._resize_outline()
+        for waveform in self.waveforms:
+            self.ax.draw_artist(waveform)
+        if self.spec_ax is not None:
+            self._spec_background = self.canvas.copy_from_bbox(self.spec_ax.bbox)
+            self.spec_ax.draw_artist(self._spec_image)
+
+    def _resize_outline(self):
+        """Precompute the x values and bins for the current pixel width of the axes."""
+        columns = max(min(int(self.ax.bbox.width), len(self.audio_buffer)), 1)
+        if self._outlines is not None and self._outlines[0].columns == columns:
+            return
+        self._outlines = [EnvelopeOutline(len(self.audio_buffer) / self.samplerate, columns) for _ in self.waveforms]
+        self._starts = column_starts(len(self.audio_buffer), columns)
+        for waveform, outline, center in zip(self.waveforms, self._outlines, self._centers):
+            waveform.set_xy(outline.set_y(center=center))
+
+    def show_audio(self, pyramid, raw=None):
+        """Plot audio from its peak pyramid and optional raw (frames, channels) samples, a lane per channel."""
+        raw_scale = 1.0
+        if raw is not None:
+            raw = raw if raw.ndim == 2 else raw[:, None]
+            if np.issubdtype(raw.dtype, np.integer):
+                raw_scale = 1.0 / (2 ** (8 * raw.dtype.itemsize - 1))
+        peak = pyramid.peak
+
+        self._leave_file_view()
+        self._file = (pyramid, raw, raw_scale, 1.0 / peak if peak > 0 else 1.0)
+        self.ax.clear()  # Clear the previous plot
+        self.ax.set_facecolor((0, 0, 0))
+        channels = pyramid.channels
+        colors = [LANE_COLORS[i % len(LANE_COLORS)] for i in range(channels)]
+        alpha = 1.0 if self.stacked else 0.6
+        self._file_envelopes = [Polygon(np.zeros((2, 2)), closed=True, facecolor=color, linewidth=0, alpha=alpha)
+                                for color in colors]
+        for envelope in self._file_envelopes:
+            self.ax.add_patch(envelope)
+        self._file_lines = [self.ax.plot([], [], color=color, alpha=alpha)[0] for color in colors]
+        self._file_centers, ylim = lane_layout(channels, self.stacked, 3.0)
+        self._playhead = self.ax.axvline(0, color='w', linewidth=1, animated=True, visible=False)
+        self._background = None
+        self.ax.set_xlim(0, pyramid.frames / pyramid.frame_rate)  # Set x-axis to match duration
+        self.ax.set_ylim(*ylim)  # Full amplitude in every lane
+        self._setup_spectrogram_axes()
+        self._xlim_cid = self.ax.callbacks.connect("xlim_changed", self._refresh_file_view)
+        self._refresh_file_view(self.ax)
+        self.canvas.draw_idle()
+
+    def set_playhead(self, seconds):
+        """Move the playhead over the file view (None hides it), blitting only the line."""
+        if self._file is None or self._playhead is None:
+            return
+        self._playhead.set_visible(seconds is not None)
+        if seconds is not None:
+            self._playhead.set_xdata([seconds, seconds])
+        if self._background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self.ax.draw_artist(self._playhead)
+        self.canvas.blit(self.ax.bbox)
+
+    def _leave_file_view(self):
+        if self._xlim_cid is not None:
+            self.ax.callbacks.disconnect(self._xlim_cid)
+            self._xlim_cid = None
+        self._file = None
+
+    def _refresh_file_view(self, ax):
+        """Draw only the pyramid level (or raw samples) matching the visible range and width."""
+        self._refresh_file_spectrogram()
+        pyramid, raw, raw_scale, norm = self._file
+        x0, x1 = ax.get_xlim()
+        start = max(int(x0 * pyramid.frame_rate), 0)
+        stop = min(int(np.ceil(x1 * pyramid.frame_rate)) + 1, pyramid.frames)
+        columns = max(int(ax.bbox.width), 1)
+        view = pyramid.view(start, stop, columns)
+        if view is None and raw is not None and stop > start:
+            samples = raw[start:stop].astype(np.float32) * np.float32(raw_scale * norm)
+            if len(samples) <= 2 * columns:
+                # Close enough to see individual samples
+                times = np.arange(start, stop) / pyramid.frame_rate
+                for channel, (envelope, line) in enumerate(zip(self._file_envelopes, self._file_lines)):
+                    envelope.set_visible(False)
+                    line.set_visible(True)
+                    line.set_data(times, samples[:, channel] + self._file_centers[channel])
+                return
+            starts = column_starts(len(samples), columns)
+            mins = np.empty((columns, samples.shape[1]), dtype=np.float32)
+            maxs = np.empty_like(mins)
+            minmax_decimate(samples, starts, mins, maxs)  # All channels in one pass
+            view = ((start + starts) / pyramid.frame_rate, mins, maxs)
+        elif view is None:
+            view = pyramid.view(0, pyramid.frames, 0)  # No raw access: finest level available
+            if view is None:
+                return
+        else:
+            view = (view[0], view[1] * norm, view[2] * norm)
+        times, mins, maxs = view
+        for channel, (envelope, line) in enumerate(zip(self._file_envelopes, self._file_lines)):
+            center = self._file_centers[channel]
+            line.set_visible(False)
+            envelope.set_visible(True)
+            envelope.set_xy(np.concatenate((np.column_stack((times, maxs[:, channel] + center)),
+                                            np.column_stack((times[::-1], mins[::-1, channel] + center)))))
+
+    def _refresh_file_spectrogram(self):
+        """Transform one frame per pixel column of the visible range (raw samples needed)."""
+        if self.spec_ax is None:
+            return
+        pyramid, raw, raw_scale, _ = self._file
+        self._spec_image.set_visible(raw is not None)
+        if raw is None:
+            return
+        x0, x1 = self.ax.get_xlim()
+        columns = max(int(self.spec_ax.bbox.width), 1)
+        image = self._file_stft.view(raw, x0 * pyramid.frame_rate, x1 * pyramid.frame_rate, columns, raw_scale)
+        self._spec_image.set_data(image)
+        self._spec_image.set_extent((x0, x1, 0, self._file_stft.max_frequency))
+        self.spec_ax.set_xlim(x0, x1)
+
+    def _in_view(self, event):
+        return event.inaxes is not None and event.inaxes in (self.ax, self.spec_ax)
+
+    def _on_scroll(self, event):
+        """Zoom the file view around the cursor."""
+        if self._file is None or not self._in_view(event) or event.xdata is None:
+            return
+        pyramid = self._file[0]
+        factor = 0.8 if event.button == "up" else 1.25
+        x0, x1 = self.ax.get_xlim()
+        duration = pyramid.frames / pyramid.frame_rate
+        width = min(max((x1 - x0) * factor, 10 / pyramid.frame_rate), duration)
+        left = event.xdata - (event.xdata - x0) * width / (x1 - x0)
+        left = min(max(left, 0), duration - width)
+        self.ax.set_xlim(left, left + width)
+        self.canvas.draw_idle()
+
+    def _on_press(self, event):
+        if self._file is not None and self._in_view(event) and event.button == 1:
+            self._pan_from = (event.x, self.ax.get_xlim())
+
+    def _on_motion(self, event):
+        """Pan the file view while the left button is held."""
+        if self._pan_from is None or self._file is None:
+            return
+        pyramid = self._file[0]
+        x, (x0, x1) = self._pan_from
+        shift = (x - event.x) * (x1 - x0) / max(self.ax.bbox.width, 1)
+        shift = min(max(shift, -x0), pyramid.frames / pyramid.frame_rate - x1)
+        self.ax.set_xlim(x0 + shift, x1 + shift)
+        self.canvas.draw_idle()
+
+    def _on_release(self, event):
+        """A click without dragging seeks to the clicked time."""
+        if self._pan_from is not None and abs(event.x - self._pan_from[0]) < 3 and self.on_seek \
+                and self._in_view(event) and event.xdata is not None:
+            self.on_seek(max(event.xdata, 0.0))
+        self._pan_from = None
+
     def audio_callback(self, indata, frames, time, status):
         """Callback to process audio data in real-time."""
-        global recording_data
+        start = perf_counter()
+        self._capture(indata, status, "input")
+        self._callback_seconds["input"].observe(perf_counter() - start)
 
+    def _capture(self, indata, status, stream):
         if status:
-            print(f"Stream status: streaming")
+            count_xruns(status, self._xruns[stream])
 
-        # Update the audio buffer for visualization
-        self.audio_buffer = np.roll(self.audio_buffer, -frames)
-        self.audio_buffer[-frames:] = indata[:, 0]  # Use the first channel only
+        # Update the ring for visualization
+        self.ring.write(indata)
 
-        # Append data for recording if enabled
+        # Store data for recording if enabled
         if self.is_recording:
-            print(f"callback is called")
-            recording_data.append(indata.copy())
+            self.record_ring.write(indata)
 
+    def duplex_callback(self, indata, outdata, frames, time, status):
+        """Input as in audio_callback, plus the monitor chain's output and a latency sample."""
+        start = perf_counter()
+        self._capture(indata, status, "duplex")
+        monitor = self.monitor
+        if monitor is None:
+            outdata.fill(0)
+        else:
+            monitor.process(indata, outdata)
+        self.latency.add(time.outputBufferDacTime - time.inputBufferAdcTime)
+        self._callback_seconds["duplex"].observe(perf_counter() - start)
 
     def update_plot(self):
-
         """Update the waveform plot with new audio data."""
-        scale_factor = 20  # Increase this value to make the waveforms wider
-        scaled_audio = self.audio_buffer * scale_factor  # Scale the amplitude of the audio data
+        start = perf_counter()
+        self.ring.latest(self.audio_buffer)
+        if self.spec_ax is not None and self._file is None:
+            self.spectrogram.update(self.ring)  # Only the columns completed since the last frame
 
-        x = np.linspace(0, len(self.audio_buffer) / self.samplerate, len(self.audio_buffer))
-        self.line.set_data(x, scaled_audio)
+        if self.waveforms[0] not in self.ax.patches:
+            self.setup_live_axes()  # A file plot replaced the live view
+        if self._background is None:
+            self.canvas.draw_idle()  # Full draw first; _on_draw caches the background
+        else:
+            scale_factor = 20  # Increase this value to make the waveforms wider
+            self.canvas.restore_region(self._background)
+            for channel, (waveform, outline) in enumerate(zip(self.waveforms, self._outlines)):
+                waveform.set_xy(outline.update(self.audio_buffer[:, channel], self._starts, scale_factor,
+                                               self._centers[channel]))
+                self.ax.draw_artist(waveform)
+            self.canvas.blit(self.ax.bbox)
+            if self._spec_background is not None:
+                self._spec_image.set_data(self.spectrogram.image)  # Scrolled in place; marks it stale
+                self.canvas.restore_region(self._spec_background)
+                self.spec_ax.draw_artist(self._spec_image)
+                self.canvas.blit(self.spec_ax.bbox)
+        self._plot_seconds.observe(perf_counter() - start)
 
-        # Adjust horizontal and vertical scales
-        self.ax.set_xlim(0, len(self.audio_buffer) / self.samplerate)  # Time axis
-        self.ax.set_ylim(-1, 1)  # Amplitude axis
+        # Schedule the next update
+        if self.is_recording or self.monitor is not None:
+            self.root.after(30, self.update_plot)
+        else:
+            self._plotting = False
 
-        if recording_data:
-            print(f"Recording data sample: {recording_data[:10]}")  # Display a few samples
-            print(f"Recording data range: {np.min(recording_data)} to {np.max(recording_data)}")
+    def _start_plotting(self):
+        if not self._plotting:
+            self._plotting = True
+            self.update_plot()
 
-        self.canvas.draw_idle()
+    def _open_stream(self, duplex):
+        """(Re)open the input stream; a duplex stream also plays the monitor output."""
+        self._close_stream()
+        if duplex:
+            self.latency.reset()
+            self.stream = self.backend.duplex_stream(
+                samplerate=self.samplerate,
+                blocksize=self.monitor_blocksize,
+                channels=self.ring.channels,
+                dtype="float32",
+                latency="low",
+                callback=self.duplex_callback
+            )
+        else:
+            self.stream = self.backend.input_stream(
+                samplerate=self.samplerate,
+                channels=self.ring.channels,
+                callback=self.audio_callback
+            )
+        self._duplex = duplex
+        self.stream.start()
 
-        # Schedule the next update
+    def _close_stream(self):
+        if self.stream:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def start_monitoring(self, chain, blocksize=None):
+        """Play ``chain`` applied to the input in real time; swaps the chain if already monitoring.
+
+        The chain must be built for resolve_channels() channels. Changing the block size
+        reopens the stream (a recording in progress keeps going).
+        """
+        reopen = not self._duplex or self.stream is None
+        if blocksize is not None and blocksize != self.monitor_blocksize:
+            self.monitor_blocksize = blocksize
+            reopen = True
+        self.monitor = chain
+        if reopen:
+            self._open_stream(duplex=True)
+            print(f"Monitoring started ({self.monitor_blocksize} frames per block).")
+        self._start_plotting()
+
+    def stop_monitoring(self):
+        self.monitor = None
         if self.is_recording:
-            self.root.after(30, self.update_plot)
-        
+            return  # Keep the duplex stream for the recording; it now outputs silence
+        self._close_stream()
+        self._duplex = False
+        print("Monitoring stopped.")
 
     def start_recording(self):
         """Start recording and visualization."""
         if not self.is_recording:
+            channels = self.resolve_channels()
+            gate = None
+            if self.silence_gap_ms is not None:
+                from vad import VoiceActivityDetector
+
+                gate = VoiceActivityDetector(self.samplerate).gate(channels, self.silence_gap_ms)
+            self.recorder = DiskRecorder(new_recording_path(self.recordings_dir), self.record_ring, self.samplerate,
+                                         gate=gate)
+            self.recorder.start()
             self.is_recording = True
-            is_recording = True
-            print(is_recording)
-            self.stream = sd.InputStream(
-                samplerate=self.samplerate,
-                channels=1,
-                callback=self.audio_callback
-            )
-            self.stream.start()
+            if self.stream is None:
+                self._open_stream(duplex=self.monitor is not None)
             print("Stream started for recording.")
-            self.update_plot()
+            self._start_plotting()
             print("Recording started.")
 
     def stop_recording(self):
         """Stop recording and visualization."""
         if self.is_recording:
             self.is_recording = False
-            if self.stream:
-                self.stream.stop()
-                self.stream.close()
-            save_audio_to_file()
+            if self.monitor is None:
+                self._close_stream()
+                self._duplex = False
+            # The writer drains the rest and finalizes the file in the background
+            self.recorder.stop()
             print("Recording stopped.")
-            print(f"Recording data length: {len(recording_data)}")
+            self.root.after(50, self._wait_for_recorder, self.recorder)
+
+    def _wait_for_recorder(self, recorder):
+        if not recorder.finished:
+            self.root.after(50, self._wait_for_recorder, recorder)
+            return
+        if recorder.error is not None:
+            return
+        skipped = f", {recorder.gate.skipped} silent frames left out" if recorder.gate else ""
+        print(f"Recording saved to {recorder.path} ({recorder.frames} frames{skipped})")
+        if self.on_recording_saved:
+            self.on_recording_saved(recorder.path)
 
@@ -0,0 +1,105 @@
+from time import perf_counter
+
+import numpy as np
+
+from audio_backend import count_xruns, get_backend, xrun_counters
+from audio_io import to_float32
+from metrics import REGISTRY
+
+
+class Player:
+    """Plays an in-memory buffer through a non-blocking output stream of the audio backend.
+
+    ``samples`` may be float or integer PCM (e.g. a memory-mapped WAV), shaped
+    (frames,) or (frames, channels); integer data is scaled block by block in the callback.
+    """
+
+    def __init__(self, blocksize=1024, backend=None):
+        self.blocksize = blocksize
+        self.backend = backend or get_backend()
+        self.loaded = None  # The buffer as passed to load()
+        self.samples = None
+        self.frame_rate = None
+        self.stream = None
+        self._scale = None
+        self._position = 0  # Next frame to play; the callback advances it
+        self._seek_to = None  # Requested by seek() while playing, applied by the callback
+        self._callback_seconds = REGISTRY.histogram("audio_callback_seconds", "Time spent in the audio callback",
+                                                    stream="output")
+        self._xruns = xrun_counters("output")
+
+    def load(self, samples, frame_rate):
+        self.stop()
+        self.loaded = samples
+        if samples.dtype == np.uint8:
+            samples = to_float32(samples)  # Offset binary; small enough to convert up front
+        self.samples = samples if samples.ndim == 2 else samples[:, None]
+        self.frame_rate = int(frame_rate)
+        self._scale = None
+        if np.issubdtype(samples.dtype, np.integer):
+            self._scale = np.float32(1.0 / (2 ** (8 * samples.dtype.itemsize - 1)))
+        self._position = 0
+        self._seek_to = None
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.frame_rate if self.samples is not None else 0.0
+
+    @property
+    def position(self):
+        """Playback position in seconds."""
+        if self.samples is None:
+            return 0.0
+        frame = self._seek_to if self._seek_to is not None else self._position
+        return frame / self.frame_rate
+
+    @property
+    def playing(self):
+        return self.stream is not None and self.stream.active
+
+    def play(self, start=None):
+        """Start playing from ``start`` seconds (default: where it stopped, or the beginning at the end)."""
+        if self.samples is None:
+            return
+        self.stop()
+        if start is not None:
+            self.seek(start)
+        if self._position >= len(self.samples):
+            self._position = 0
+        self.stream = self.backend.output_stream(samplerate=self.frame_rate, channels=self.samples.shape[1],
+                                      dtype="float32", blocksize=self.blocksize, callback=self._callback)
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.abort()  # Drop queued buffers so playback stops at once
+            self.stream.close()
+            self.stream = None
+
+    def seek(self, seconds):
+        if self.samples is None:
+            return
+        frame = min(max(int(seconds * self.frame_rate), 0), len(self.samples))
+        if self.playing:
+            self._seek_to = frame
+        else:
+            self._position = frame
+
+    def _callback(self, outdata, frames, time, status):
+        start = perf_counter()
+        if status:
+            count_xruns(status, self._xruns)
+        if self._seek_to is not None:
+            self._position, self._seek_to = self._seek_to, None
+        position = self._position
+        chunk = self.samples[position:position + frames]
+        count = len(chunk)
+        if self._scale is None:
+            outdata[:count] = chunk
+        else:
+            np.multiply(chunk, self._scale, out=outdata[:count])
+        outdata[count:] = 0
+        self._position = position + count
+        self._callback_seconds.observe(perf_counter() - start)
+        if count < frames:
+            raise self.backend.CallbackStop()
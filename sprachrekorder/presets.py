@@ -0,0 +1,47 @@
+import json
+import os
+
+CUSTOM_FILTERS_FILE = "custom_filters.json"
+
+
+def load_presets(path=CUSTOM_FILTERS_FILE):
+    """Load saved custom filters ({name: [speed, volume, reverse, pitch]}) from a JSON file.
+
+    Presets saved before the pitch control have three values; their pitch is 0. A preset
+    can also be a chain of stages, {"chain": [{"type": "pitch", "semitones": 3}, ...]}
+    (see chains.STAGE_TYPES).
+    """
+    if os.path.exists(path):
+        with open(path, "r") as file:
+            return json.load(file)
+    return {}
+
+
+def save_presets(presets, path=CUSTOM_FILTERS_FILE):
+    """Save custom filters to a JSON file."""
+    with open(path, "w") as file:
+        json.dump(presets, file)
+
+
+def reverse_param(reverse):
+    """Map the "Yes"/"No" reverse option to apply_filter's param3 (reverses above 50)."""
+    return 100 if reverse == "Yes" else 0
+
+
+def preset_params(params):
+    """apply_filter (param1, param2, param3, param4) for a saved [speed, volume, reverse(, pitch)] preset."""
+    speed, volume, reverse = params[:3]
+    pitch = params[3] if len(params) > 3 else 0
+    return speed, volume, reverse_param(reverse), pitch
+
+
+def is_chain(params):
+    """True for presets that are a chain of stages rather than Custom filter settings."""
+    return isinstance(params, dict)
+
+
+def preset_spec(params):
+    """(filter_name, param1, param2, param3, param4, chain) to render a saved preset with."""
+    if is_chain(params):
+        return "Chain", 0, 0, 0, 0, params["chain"]
+    return ("Custom",) + preset_params(params) + (None,)
@@ -0,0 +1,156 @@
+import glob
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from audio_filters import to_pcm16
+from metrics import REGISTRY
+
+RECORDINGS_DIR = "recordings"
+PARTIAL_SUFFIX = ".partial.wav"
+HEADER_SIZE = 44
+
+
+def wav_header(samplerate, channels, frames, sample_width=2):
+    """Canonical 44-byte PCM WAV header."""
+    data_size = frames * channels * sample_width
+    return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_size, b"WAVE", b"fmt ", 16, 1, channels,
+                       samplerate, samplerate * channels * sample_width, channels * sample_width,
+                       8 * sample_width, b"data", data_size)
+
+
+def recover_wav(path):
+    """Rewrite the header sizes of a WAV written by DiskRecorder from the file length; returns the frame count."""
+    with open(path, "r+b") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:4] != b"RIFF":
+            raise ValueError(f"{path} is not a recording")
+        channels, samplerate = struct.unpack_from("<HI", header, 22)
+        sample_width = struct.unpack_from("<H", header, 34)[0] // 8
+        f.seek(0, os.SEEK_END)
+        frames = (f.tell() - HEADER_SIZE) // (channels * sample_width)
+        f.truncate(HEADER_SIZE + frames * channels * sample_width)  # Drop a torn last frame
+        f.seek(0)
+        f.write(wav_header(samplerate, channels, frames, sample_width))
+    return frames
+
+
+def recover_recordings(directory=RECORDINGS_DIR):
+    """Finish recordings left behind by a crash; returns the paths of the recovered files."""
+    recovered = []
+    for partial in sorted(glob.glob(os.path.join(directory, "*" + PARTIAL_SUFFIX))):
+        try:
+            frames = recover_wav(partial)
+        except (OSError, ValueError) as e:
+            print(f"Could not recover {partial}: {e}")
+            continue
+        path = partial[:-len(PARTIAL_SUFFIX)] + ".wav"
+        os.replace(partial, path)
+        print(f"Recovered interrupted recording ({frames} frames): {path}")
+        recovered.append(path)
+    return recovered
+
+
+def new_recording_path(directory=RECORDINGS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, time.strftime("recording-%Y%m%d-%H%M%S.wav"))
+
+
+class DiskRecorder:
+    """Appends what the audio callback writes into a RingBuffer to a 16-bit WAV file on a background thread.
+
+    The file is written as ``<name>.partial.wav`` and its header is refreshed every
+    ``flush_seconds``, so after a crash recover_recordings() can finish it. Memory use
+    is the ring plus one block, whatever the length of the take.
+
+    With a vad.VoiceGate as ``gate`` the silence is dropped or shortened on the way to
+    the file; the gate runs here rather than in the audio callback.
+    """
+
+    def __init__(self, path, ring, samplerate, flush_seconds=1.0, poll_seconds=0.05, gate=None):
+        self.path = path
+        self.partial_path = os.path.splitext(path)[0] + PARTIAL_SUFFIX
+        self.ring = ring
+        self.samplerate = int(samplerate)
+        self.flush_seconds = flush_seconds
+        self.poll_seconds = poll_seconds
+        self.gate = gate
+        self.frames = 0
+        self._skipped_frames = 0  # gate.skipped already counted in the metric
+        self.dropped = 0
+        self.error = None
+        self._backlog = REGISTRY.gauge("recorder_backlog_frames", "Captured frames not yet written to disk")
+        self._dropped = REGISTRY.counter("recorder_dropped_frames_total", "Frames overwritten before being saved")
+        self._skipped = REGISTRY.counter("recorder_skipped_frames_total", "Silent frames left out of recordings")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._position = self.ring.frames_written
+        self._file = open(self.partial_path, "wb")
+        self._file.write(wav_header(self.samplerate, self.ring.channels, 0))
+        self._thread.start()
+
+    def stop(self):
+        """Ask the writer to drain what is left and finish the file; returns immediately."""
+        self._stop.set()
+
+    @property
+    def finished(self):
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        block = np.empty((self.ring.capacity // 4, self.ring.channels), dtype=np.float32)
+        last_flush = time.monotonic()
+        try:
+            while not self._stop.wait(self.poll_seconds):
+                self._drain(block)
+                if time.monotonic() - last_flush >= self.flush_seconds:
+                    self._update_header()
+                    last_flush = time.monotonic()
+            self._drain(block)
+            if self.gate:
+                self._write(self.gate.process(block[:0], final=True))
+            self._update_header()
+            self._file.close()
+            os.replace(self.partial_path, self.path)
+        except Exception as e:
+            # Kept for the UI, which only reports the recording as saved when there is no error
+            self.error = e
+            print(f"Recording to {self.partial_path} failed: {e!r}")
+        finally:
+            self._file.close()
+
+    def _drain(self, block):
+        self._backlog.set(self.ring.frames_written - self._position)
+        while True:
+            start, count = self.ring.read(self._position, block)
+            if start > self._position:
+                self.dropped += start - self._position
+                self._dropped.inc(start - self._position)
+                print(f"Recorder fell behind; dropped {start - self._position} frames")
+            if count == 0:
+                return
+            self._write(self.gate.process(block[:count]) if self.gate else block[:count])
+            self._position = start + count
+
+    def _write(self, samples):
+        self._file.write(to_pcm16(samples).tobytes())
+        self.frames += len(samples)
+        if self.gate:
+            self._skipped.inc(self.gate.skipped - self._skipped_frames)
+            self._skipped_frames = self.gate.skipped
+
+    def _update_header(self):
+        self._file.flush()
+        self._file.seek(0)
+        self._file.write(wav_header(self.samplerate, self.ring.channels, self.frames))
+        self._file.seek(0, os.SEEK_END)
+        self._file.flush()
+        os.fsync(self._file.fileno())
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sprachrekorder", "renders")
+DEFAULT_MAX_BYTES = 1024 ** 3
+# Bump when a filter's output changes so stale renders are not reused
+CACHE_VERSION = 2
+
+_content_hashes = {}  # (path, size, mtime_ns) -> hex digest
+
+
+def content_hash(path):
+    """SHA-256 of a file's bytes, memoized per path, size and mtime."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _content_hashes.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = _content_hashes[memo_key] = h.hexdigest()
+    return digest
+
+
+class RenderCache:
+    """Filtered renders stored as WAV files named by a hash of the input audio and filter settings.
+
+    Lookups refresh a file's mtime and eviction removes the least recently used
+    renders once the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, input_file, filter_name, param1=0, param2=0, param3=0, param4=0, impulse_response=None,
+            voiced_only=False, keep_timing=True, chain=None):
+        settings = {
+            "version": CACHE_VERSION,
+            "input": content_hash(input_file),
+            "filter": filter_name,
+            "params": [param1, param2, param3, param4],
+            "impulse_response": content_hash(impulse_response) if impulse_response else None,
+        }
+        if chain:
+            settings["chain"] = [dict(step, impulse_response=content_hash(step["impulse_response"]))
+                                 if step.get("impulse_response") else step for step in chain]
+        if voiced_only:
+            settings["voiced_only"] = {"keep_timing": keep_timing}  # Absent otherwise, so older keys still match
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + ".wav")
+
+    def temp_path(self, key):
+        """Where to render before store(), inside the cache directory so the final rename is atomic."""
+        return os.path.join(self.directory, key + ".partial.wav")
+
+    def lookup(self, key):
+        """Path of a cached render, or None."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            return None
+        return path
+
+    def store(self, key, rendered_file):
+        """Move a finished render into the cache and evict old entries; returns its cached path."""
+        path = self.path_for(key)
+        os.replace(rendered_file, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Delete least recently used renders until the cache fits in ``max_bytes``."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".wav") or name.endswith(".partial.wav"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import RENDER_BUCKETS, REGISTRY
+
+
+class RenderCancelled(Exception):
+    """Raised inside a job's progress callback once the job has been cancelled."""
+
+
+class Job:
+    def __init__(self, kind, func, on_done=None, on_error=None, on_progress=None):
+        self.kind = kind
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.cancelled = threading.Event()
+        self.last_progress = -1.0
+
+
+class RenderWorker:
+    """Runs jobs one at a time on a background thread and reports back on the Tk thread.
+
+    Jobs are keyed by ``kind``: submitting a job replaces a queued job of the same
+    kind and cancels a running one, so quick successive filter changes only render
+    the last choice. Callbacks run on the Tk main loop via ``root.after`` polling.
+    """
+
+    def __init__(self, root, poll_ms=50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._pending = OrderedDict()  # kind -> Job, oldest first
+        self._current = None
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._events = queue.SimpleQueue()  # (callback, args) for the Tk thread
+        self._polling = False
+        self._depth = REGISTRY.gauge("render_queue_depth", "Jobs waiting for the render worker")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, func, on_done=None, on_error=None, on_progress=None):
+        """Queue ``func(progress)``; its return value is passed to ``on_done``."""
+        job = Job(kind, func, on_done, on_error, on_progress)
+        with self._lock:
+            self._pending.pop(kind, None)
+            self._pending[kind] = job
+            if self._current is not None and self._current.kind == kind:
+                self._current.cancelled.set()
+            self._depth.set(len(self._pending))
+            self._wake.notify()
+        self._start_polling()
+        return job
+
+    def cancel(self, kind=None):
+        """Cancel the running job and drop queued ones (only those of ``kind`` if given)."""
+        with self._lock:
+            for pending_kind in list(self._pending):
+                if kind is None or pending_kind == kind:
+                    del self._pending[pending_kind]
+            self._depth.set(len(self._pending))
+            if self._current is not None and (kind is None or self._current.kind == kind):
+                self._current.cancelled.set()
+
+    @property
+    def busy(self):
+        with self._lock:
+            return self._current is not None or bool(self._pending)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wake.wait()
+                _, job = self._pending.popitem(last=False)
+                self._current = job
+                self._depth.set(len(self._pending))
+
+            def progress(fraction, job=job):
+                if job.cancelled.is_set():
+                    raise RenderCancelled()
+                # Only forward visible changes so a fast render does not flood the Tk queue
+                if job.on_progress and (fraction - job.last_progress >= 0.01 or fraction >= 1.0):
+                    job.last_progress = fraction
+                    self._events.put((job.on_progress, (fraction,)))
+
+            start = time.perf_counter()
+            try:
+                result = job.func(progress)
+            except RenderCancelled:
+                print(f"Cancelled {job.kind} job.")
+            except Exception as e:
+                if job.on_error:
+                    self._events.put((job.on_error, (e,)))
+                else:
+                    print(f"{job.kind} job failed: {e}")
+            else:
+                if job.on_done and not job.cancelled.is_set():
+                    self._events.put((job.on_done, (result,)))
+            finally:
+                REGISTRY.histogram("worker_job_seconds", "Time the render worker spent per job", RENDER_BUCKETS,
+                                   kind=job.kind).observe(time.perf_counter() - start)
+                with self._lock:
+                    self._current = None
+
+    def _start_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """Run callbacks posted by the worker thread; keeps polling while jobs are outstanding."""
+        while True:
+            try:
+                callback, args = self._events.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Error in render callback: {e}")
+        if self.busy or not self._events.empty():
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
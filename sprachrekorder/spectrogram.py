@@ -0,0 +1,109 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+FLOOR_DB = -100.0  # Magnitudes below this (relative to full scale) are drawn as the floor
+MAX_FREQUENCY = 8000  # Hz shown by default; enough for voice and it keeps the image small
+
+
+def frequency_bins(n_fft, samplerate, max_frequency=MAX_FREQUENCY):
+    """Number of rfft bins from 0 Hz up to ``max_frequency`` (at most the Nyquist frequency)."""
+    return min(int(max_frequency * n_fft / samplerate) + 1, n_fft // 2 + 1)
+
+
+class STFT:
+    """Windowed rfft magnitudes in dB of full-length frames, one column per frame."""
+
+    def __init__(self, samplerate, n_fft=1024, max_frequency=MAX_FREQUENCY):
+        self.samplerate = samplerate
+        self.n_fft = n_fft
+        self.bins = frequency_bins(n_fft, samplerate, max_frequency)
+        self.window = np.hanning(n_fft).astype(np.float32)
+        self._scale = np.float32(2.0 / self.window.sum())  # A full scale sine reads 0 dB
+
+    @property
+    def max_frequency(self):
+        return (self.bins - 1) * self.samplerate / self.n_fft
+
+    def columns(self, frames, out):
+        """Write the dB spectrum of each row of ``frames`` (count, n_fft) into the columns of ``out`` (bins, count)."""
+        spectrum = np.fft.rfft(frames * self.window, axis=1)[:, :self.bins]
+        magnitude = np.abs(spectrum).astype(np.float32) * self._scale
+        np.maximum(magnitude, np.float32(10 ** (FLOOR_DB / 20)), out=magnitude)
+        out[:] = 20 * np.log10(magnitude).T
+        return out
+
+    def view(self, samples, start, stop, columns, scale=1.0):
+        """(bins, columns) image of ``samples[start:stop]`` (times ``scale``), one frame centred on each column.
+
+        (frames, channels) samples are mixed down to one channel.
+
+        Only ``columns`` frames are read however long the range is, so this works on
+        memory-mapped files of any length.
+        """
+        if samples.ndim == 1:
+            samples = samples[:, None]
+        image = np.full((self.bins, columns), FLOOR_DB, dtype=np.float32)
+        centres = start + (np.arange(columns) + 0.5) * (stop - start) / columns
+        firsts = centres.astype(np.int64) - self.n_fft // 2
+        valid = (firsts >= 0) & (firsts + self.n_fft <= len(samples))
+        if valid.any():
+            offsets = firsts[valid][:, None] + np.arange(self.n_fft)
+            frames = samples[offsets].astype(np.float32).mean(axis=2) * np.float32(scale)
+            image[:, valid] = self.columns(frames, np.empty((self.bins, len(frames)), dtype=np.float32))
+        return image
+
+
+class LiveSpectrogram(STFT):
+    """Scrolling spectrogram fed incrementally from a RingBuffer (of any channel count, mixed down).
+
+    update() reads only the frames written since the last call and transforms only the
+    frames they complete, then scrolls the preallocated ``image`` (bins, columns) left
+    in place. The work per call is bounded by the ring capacity, not the session length.
+    """
+
+    def __init__(self, samplerate, capacity, n_fft=1024, hop=256, seconds=5.0, max_frequency=MAX_FREQUENCY,
+                 channels=1):
+        super().__init__(samplerate, n_fft, max_frequency)
+        self.hop = hop
+        self.image = np.full((self.bins, max(int(seconds * samplerate / hop), 1)), FLOOR_DB, dtype=np.float32)
+        # Unconsumed frames (the overlap of the next frame) followed by room for one full ring
+        self._work = np.zeros(n_fft + capacity, dtype=np.float32)
+        self._frames = np.zeros((capacity, channels), dtype=np.float32) if channels > 1 else None
+        self._carry = 0
+        self._position = 0  # Absolute ring position of the next frame to read
+
+    @property
+    def seconds(self):
+        return self.image.shape[1] * self.hop / self.samplerate
+
+    def reset(self, position=0):
+        """Start over (blank image) from absolute ring ``position``."""
+        self.image.fill(FLOOR_DB)
+        self._carry = 0
+        self._position = position
+
+    def update(self, ring):
+        """Add the columns completed by frames written to ``ring`` since the last call; returns how many."""
+        carry = self._carry
+        if self._frames is None:
+            start, count = ring.read(self._position, self._work[carry:, None])
+        else:
+            start, count = ring.read(self._position, self._frames)
+            np.mean(self._frames[:count], axis=1, out=self._work[carry:carry + count])
+        if start != self._position:
+            # The writer lapped this reader; the overlap no longer joins up, so drop it
+            self._work[:count] = self._work[carry:carry + count]
+            carry = 0
+        self._position = start + count
+        total = carry + count
+        added = (total - self.n_fft) // self.hop + 1 if total >= self.n_fft else 0
+        if added:
+            frames = sliding_window_view(self._work[:total], self.n_fft)[::self.hop][:added]
+            width = self.image.shape[1]
+            shown = min(added, width)
+            self.image[:, :width - shown] = self.image[:, shown:]
+            self.columns(frames[added - shown:], self.image[:, width - shown:])
+        consumed = added * self.hop
+        self._carry = total - consumed
+        self._work[:self._carry] = self._work[consumed:total]
+        return added
@@ -0,0 +1,121 @@
+import os
+import wave
+import numpy as np
+from audio_filters import build_pipeline, count_skipped_frames, measure_normalization, normalization_passes, to_pcm16
+from audio_io import DEFAULT_BLOCK_FRAMES, is_wav, open_wav
+
+
+def is_streamable(path):
+    """True for WAV files that can be mapped and read block by block (see audio_io)."""
+    return is_wav(path)
+
+
+def reverse_wav_in_place(path, block_frames=DEFAULT_BLOCK_FRAMES):
+    """Reverse the frames of a PCM WAV file written by the wave module, one block from each end at a time."""
+    with wave.open(path, "rb") as wav:
+        frame_size = wav.getsampwidth() * wav.getnchannels()
+        frames = wav.getnframes()
+    # wave writes the data chunk last, so it ends at the end of the file
+    data_offset = os.path.getsize(path) - frames * frame_size - (frames * frame_size) % 2
+
+    def flip(raw):
+        return np.frombuffer(raw, dtype=np.uint8).reshape(-1, frame_size)[::-1].tobytes()
+
+    with open(path, "r+b") as f:
+        lo, hi = 0, frames
+        while hi - lo >= 2 * block_frames:
+            f.seek(data_offset + lo * frame_size)
+            front = f.read(block_frames * frame_size)
+            f.seek(data_offset + (hi - block_frames) * frame_size)
+            back = f.read(block_frames * frame_size)
+            f.seek(data_offset + lo * frame_size)
+            f.write(flip(back))
+            f.seek(data_offset + (hi - block_frames) * frame_size)
+            f.write(flip(front))
+            lo += block_frames
+            hi -= block_frames
+        f.seek(data_offset + lo * frame_size)
+        middle = f.read((hi - lo) * frame_size)
+        f.seek(data_offset + lo * frame_size)
+        f.write(flip(middle))
+
+
+def stream_filter(input_file, output_file, filter_name, param1=0, param2=0, param3=0, param4=0,
+                  impulse_response=None, block_frames=None, progress=None, voiced_only=False, keep_timing=True,
+                  chain=None):
+    """Filter a PCM WAV file block by block into a 16-bit WAV with bounded memory.
+
+    ``progress`` is called with the completed fraction (0..1) after every block;
+    an exception raised from it aborts the render. Returns the input duration in seconds.
+    With ``voiced_only`` a voice activity pre-pass finds the voiced spans and only
+    those are read and filtered; ``keep_timing`` writes the silence between them back.
+    """
+    block_frames = block_frames or DEFAULT_BLOCK_FRAMES
+    wav = open_wav(input_file)
+    frame_rate, channels, duration = wav.frame_rate, wav.channels, wav.duration
+    stitcher = None
+    if voiced_only:
+        from vad import Stitcher, VoiceActivityDetector, segment_blocks
+
+        segments = VoiceActivityDetector(frame_rate).file_segments(wav, block_frames)
+        frames = int((segments[:, 1] - segments[:, 0]).sum())
+        count_skipped_frames(filter_name, frames, wav.frames)
+
+        def blocks():
+            return segment_blocks(wav, segments, block_frames)
+    else:
+        frames = wav.frames
+
+        def blocks():
+            return wav.blocks(block_frames)
+
+    def make_pipeline():
+        return build_pipeline(filter_name, frame_rate, channels, frames, param1, param2, param3, param4,
+                              impulse_response, chain)
+
+    pipeline = make_pipeline()
+    passes = 1 + normalization_passes(pipeline)
+    total = max(frames, 1) * passes
+
+    def report(done, pass_index):
+        if progress:
+            progress(min((pass_index * frames + done) / total, 1.0))
+
+    # Normalization needs the global peak, so measure each one in a read-only pass first
+    measure_normalization(pipeline, blocks, make_pipeline, lambda index, done: report(done, index))
+    if voiced_only and keep_timing:
+        stitcher = Stitcher(segments, wav.frames, pipeline.time_scale)
+
+    with wave.open(output_file, "wb") as out:
+        out.setsampwidth(2)
+        out.setframerate(int(pipeline.frame_rate))
+        started = False
+        done = 0
+        for block, last in blocks():
+            done += len(block)
+            result = pipeline.process(block, last)
+            if not started:
+                # A multichannel impulse response can widen the output
+                out.setnchannels(result.shape[1])
+                started = True
+            for piece in stitcher.place(result) if stitcher else (result,):
+                if isinstance(piece, int):
+                    _write_silence(out, piece, block_frames)
+                else:
+                    out.writeframes(to_pcm16(piece).tobytes())
+            report(done, passes - 1)
+        if stitcher:
+            _write_silence(out, stitcher.finish(), block_frames)
+
+    if pipeline.reverse:
+        reverse_wav_in_place(output_file, block_frames)
+    return duration
+
+
+def _write_silence(out, frames, block_frames):
+    """Append ``frames`` frames of digital silence to an open wave writer, a block at a time."""
+    frame_size = out.getnchannels() * out.getsampwidth()
+    while frames > 0:
+        count = min(frames, block_frames)
+        out.writeframes(bytes(count * frame_size))
+        frames -= count
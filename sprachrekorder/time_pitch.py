@@ -0,0 +1,204 @@
+from fractions import Fraction
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft
+
+# Outputs computed per vectorized batch in the resampler (bounds its gather buffer)
+RESAMPLE_BATCH = 1 << 16
+
+
+class TimeStretcher:
+    """Phase-vocoder time stretch: ``rate`` times faster (shorter for rate > 1) at the same pitch.
+
+    Analysis frames are taken every ``hop * rate`` input frames and resynthesized every
+    ``hop`` output frames, with each bin's phase advanced by its measured instantaneous
+    frequency. All frames available in a block are transformed and overlap-added at once.
+    Accepts blocks of any length through process(block, final), like the filter stages,
+    and gives bit-identical output for any blocking: the frame schedule is fixed by the
+    total length and the phase and overlap-add sums run in the same order either way.
+    """
+
+    def __init__(self, rate, channels, total_frames, n_fft=2048, hop=512):
+        from scipy.signal import get_window
+
+        self.rate = rate
+        self.n_fft = n_fft
+        self.hop = hop
+        self.channels = channels
+        self.total_out = int(round(total_frames / rate))
+        self._window = get_window("hann", n_fft).astype(np.float32)
+        self._omega = 2 * np.pi * np.arange(n_fft // 2 + 1) / n_fft
+        # Input, centred on the first frame by n_fft / 2 leading zeros (dropped again from the output)
+        self._buffer = np.zeros((n_fft // 2, channels), dtype=np.float32)
+        self._buffer_start = 0  # Padded input index of self._buffer[0]
+        self._next_frame = 0
+        self._prev_angle = None  # Analysis phase of the previous frame
+        self._phase = None  # Synthesis phase of the previous frame, not wrapped to 2 pi
+        self._tail = np.zeros((n_fft - hop, channels), dtype=np.float32)
+        self._tail_norm = np.zeros(n_fft - hop, dtype=np.float32)
+        self._skip = n_fft // 2
+        self._emitted = 0
+        # Frames covering the leading pad plus every output frame; fixed so any blocking gives the same frames
+        self._frames_needed = max(-(-(self._skip + self.total_out - (n_fft - hop)) // hop), 1)
+
+    def _frame_start(self, k):
+        return np.rint(np.asarray(k) * (self.hop * self.rate)).astype(np.int64)
+
+    def process(self, block, final=False):
+        n_fft, hop = self.n_fft, self.hop
+        buffer = np.concatenate((self._buffer, block)) if len(block) else self._buffer
+        end = self._buffer_start + len(buffer)
+        if final:
+            # The remaining frames run over zero-padded input
+            last = self._frames_needed
+            needed_end = int(self._frame_start(last - 1)) + n_fft
+            if needed_end > end:
+                buffer = np.concatenate((buffer, np.zeros((needed_end - end, self.channels), dtype=np.float32)))
+        else:
+            last = min(max(int((end - n_fft) // (hop * self.rate)) + 1, 0), self._frames_needed)
+            while last > self._next_frame and self._frame_start(last - 1) + n_fft > end:
+                last -= 1
+        first = self._next_frame
+        count = max(last - first, 0)
+
+        if count:
+            starts = self._frame_start(np.arange(first, last)) - self._buffer_start
+            # Gathered channel-first so every frame is a contiguous run for all channels at once
+            channels_first = np.ascontiguousarray(buffer.T)
+            frames = sliding_window_view(channels_first, n_fft, axis=1)[:, starts] * self._window  # (C, K, n_fft)
+            spectra = fft.rfft(frames, axis=-1).transpose(1, 0, 2)  # (K, C, bins)
+            magnitude = np.abs(spectra)
+            angle = np.angle(spectra)
+
+            # Instantaneous frequency per bin from the phase change over each actual analysis hop
+            hops = np.diff(self._frame_start(np.arange(first - 1, last))).astype(np.float64)[:, None, None]
+            previous = np.concatenate((angle[:1] if self._prev_angle is None else self._prev_angle[None],
+                                       angle[:-1]))
+            expected = self._omega * hops
+            deviation = angle - previous - expected
+            deviation -= 2 * np.pi * np.round(deviation / (2 * np.pi))
+            increment = (expected + deviation) * (hop / hops)
+            if self._phase is None:
+                increment[0] = angle[0]  # First frame keeps its own phase
+                running = np.cumsum(increment, axis=0)
+            else:
+                # Summed on from the carried (unwrapped) total one frame at a time, so the rounding
+                # is the same wherever the block boundaries fall
+                running = np.cumsum(np.concatenate((self._phase[None], increment)), axis=0)[1:]
+            self._prev_angle = angle[-1]
+            self._phase = running[-1]
+            phase = np.mod(running, 2 * np.pi)
+
+            # magnitude * exp(i phase), from float32 cos/sin (a complex128 exp costs ten times more)
+            phase = phase.astype(np.float32)
+            spectra = np.empty(phase.shape, dtype=np.complex64)
+            np.multiply(magnitude, np.cos(phase), out=spectra.real)
+            np.multiply(magnitude, np.sin(phase), out=spectra.imag)
+            synth = fft.irfft(spectra, n=n_fft, axis=-1).astype(np.float32, copy=False)
+            synth *= self._window
+            self._next_frame = last
+
+        # Overlap-add; the window-power sum normalizes, also where fewer frames overlap at the edges.
+        # Older frames are added first (the carried tail holds the oldest), so each output sample
+        # sums its frames in the same order however the input was blocked
+        out = np.zeros((count * hop + n_fft - hop, self.channels), dtype=np.float32)
+        norm = np.zeros(len(out), dtype=np.float32)
+        out[:n_fft - hop] += self._tail
+        norm[:n_fft - hop] += self._tail_norm
+        if count:
+            square = self._window ** 2
+            for j in reversed(range(n_fft // hop)):
+                piece = synth[:, :, j * hop:(j + 1) * hop].transpose(0, 2, 1).reshape(count * hop, self.channels)
+                out[j * hop:j * hop + count * hop] += piece
+                norm[j * hop:j * hop + count * hop] += np.tile(square[j * hop:(j + 1) * hop], count)
+        done = len(out) if final else count * hop
+        self._tail = out[done:].copy()
+        self._tail_norm = norm[done:].copy()
+        result = out[:done] / np.maximum(norm[:done], 1e-3)[:, None]
+
+        # Keep the input from the next frame on
+        keep = int(self._frame_start(self._next_frame)) - self._buffer_start
+        keep = min(max(keep, 0), len(buffer))
+        self._buffer = buffer[keep:].copy() if not final else buffer[:0]
+        self._buffer_start += keep
+
+        if self._skip:
+            dropped = min(self._skip, len(result))
+            result = result[dropped:]
+            self._skip -= dropped
+        result = result[:max(self.total_out - self._emitted, 0)]
+        if final and self._emitted + len(result) < self.total_out:
+            result = np.concatenate((result, np.zeros((self.total_out - self._emitted - len(result), self.channels),
+                                                      dtype=np.float32)))
+        self._emitted += len(result)
+        return result.astype(np.float32, copy=False)
+
+
+class PolyphaseResampler:
+    """Polyphase FIR resampling by ``up / down`` (the filter scipy's resample_poly designs), streamed.
+
+    Output frame m reads the input around ``m * down / up``; each output uses one phase
+    of the filter, so batches of outputs are a gather plus one multiply-sum.
+    """
+
+    def __init__(self, up, down, channels, total_frames):
+        from scipy.signal import firwin
+
+        g = np.gcd(up, down)
+        self.up, self.down = up // g, down // g
+        self.channels = channels
+        self.total_out = -(-total_frames * self.up // self.down)
+        half = 10 * max(self.up, self.down)
+        taps = firwin(2 * half + 1, 1.0 / max(self.up, self.down), window=("kaiser", 5.0)) * self.up
+        self._delay = half
+        self._taps_per_phase = -(-len(taps) // self.up)
+        padded = np.zeros(self._taps_per_phase * self.up)
+        padded[:len(taps)] = taps
+        # self._phases[p, j] = taps[p + (J - 1 - j) * up], J taps per phase: oldest input of a window first
+        self._phases = np.ascontiguousarray(padded.reshape(self._taps_per_phase, self.up).T[:, ::-1], dtype=np.float32)
+        history = self._taps_per_phase
+        self._buffer = np.zeros((history, channels), dtype=np.float32)
+        self._buffer_start = -history  # Input index of self._buffer[0]; leading zeros stand in for x[<0]
+        self._next = 0
+
+    @classmethod
+    def for_ratio(cls, ratio, channels, total_frames, max_denominator=100):
+        """Resampler producing ``ratio`` output frames per input frame, as a close fraction."""
+        fraction = Fraction(ratio).limit_denominator(max_denominator)
+        return cls(fraction.numerator, fraction.denominator, channels, total_frames)
+
+    def process(self, block, final=False):
+        buffer = np.concatenate((self._buffer, block)) if len(block) else self._buffer
+        end = self._buffer_start + len(buffer)
+        if final:
+            stop = self.total_out
+            needed_end = (stop * self.down + self._delay) // self.up + 1
+            if needed_end > end:
+                buffer = np.concatenate((buffer, np.zeros((needed_end - end, self.channels), dtype=np.float32)))
+        else:
+            # Output m needs input up to (m * down + delay) // up
+            stop = min(((end - 1) * self.up - self._delay) // self.down + 1, self.total_out)
+        stop = max(stop, self._next)
+        if stop <= self._next or len(buffer) < self._taps_per_phase:
+            # Nothing to output yet (the retained input can be shorter than one window); keep it all
+            self._buffer = buffer
+            return np.zeros((0, self.channels), dtype=np.float32)
+
+        pieces = []
+        # Channel-first windows: the gather copies contiguous runs and the multiply-sum covers all channels
+        windows = sliding_window_view(np.ascontiguousarray(buffer.T), self._taps_per_phase, axis=1)
+        for batch in range(self._next, stop, RESAMPLE_BATCH):
+            m = np.arange(batch, min(batch + RESAMPLE_BATCH, stop), dtype=np.int64)
+            t = m * self.down + self._delay
+            oldest = t // self.up - self._buffer_start - (self._taps_per_phase - 1)
+            pieces.append(np.einsum("mj,cmj->mc", self._phases[t % self.up], windows[:, oldest]))
+        self._next = stop
+
+        keep = (self._next * self.down + self._delay) // self.up - self._taps_per_phase + 1 - self._buffer_start
+        keep = min(max(keep, 0), len(buffer))
+        self._buffer = buffer[keep:].copy()
+        self._buffer_start += keep
+        if not pieces:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        return np.concatenate(pieces) if len(pieces) > 1 else pieces[0]
@@ -0,0 +1,233 @@
+import numpy as np
+
+from audio_io import DEFAULT_BLOCK_FRAMES
+
+FRAME_MS = 20  # Analysis frame; long enough for a stable energy, short enough for word onsets
+HANGOVER_MS = 300  # Voice is held this long after the last voiced frame, so word endings and short pauses stay
+PREROLL_MS = 150  # Kept ahead of each voiced span so soft onsets are not clipped
+MARGIN_DB = 12.0  # Voice is at least this far above the noise floor
+MIN_THRESHOLD_DB = -60.0  # Adaptive thresholds are kept between these (dBFS)
+MAX_THRESHOLD_DB = -35.0
+FRICATIVE_ZCR = 0.3  # Zero crossings per sample above which a quieter frame still counts as voice (s, f, sh)
+FRICATIVE_MARGIN_DB = 6.0  # How much quieter than the threshold such a frame may be
+FLOOR_RISE_DB = 3.0  # Per second the live noise floor estimate may climb (it drops at once)
+
+
+def frame_features(samples, frame):
+    """(energy_db, zcr) of each complete ``frame``-sized frame of (frames,) or (frames, channels) float samples.
+
+    Channels are mixed down first. Energy is the mean square in dBFS, zcr the share of
+    sample pairs that change sign.
+    """
+    mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+    count = len(mono) // frame
+    frames = mono[:count * frame].reshape(count, frame)
+    energy = np.einsum("ij,ij->i", frames, frames) / np.float32(frame)
+    energy_db = 10 * np.log10(np.maximum(energy, np.float32(1e-12)))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / np.float32(max(frame - 1, 1))
+    return energy_db, zcr
+
+
+def _runs(mask):
+    """(starts, stops) of the runs of True in a boolean array."""
+    edges = np.diff(np.concatenate(([False], mask, [False])).astype(np.int8))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+class VoiceActivityDetector:
+    """Frame energy / zero-crossing voice activity detection with hangover and pre-roll.
+
+    A frame is voiced when its energy exceeds the threshold, or comes close to it with
+    the high zero-crossing rate of a fricative. Without a fixed ``threshold_db`` the
+    threshold is ``MARGIN_DB`` above the noise floor estimated from the signal itself.
+    segments() and file_segments() analyse whole signals; gate() makes a streaming
+    VoiceGate for capture.
+    """
+
+    def __init__(self, frame_rate, threshold_db=None, frame_ms=FRAME_MS, hangover_ms=HANGOVER_MS,
+                 preroll_ms=PREROLL_MS):
+        self.frame_rate = frame_rate
+        self.threshold_db = threshold_db
+        self.frame = max(int(frame_rate * frame_ms / 1000), 2)
+        self.hangover = int(hangover_ms / frame_ms)
+        self.preroll = -(-int(preroll_ms) // frame_ms)
+
+    def threshold(self, noise_floor_db):
+        if self.threshold_db is not None:
+            return self.threshold_db
+        return float(np.clip(noise_floor_db + MARGIN_DB, MIN_THRESHOLD_DB, MAX_THRESHOLD_DB))
+
+    def classify(self, energy_db, zcr, threshold):
+        """Voiced frames before hangover and pre-roll."""
+        fricative = (zcr >= FRICATIVE_ZCR) & (energy_db >= threshold - FRICATIVE_MARGIN_DB)
+        return (energy_db >= threshold) | fricative
+
+    def active_frames(self, energy_db, zcr):
+        """Voiced frames of a whole signal with hangover and pre-roll applied."""
+        if not len(energy_db):
+            return np.zeros(0, dtype=bool)
+        raw = self.classify(energy_db, zcr, self.threshold(np.percentile(energy_db, 10)))
+        index = np.arange(len(raw))
+        last = np.maximum.accumulate(np.where(raw, index, -len(raw) - self.hangover - 1))
+        following = np.minimum.accumulate(np.where(raw, index, 2 * len(raw) + self.preroll)[::-1])[::-1]
+        return (index - last <= self.hangover) | (following - index <= self.preroll)
+
+    def _segments(self, energy_db, zcr, total_frames):
+        starts, stops = _runs(self.active_frames(energy_db, zcr))
+        segments = np.stack((starts, stops), axis=1).astype(np.int64) * self.frame
+        if len(segments) and stops[-1] == len(energy_db):
+            segments[-1, 1] = total_frames  # The incomplete last frame goes with a voiced ending
+        return segments
+
+    def segments(self, samples):
+        """(count, 2) array of the [start, stop) frame ranges of ``samples`` that hold voice."""
+        energy_db, zcr = frame_features(samples, self.frame)
+        return self._segments(energy_db, zcr, len(samples))
+
+    def file_segments(self, wav, block_frames=DEFAULT_BLOCK_FRAMES):
+        """segments() of an audio_io.WavFile, read block by block."""
+        block_frames = max(block_frames // self.frame, 1) * self.frame
+        features = [frame_features(wav.read(start, start + block_frames), self.frame)
+                    for start in range(0, wav.frames, block_frames)]
+        if not features:
+            return np.zeros((0, 2), dtype=np.int64)
+        energy_db, zcr = (np.concatenate(parts) for parts in zip(*features))
+        return self._segments(energy_db, zcr, wav.frames)
+
+    def gate(self, channels, max_gap_ms=0):
+        return VoiceGate(self, channels, max_gap_ms)
+
+
+class VoiceGate:
+    """Drops (or shortens) the silence in a stream fed block by block, for recording.
+
+    process() returns the frames to keep. Silent spans are cut to at most ``max_gap_ms``
+    (0 removes them). Pre-roll needs look-ahead, so output lags the input by the
+    pre-roll; the final call returns the rest. The noise floor follows the quietest
+    frames, dropping at once and rising slowly, and hangover is carried across blocks.
+    """
+
+    def __init__(self, detector, channels, max_gap_ms=0):
+        self.detector = detector
+        self.max_gap = int(max_gap_ms * detector.frame_rate / 1000) // detector.frame
+        self.kept = 0
+        self.skipped = 0
+        self._pending = np.zeros((0, channels), dtype=np.float32)  # Undecided input, from a frame boundary on
+        self._active = np.zeros(0, dtype=bool)  # Voice (with hangover) of the complete frames in _pending
+        self._first = 0  # Index of the first frame of _pending
+        self._last_voice = -10 ** 12  # Index of the last raw voiced frame
+        self._last_active = -10 ** 12  # Index of the last frame kept as voice
+        self._kept_last = True  # Whether the last decided frame was kept
+        self._floor = None
+
+    def process(self, block, final=False):
+        frame, detector = self.detector.frame, self.detector
+        data = np.concatenate((self._pending, block)) if len(self._pending) else block
+        known = len(self._active)
+        count = len(data) // frame
+        energy_db, zcr = frame_features(data[known * frame:count * frame], frame)
+        if len(energy_db):
+            seconds = len(energy_db) * frame / detector.frame_rate
+            quietest = float(energy_db.min())
+            self._floor = quietest if self._floor is None else min(quietest, self._floor + FLOOR_RISE_DB * seconds)
+            raw = detector.classify(energy_db, zcr, detector.threshold(self._floor))
+            index = self._first + known + np.arange(len(raw))
+            last = np.maximum(np.maximum.accumulate(np.where(raw, index, -10 ** 12)), self._last_voice)
+            self._last_voice = int(last[-1])
+            self._active = np.concatenate((self._active, index - last <= detector.hangover))
+
+        # Frames are decided once the pre-roll after them has been seen
+        decided = count if final else max(count - detector.preroll, 0)
+        index = self._first + np.arange(count)
+        active = self._active
+        following = np.minimum.accumulate(np.where(active, index, 10 ** 12)[::-1])[::-1]
+        voice = (active | (following - index <= detector.preroll))[:decided]
+        last = np.maximum(np.maximum.accumulate(np.where(voice, index[:decided], -10 ** 12)), self._last_active)
+        keep = voice | (index[:decided] - last <= self.max_gap)
+        if decided:
+            self._last_active = int(last[-1])
+            self._kept_last = bool(keep[-1])
+
+        channels = data.shape[1]
+        out = data[:decided * frame].reshape(decided, frame, channels)[keep].reshape(-1, channels)
+        rest = data[decided * frame:]
+        if final and len(rest):
+            # The incomplete last frame follows the frame before it
+            if self._kept_last:
+                out = np.concatenate((out, rest))
+            rest = rest[:0]
+        self.kept += len(out)
+        self.skipped += len(data) - len(rest) - len(out)
+        self._pending = rest.copy()
+        self._active = self._active[decided:]
+        self._first += decided
+        return out
+
+
+def gather(samples, segments):
+    """The frames of ``segments`` of ``samples`` one after another, as float32."""
+    from audio_io import to_float32
+
+    if not len(segments):
+        return np.zeros((0, samples.shape[1]), dtype=np.float32)
+    return np.concatenate([to_float32(samples[start:stop]) for start, stop in segments])
+
+
+def segment_blocks(wav, segments, block_frames=DEFAULT_BLOCK_FRAMES):
+    """Yield (block, is_last) pairs of the voiced frames of an audio_io.WavFile, like WavFile.blocks()."""
+    pieces = [(start, min(start + block_frames, stop)) for start, stop in segments
+              for start in range(int(start), int(stop), block_frames)]
+    if not pieces:
+        yield np.zeros((0, wav.channels), dtype=np.float32), True
+    for i, (start, stop) in enumerate(pieces):
+        yield wav.read(start, stop), i == len(pieces) - 1
+
+
+class Stitcher:
+    """Puts a render of gather()ed segments back at the original times of the segments.
+
+    place() takes the rendered output in order and returns pieces to write: arrays of
+    audio, or frame counts of silence for the gaps. ``scale`` is the filter's output
+    to input duration ratio. finish() returns the silence after the last segment.
+    """
+
+    def __init__(self, segments, total_frames, scale=1.0):
+        lengths = segments[:, 1] - segments[:, 0]
+        offsets = np.cumsum(lengths) - lengths
+        self._bounds = np.round(offsets * scale).astype(np.int64)  # Where each segment starts in the render
+        self._targets = np.round(segments[:, 0] * scale).astype(np.int64)  # and where it belongs
+        self._length = int(round(total_frames * scale))
+        self._next = 0
+        self._position = 0  # Frames of render placed so far
+        self._inserted = 0  # Frames of silence inserted so far
+
+    def place(self, block):
+        pieces, offset = [], 0
+        end = self._position + len(block)
+        while self._next < len(self._bounds) and self._bounds[self._next] < end:
+            cut = max(int(self._bounds[self._next]) - self._position, offset)
+            if cut > offset:
+                pieces.append(block[offset:cut])
+                offset = cut
+            gap = int(self._targets[self._next]) - (self._position + cut + self._inserted)
+            if gap > 0:
+                pieces.append(gap)
+                self._inserted += gap
+            self._next += 1
+        if offset < len(block):
+            pieces.append(block[offset:])
+        self._position = end
+        return pieces
+
+    def finish(self):
+        return max(self._length - self._position - self._inserted, 0)
+
+
+def stitch(rendered, segments, total_frames, scale=1.0):
+    """Stitcher over one whole rendered buffer; returns the stitched float32 buffer."""
+    stitcher = Stitcher(segments, total_frames, scale)
+    channels = rendered.shape[1]
+    pieces = stitcher.place(rendered) + [stitcher.finish()]
+    return np.concatenate([np.zeros((piece, channels), dtype=np.float32) if isinstance(piece, int) else piece
+                           for piece in pieces])
@@ -0,0 +1,179 @@
+import os
+import numpy as np
+
+
+def column_starts(frames, columns):
+    """First sample index of each of ``columns`` equal-ish bins over ``frames`` samples."""
+    return (np.arange(columns, dtype=np.int64) * frames) // columns
+
+
+def minmax_decimate(samples, starts, mins, maxs):
+    """Reduce ``samples`` (frames,) or (frames, channels) to the minimum and maximum of each bin along
+    the frames, written into ``mins``/``maxs``; all channels are reduced in one pass."""
+    np.minimum.reduceat(samples, starts, axis=0, out=mins)
+    np.maximum.reduceat(samples, starts, axis=0, out=maxs)
+
+
+class EnvelopeOutline:
+    """Vertices of a filled waveform envelope: maxima left to right, then minima right to left.
+
+    Filling one polygon is far cheaper for Agg than stroking a min/max zigzag line.
+    """
+
+    def __init__(self, duration, columns, offset=0.0):
+        self.columns = columns
+        self.xy = np.zeros((2 * columns, 2))
+        x = np.linspace(offset, offset + duration, columns)
+        self.xy[:columns, 0] = x
+        self.xy[columns:, 0] = x[::-1]
+        self.top = self.xy[:columns, 1]
+        self.bottom = self.xy[columns:, 1][::-1]
+
+    def update(self, samples, starts, scale=1.0, center=0.0):
+        minmax_decimate(samples, starts, self.bottom, self.top)
+        return self.set_y(scale, center)
+
+    def set_y(self, scale=1.0, center=0.0):
+        """Scale the current outline and move it to a lane centred on ``center``."""
+        if scale != 1.0:
+            self.xy[:, 1] *= scale
+        if center:
+            self.xy[:, 1] += center
+        return self.xy
+
+
+class PeakPyramid:
+    """Min/max summaries of a signal at several resolutions (levels of detail).
+
+    Level 0 holds one (min, max) pair per ``base`` frames and channel and every further
+    level merges ``factor`` pairs of the one below, down to a few thousand pairs. The
+    arrays are (pairs, channels).
+    """
+
+    def __init__(self, levels, frames, frame_rate, base=256, factor=4):
+        self.levels = levels  # [(mins, maxs), ...] finest first
+        self.frames = frames
+        self.frame_rate = frame_rate
+        self.base = base
+        self.factor = factor
+
+    @property
+    def channels(self):
+        return self.levels[0][0].shape[1]
+
+    @classmethod
+    def from_blocks(cls, blocks, frames, frame_rate, base=256, factor=4, top=2048):
+        """Build from an iterable of (frames, channels) or 1-D sample blocks, holding only level 0 in memory."""
+        mins = maxs = carry = None
+        filled = 0
+        for block in blocks:
+            block = block if block.ndim == 2 else block[:, None]
+            if mins is None:
+                mins = np.empty((-(-frames // base), block.shape[1]), dtype=np.float32)
+                maxs = np.empty_like(mins)
+                carry = np.zeros((0, block.shape[1]), dtype=np.float32)
+            data = np.concatenate((carry, block)) if len(carry) else block
+            usable = len(data) // base * base
+            bins = data[:usable].reshape(-1, base, data.shape[1])
+            np.min(bins, axis=1, out=mins[filled:filled + len(bins)])
+            np.max(bins, axis=1, out=maxs[filled:filled + len(bins)])
+            filled += len(bins)
+            carry = data[usable:].astype(np.float32)
+        if mins is None:
+            mins = maxs = carry = np.zeros((0, 1), dtype=np.float32)
+        if len(carry) and filled < len(mins):
+            mins[filled], maxs[filled] = carry.min(axis=0), carry.max(axis=0)
+            filled += 1
+        levels = [(mins[:filled], maxs[:filled])]
+        while len(levels[-1][0]) > top:
+            lo, hi = levels[-1]
+            starts = np.arange(0, len(lo), factor)
+            levels.append((np.minimum.reduceat(lo, starts, axis=0), np.maximum.reduceat(hi, starts, axis=0)))
+        return cls(levels, frames, frame_rate, base, factor)
+
+    @property
+    def peak(self):
+        lo, hi = self.levels[-1]
+        return float(max(np.max(np.abs(lo)), np.max(np.abs(hi)))) if len(lo) else 0.0
+
+    def view(self, start, stop, columns):
+        """(times, mins, maxs) for frames [start, stop) at roughly ``columns`` pairs or more per channel.
+
+        Returns None when even level 0 is coarser than one pair per column, i.e. when the
+        caller should decimate the raw samples of that (short) range instead.
+        """
+        start, stop = max(int(start), 0), min(int(stop), self.frames)
+        if stop <= start:
+            return None
+        size = self.base
+        level = None
+        for lo, hi in self.levels:
+            if (stop - start) / size < columns:
+                break
+            level = (lo, hi, size)
+            size *= self.factor
+        if level is None:
+            return None
+        lo, hi, size = level
+        first, last = start // size, -(-stop // size)
+        times = np.arange(first, last) * (size / self.frame_rate)
+        return times, lo[first:last], hi[first:last]
+
+    def save(self, path, source):
+        """Store as a sidecar .npz keyed to the size and mtime of ``source``."""
+        stat = os.stat(source)
+        arrays = {"meta": np.array([self.frames, self.frame_rate, self.base, self.factor,
+                                    stat.st_size, stat.st_mtime_ns, self.channels], dtype=np.int64)}
+        for i, (lo, hi) in enumerate(self.levels):
+            arrays[f"min{i}"], arrays[f"max{i}"] = lo, hi
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path, source):
+        """Load a sidecar written by save(), or return None if it is missing or stale."""
+        try:
+            with np.load(path) as data:
+                # Sidecars from before the channel count was stored only hold the first channel
+                frames, frame_rate, base, factor, size, mtime, _ = (int(v) for v in data["meta"])
+                stat = os.stat(source)
+                if (size, mtime) != (stat.st_size, stat.st_mtime_ns):
+                    return None
+                levels = []
+                while f"min{len(levels)}" in data:
+                    levels.append((data[f"min{len(levels)}"], data[f"max{len(levels)}"]))
+        except (OSError, KeyError, ValueError):
+            return None
+        return cls(levels, frames, frame_rate, base, factor)
+
+
+def sidecar_path(audio_path):
+    return audio_path + ".peaks.npz"
+
+
+def file_pyramid(audio_path, use_sidecar=True):
+    """Peak pyramid of every channel of an audio file, reusing or writing a sidecar cache."""
+    cache = sidecar_path(audio_path)
+    if use_sidecar:
+        pyramid = PeakPyramid.load(cache, audio_path)
+        if pyramid is not None:
+            return pyramid
+
+    from audio_io import is_wav, load_audio, open_wav
+
+    if is_wav(audio_path):
+        # Straight from the mapped file, converting one block at a time
+        wav = open_wav(audio_path)
+        frame_rate, frames = wav.frame_rate, wav.frames
+        blocks = (block for block, _ in wav.blocks())
+    else:
+        samples, frame_rate = load_audio(audio_path)
+        frames, blocks = len(samples), [samples]
+    pyramid = PeakPyramid.from_blocks(blocks, frames, frame_rate)
+
+    if use_sidecar:
+        try:
+            pyramid.save(cache, audio_path)
+        except OSError as e:
+            print(f"Could not write peak cache: {e}")
+    return pyramid